@@ -1,49 +1,65 @@
 import PySimpleGUI as sg
-from datetime import datetime
 import calendar
 import db_functions
 import pdf
 import api_functions
 import config
+from chart_grid import ChartGrid, GridRow, BAR
+from chart_model import adl_model
+from adl_fields import ADL_KEYS
 
 API_URL = config.API_URL
 
 
-# Define the width of the label cell and regular cells
-label_cell_width = 12  # This may need to be adjusted to align perfectly
-regular_cell_width = 5  # This may need to be adjusted to align perfectly
-
 # Define the number of days
 num_days = 31
 
-ADL_KEYS = [
-                "first_shift_sp", "second_shift_sp", "first_shift_activity1", "first_shift_activity2",
-                "first_shift_activity3", "second_shift_activity4", "first_shift_bm", "second_shift_bm",
-                "shower", "shampoo", "sponge_bath", "peri_care_am", "peri_care_pm", "oral_care_am", "oral_care_pm",
-                "nail_care", "skin_care", "shave", "breakfast", "lunch", "dinner", "snack_am",
-                "snack_pm", "water_intake"]
-
-
-def create_horizontal_bar(text):
-    return [sg.Text(f'{text}', justification='center', expand_x=True, relief=sg.RELIEF_SUNKEN)]
-
-
-def create_row_label(text):
-    return [sg.Text(f'{text}', size=(label_cell_width+1, 1), pad=(0,0), justification='center')]
-
-
-def create_input_text(key):
-    return [sg.InputText(size=(regular_cell_width, 1), pad=(3, 3), justification='center', key=f'-{key}-{i}-') for i in range(1, num_days + 1)]
+# Section headings and the (ADL key, row label) rows under each, top to bottom
+ADL_SECTIONS = [
+    ("Service Plan (Initial when completed)", [
+        ("first_shift_sp", "1st Shift"), ("second_shift_sp", "2nd Shift")]),
+    ("Activity Record Number (see legend at bottom)", [
+        ("first_shift_activity1", "1st Activity"), ("first_shift_activity2", "2nd Activity"),
+        ("first_shift_activity3", "3rd Activity"), ("second_shift_activity4", "4th Activity")]),
+    ("Bowel Movement Record size of BM and how many if more than one (Example: SM, M, L, XL, or D for diarrhea, S for self)", [
+        ("first_shift_bm", "1st Shift"), ("second_shift_bm", "2nd Shift")]),
+    ("ADL's (Initials or S for Self, H for Hospice)", [
+        ("shower", "SHOWER"), ("shampoo", "SHAMPOO"), ("sponge_bath", "SPONGE BATH"),
+        ("peri_care_am", "PERI CARE AM"), ("peri_care_pm", "PERI CARE PM"), ("oral_care_am", "ORAL CARE AM"),
+        ("oral_care_pm", "ORAL CARE PM"), ("nail_care", "NAIL CARE"), ("skin_care", "SKIN CARE"), ("shave", "SHAVE")]),
+    ("Meals (Record Percentage of Meal Eaten)", [
+        ("breakfast", "BREAKFAST"), ("lunch", "LUNCH"), ("dinner", "DINNER"), ("snack_am", "SNACK AM"),
+        ("snack_pm", "SNACK PM"), ("water_intake", "WATER IN-TAKE")]),
+]
+
+
+def create_adl_rows():
+    rows = []
+    for heading, adl_rows in ADL_SECTIONS:
+        rows.append(GridRow(None, heading, BAR))
+        rows.extend(GridRow(adl_key, label) for adl_key, label in adl_rows)
+    return rows
+
+
+def changed_days(year_month, dirty_cells, get):
+    """
+    Save payload ([{'chart_date', 'data'}] per day) for the days with edited cells ((adl_key, day, value)).
+    Each such day is sent whole: every non-empty cell (`get(adl_key, day)`), as before, plus its cleared
+    cells as '', so a server that upserts whole rows keeps the day's other columns.
+    """
+    cleared = {}
+    for adl_key, day, value in dirty_cells:
+        cleared.setdefault(day, {})
+        if not value:
+            cleared[day][adl_key] = ''
+    payload = []
+    for day, data in sorted(cleared.items()):
+        data.update((adl_key, get(adl_key, day)) for adl_key in ADL_KEYS if get(adl_key, day))
+        payload.append({'chart_date': f'{year_month}-{day:02d}', 'data': data})
+    return payload
 
 
 def show_adl_chart(resident_name, year_month):
-    # Define the number of days
-    num_days = 31
-
-    # Define the width of the label cell and regular cells
-    label_cell_width = 12  # This may need to be adjusted to align perfectly
-    regular_cell_width = 5  # This may need to be adjusted to align perfectly
-
     # Define activities
     activities = [
         "1. Movie & Snack or TV",
@@ -72,108 +88,29 @@ def show_adl_chart(resident_name, year_month):
         [sg.Column(column1), sg.Column(column2), sg.Column(column3)]
     ], relief=sg.RELIEF_SUNKEN)
 
-    # Empty row for the table to just show headers
-    data = [[]]  # No data rows, only headers
-
     # Parse the year and month
     year, month_number = year_month.split('-')
     month_name = calendar.month_name[int(month_number)]
 
+    # One virtualised grid for all ADL rows
+    grid = ChartGrid(create_adl_rows(), visible_rows=len(ADL_KEYS) + len(ADL_SECTIONS), row_height=24)
+
     # Define the layout of the window
     layout = [
         [sg.Text('CareTech Monthly ADL Chart', font=('Helvetica', 16), justification='center', expand_x=True)],
         [sg.Text('RESIDENT:', size=(10, 1)), sg.Text(f'{resident_name}', key='-RESIDENT-', size=(20, 1)),
         sg.Text('MONTH:', size=(10, 1)), sg.Text(f'{month_name} {year}', key='-MONTH-', size=(20, 1))],
-        # Table as a header row of cells
-        [sg.Table(values=data,
-              headings=[''] + [str(i) for i in range(1, num_days + 1)],
-              max_col_width=regular_cell_width,
-              auto_size_columns=False,
-              col_widths=[label_cell_width] + [regular_cell_width]*num_days,
-              display_row_numbers=False,
-              justification='center',
-              num_rows=0,
-              key='-TABLE-',
-              row_height=25,
-              pad=(0,0),
-              hide_vertical_scroll=True)],
-        create_horizontal_bar("Service Plan (Initial when completed)"),
-        create_row_label("1st Shift") +
-        create_input_text("first_shift_sp"),
-        create_row_label("2nd Shift") +
-        create_input_text("second_shift_sp"),
-        create_horizontal_bar("Activity Record Number (see legend at bottom)"),
-        create_row_label("1st Activity") +
-        create_input_text("first_shift_activity1"),
-        create_row_label("2nd Activity") +
-        create_input_text("first_shift_activity2"),
-        create_row_label("3rd Activity") +
-        create_input_text("first_shift_activity3"),
-        create_row_label("4th Activity") +
-        create_input_text("second_shift_activity4"),
-        create_horizontal_bar("Bowel Movement Record size of BM and how many if more than one (Example: SM, M, L, XL, or D for diarrhea, S for self)"),
-        create_row_label("1st Shift") +
-        create_input_text("first_shift_bm"),
-        create_row_label("2nd Shift") +
-        create_input_text("second_shift_bm"),
-        create_horizontal_bar("ADL's (Initials or S for Self, H for Hospice)"),
-        create_row_label("SHOWER") +
-        create_input_text("shower"),
-        create_row_label("SHAMPOO") +
-        create_input_text("shampoo"),
-        create_row_label("SPONGE BATH") +
-        create_input_text("sponge_bath"),
-        create_row_label("PERI CARE AM") +
-        create_input_text("peri_care_am"),
-        create_row_label("PERI CARE PM") +
-        create_input_text("peri_care_pm"),
-        create_row_label("ORAL CARE AM") +
-        create_input_text("oral_care_am"),
-        create_row_label("ORAL CARE PM") +
-        create_input_text("oral_care_pm"),
-        create_row_label("NAIL CARE") +
-        create_input_text("nail_care"),
-        create_row_label("SKIN CARE") +
-        create_input_text("skin_care"),
-        create_row_label("SHAVE") +
-        create_input_text("shave"),
-        create_horizontal_bar("Meals (Record Percentage of Meal Eaten)"),
-        create_row_label("BREAKFAST") +
-        create_input_text("breakfast"),
-        create_row_label("LUNCH") +
-        create_input_text("lunch"),
-        create_row_label("DINNER") +
-        create_input_text("dinner"),
-        create_row_label("SNACK AM") +
-        create_input_text("snack_am"),
-        create_row_label("SNACK PM") +
-        create_input_text("snack_pm"),
-        create_row_label("WATER IN-TAKE") +
-        create_input_text("water_intake"),
+        grid.layout(),
         [sg.Text(text='', expand_x=True), [sg.Button('Save Changes Made'), sg.Button('Generate PDF'), sg.Button('Hide Buttons')], activities_frame, sg.Text(text='', expand_x=True)]
         #sg.Button('Save Changes Made')
     ]
 
     # Create the window
     window = sg.Window(' CareTech Monthly ADLs', layout, finalize=True, resizable=True)
-
+    grid.attach(window)
 
     adl_data = api_functions.fetch_adl_chart_data_for_month(API_URL, resident_name, year_month)
-    
-    if adl_data:
-        for entry in adl_data:
-            chart_date_str = entry.get("chart_date")
-            # Example: 'Tue, 27 Feb 2024 00:00:00 GMT' -> '27 Feb 2024'
-            date_part = ' '.join(chart_date_str.split(' ')[1:4])
-            # Parse '27 Feb 2024' into a datetime object
-            chart_date = datetime.strptime(date_part, "%d %b %Y")
-            day_number = chart_date.day  # Extract the day of the month
-
-            for adl_key in ADL_KEYS:
-                value = entry.get(adl_key, "")
-                if value:  # Check if there is a value to update
-                    window[f'-{adl_key}-{day_number}-'].update(value)
-
+    grid.load(adl_model(grid.row_keys, adl_data))
 
     # Event Loop
     while True:
@@ -185,21 +122,20 @@ def show_adl_chart(resident_name, year_month):
             window['Generate PDF'].update(visible=False)
             window['Hide Buttons'].update(visible=False)
         elif event == 'Save Changes Made':
-            adl_data = []
-            for day in range(1, 32):  # Assuming a maximum of 31 days in a month
-                day_data = {key.split('-')[1]: values[key] for key in values if key.endswith(f'-{day}-') and values[key].strip()}
-                if day_data:  # If there's data for this day, add it to the list
-                    adl_data.append({'chart_date': f'{year_month}-{day:02d}', 'data': day_data})
-
-            if adl_data:
-                response = api_functions.save_adl_data_from_chart_window(API_URL, resident_name, year_month, adl_data)
-                if response == 'token_expired':
+            # Only the days with edited cells are sent, each in full
+            changes = changed_days(year_month, grid.dirty_cells(), grid.get)
+            if changes:
+                response = api_functions.save_adl_data_from_chart_window(API_URL, resident_name, year_month, changes)
+                if api_functions.session_expired():
                     from new_main import logout
                     logout()
                 elif response:
+                    grid.mark_clean()
                     sg.popup("ADL data saved successfully.")
                 else:
                     sg.popup_error("Failed to save ADL data.")
+            else:
+                sg.popup("No changes to save.")
 
         elif event == 'Generate PDF':
             pdf.generate_adl_chart_pdf(resident_name, year_month, adl_data)
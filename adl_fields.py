@@ -0,0 +1,22 @@
+"""
+ADL chart columns, shared by the client windows, the local database layer and
+the API server. Kept free of imports so the server can use it without loading
+the client's database or audit modules.
+"""
+
+# adl_chart columns, in chart order
+ADL_KEYS = [
+    'first_shift_sp', 'second_shift_sp', 'first_shift_activity1',
+    'first_shift_activity2', 'first_shift_activity3',
+    'second_shift_activity4',
+    'first_shift_bm', 'second_shift_bm', 'shower', 'shampoo',
+    'sponge_bath', 'peri_care_am', 'peri_care_pm', 'oral_care_am',
+    'oral_care_pm', 'nail_care', 'skin_care', 'shave', 'breakfast',
+    'lunch', 'dinner', 'snack_am', 'snack_pm', 'water_intake'
+]
+
+# Fields to auto-populate for self-care residents
+AUTO_SELF_FIELDS = [
+    'first_shift_bm', 'second_shift_bm', 'shower', 'shampoo',
+    'sponge_bath', 'peri_care_am', 'peri_care_pm', 'oral_care_am',
+    'oral_care_pm', 'nail_care', 'skin_care', 'shave']
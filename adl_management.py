@@ -4,71 +4,80 @@ from datetime import datetime
 from adl_chart import show_adl_chart
 import db_functions
 import config
+import month_availability
+from adl_fields import ADL_KEYS, AUTO_SELF_FIELDS
 
 API_URL = config.API_URL
 
 FONT = config.global_config['font']
 FONT_BOLD = 'Arial Bold' 
 
+# Input keys are 'ADL_<column>' (checkboxes 'CHECK_ADL_<column>') for each ADL_KEYS column, the same
+# for every resident, so switching residents only updates values (see update_adl_tab)
+
+SERVICE_PLAN_FIELDS = ['first_shift_sp', 'second_shift_sp']
+
+
+def is_supervisory_care_resident(resident_name, resident_care_levels):
+    return any(resident['name'] == resident_name and resident['level_of_care'] == 'Supervisory Care' for resident in resident_care_levels)
+
+
 def get_adl_tab_layout(resident_name, existing_adl_data, resident_care_levels):
     #existing_data = api_functions.fetch_adl_data_for_resident(API_URL, resident_name)
     existing_data = existing_adl_data
     #resident_care_levels = api_functions.get_resident_care_level(API_URL)
-    is_supervisory_care = any(resident['name'] == resident_name and resident['level_of_care'] == 'Supervisory Care' for resident in resident_care_levels)
+    is_supervisory_care = is_supervisory_care_resident(resident_name, resident_care_levels)
     user_initials = config.global_config['user_initials']
+    # Only months the server has ADL data for (see month_availability.py)
+    chart_years, chart_months, default_year, default_month = month_availability.picker_choices(
+        month_availability.available_months(config.global_config['month_availability'], resident_name, 'adl'))
     
     bm_record_choices = ['SM', 'M', 'L', 'XL', 'D', 'N/A', 'S']  # Add user initials dynamically
     adl_choices = [user_initials, 'H', 'S']
     activities_choices = ['1', '2', '3', '4', '5', '6', '7', '8', '9', '10', '11', '12', '13', '14', '15']
 
-    # Fields to auto-populate for self-care residents
-    auto_self_fields = [
-        'first_shift_bm', 'second_shift_bm', 'shower', 'shampoo',
-        'sponge_bath', 'peri_care_am', 'peri_care_pm', 'oral_care_am',
-        'oral_care_pm', 'nail_care', 'skin_care', 'shave']
-
     # Build the default texts for input fields
-    input_fields_defaults = {field: existing_data.get(field, '') for field in auto_self_fields}
+    input_fields_defaults = {field: existing_data.get(field, '') for field in AUTO_SELF_FIELDS}
 
     # Auto-populate 'Self' for self-care residents in the existing fields
     if is_supervisory_care:
-        for field in auto_self_fields:
+        for field in AUTO_SELF_FIELDS:
             input_fields_defaults[field] = 'S'
     #input_fields_defaults['first_shift_bm']
     tab_layout = [
             [sg.Text(f'Service Plan Followed (Initials)', font=(FONT_BOLD, 14))],
-            [sg.Text('1st Shift Service Plan', font=(FONT, 12)), sg.Checkbox('', key=f'CHECK_{resident_name}_first_shift_sp', enable_events=True, tooltip='Check to initial', disabled= True if existing_data.get('first_shift_sp', '') != '' else False, default=True if existing_data.get('second_shift_sp', '') != '' else False), sg.InputText(size=4, default_text=existing_data.get('first_shift_sp', ''), key=f'{resident_name}_first_shift_sp', readonly=False),
-             sg.Text('2nd Shift Service Plan', font=(FONT, 12)), sg.Checkbox('', key=f'CHECK_{resident_name}_second_shift_sp', enable_events=True, tooltip='Check to initial', disabled= True if existing_data.get('second_shift_sp', '') != '' else False, default=True if existing_data.get('second_shift_sp', '') != '' else False), sg.InputText(size=4, default_text=existing_data.get('second_shift_sp', ''), key=f'{resident_name}_second_shift_sp', readonly=False)],
+            [sg.Text('1st Shift Service Plan', font=(FONT, 12)), sg.Checkbox('', key=f'CHECK_ADL_first_shift_sp', enable_events=True, tooltip='Check to initial', disabled= True if existing_data.get('first_shift_sp', '') != '' else False, default=True if existing_data.get('first_shift_sp', '') != '' else False), sg.InputText(size=4, default_text=existing_data.get('first_shift_sp', ''), key=f'ADL_first_shift_sp', readonly=False),
+             sg.Text('2nd Shift Service Plan', font=(FONT, 12)), sg.Checkbox('', key=f'CHECK_ADL_second_shift_sp', enable_events=True, tooltip='Check to initial', disabled= True if existing_data.get('second_shift_sp', '') != '' else False, default=True if existing_data.get('second_shift_sp', '') != '' else False), sg.InputText(size=4, default_text=existing_data.get('second_shift_sp', ''), key=f'ADL_second_shift_sp', readonly=False)],
             [sg.Text("Activities (Use Activities Legend Below)", font=(FONT_BOLD, 14))],
-            [sg.Text('1st Shift 1st Activity', font=(FONT, 12)), sg.Combo(activities_choices, default_value=existing_data.get('first_shift_activity1', ''), key=f'{resident_name}_first_shift_activity1', size=(4,1), readonly=True),
-             sg.Text('1st Shift 2nd Activity', font=(FONT, 12)), sg.Combo(activities_choices, default_value=existing_data.get('first_shift_activity2', ''), key=f'{resident_name}_first_shift_activity2', size=(4,1), readonly=True)],
-            [sg.Text('1st Shift 3rd Activity', font=(FONT, 12)), sg.Combo(activities_choices, default_value=existing_data.get('first_shift_activity3', ''), key=f'{resident_name}_first_shift_activity3', size=(4,1), readonly=True),
-             sg.Text('2nd Shift 4th Activity', font=(FONT, 12)), sg.Combo(activities_choices, default_value=existing_data.get('second_shift_activity4', ''), key=f'{resident_name}_second_shift_activity4', size=(4,1), readonly=True)],
+            [sg.Text('1st Shift 1st Activity', font=(FONT, 12)), sg.Combo(activities_choices, default_value=existing_data.get('first_shift_activity1', ''), key=f'ADL_first_shift_activity1', size=(4,1), readonly=True),
+             sg.Text('1st Shift 2nd Activity', font=(FONT, 12)), sg.Combo(activities_choices, default_value=existing_data.get('first_shift_activity2', ''), key=f'ADL_first_shift_activity2', size=(4,1), readonly=True)],
+            [sg.Text('1st Shift 3rd Activity', font=(FONT, 12)), sg.Combo(activities_choices, default_value=existing_data.get('first_shift_activity3', ''), key=f'ADL_first_shift_activity3', size=(4,1), readonly=True),
+             sg.Text('2nd Shift 4th Activity', font=(FONT, 12)), sg.Combo(activities_choices, default_value=existing_data.get('second_shift_activity4', ''), key=f'ADL_second_shift_activity4', size=(4,1), readonly=True)],
              [sg.Text("BM Record Size (SM, M, L, XL, or D for Diarrhea, S for Self)", font=(FONT_BOLD, 14))],
-            [sg.Text('1st Shift Bowel Movement', font=(FONT, 12)),  sg.Combo(bm_record_choices, default_value=input_fields_defaults['first_shift_bm'], key=f'{resident_name}_first_shift_bm', size=(4,1), readonly=True),
-             sg.Text('2nd Shift Bowel Movement', font=(FONT, 12)), sg.Combo(bm_record_choices, default_value=input_fields_defaults['second_shift_bm'], key=f'{resident_name}_second_shift_bm', size=(4,1), readonly=True)],
+            [sg.Text('1st Shift Bowel Movement', font=(FONT, 12)),  sg.Combo(bm_record_choices, default_value=input_fields_defaults['first_shift_bm'], key=f'ADL_first_shift_bm', size=(4,1), readonly=True),
+             sg.Text('2nd Shift Bowel Movement', font=(FONT, 12)), sg.Combo(bm_record_choices, default_value=input_fields_defaults['second_shift_bm'], key=f'ADL_second_shift_bm', size=(4,1), readonly=True)],
             [sg.Text("ADL's (Initial or S for Self, H for Hospice)", font=(FONT_BOLD, 14))],
-            [sg.Text('Shower', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['shower'], key=f'{resident_name}_shower', size=(4,1), readonly=True),
-             sg.Text('Shampoo', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['shampoo'], key=f'{resident_name}_shampoo', size=(4,1), readonly=True),
-             sg.Text('Sponge Bath', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['sponge_bath'], key=f'{resident_name}_sponge_bath', size=(4,1), readonly=True),
-             sg.Text('Peri Care AM', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['peri_care_am'], key=f'{resident_name}_peri_care_am', size=(4,1), readonly=True),
-             sg.Text('Peri Care PM', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['peri_care_pm'], key=f'{resident_name}_peri_care_pm', size=(4,1), readonly=True)],
-            [sg.Text('Oral Care AM', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['oral_care_am'], key=f'{resident_name}_oral_care_am', size=(4,1), readonly=True),
-             sg.Text('Oral Care PM', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['oral_care_pm'], key=f'{resident_name}_oral_care_pm', size=(4,1), readonly=True),
-             sg.Text('Nail Care', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['nail_care'], key=f'{resident_name}_nail_care', size=(4,1), readonly=True),
-             sg.Text('Skin Care', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['skin_care'], key=f'{resident_name}_skin_care', size=(4,1), readonly=True),
-             sg.Text('Shave', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['shave'], key=f'{resident_name}_shave', size=(4,1), readonly=True)],
+            [sg.Text('Shower', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['shower'], key=f'ADL_shower', size=(4,1), readonly=True),
+             sg.Text('Shampoo', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['shampoo'], key=f'ADL_shampoo', size=(4,1), readonly=True),
+             sg.Text('Sponge Bath', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['sponge_bath'], key=f'ADL_sponge_bath', size=(4,1), readonly=True),
+             sg.Text('Peri Care AM', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['peri_care_am'], key=f'ADL_peri_care_am', size=(4,1), readonly=True),
+             sg.Text('Peri Care PM', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['peri_care_pm'], key=f'ADL_peri_care_pm', size=(4,1), readonly=True)],
+            [sg.Text('Oral Care AM', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['oral_care_am'], key=f'ADL_oral_care_am', size=(4,1), readonly=True),
+             sg.Text('Oral Care PM', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['oral_care_pm'], key=f'ADL_oral_care_pm', size=(4,1), readonly=True),
+             sg.Text('Nail Care', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['nail_care'], key=f'ADL_nail_care', size=(4,1), readonly=True),
+             sg.Text('Skin Care', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['skin_care'], key=f'ADL_skin_care', size=(4,1), readonly=True),
+             sg.Text('Shave', font=(FONT, 12)), sg.Combo(adl_choices, default_value=input_fields_defaults['shave'], key=f'ADL_shave', size=(4,1), readonly=True)],
             [sg.Text('Meals (Record Percentage of Meal Eaten 0-100)', font=(FONT_BOLD, 14))],
-            [sg.Text('Breakfast', font=(FONT, 12)), sg.InputText(size=4, default_text=existing_data.get('breakfast', ''), key=f'{resident_name}_breakfast'),
-             sg.Text('Lunch', font=(FONT, 12)), sg.InputText(size=4, default_text=existing_data.get('lunch', ''), key=f'{resident_name}_lunch'),
-             sg.Text('Dinner', font=(FONT, 12)), sg.InputText(size=4, default_text=existing_data.get('dinner', ''), key=f'{resident_name}_dinner'),
-             sg.Text('Snack AM', font=(FONT, 12)), sg.InputText(size=4, default_text=existing_data.get('snack_am', ''), key=f'{resident_name}_snack_am'),
-             sg.Text('Snack PM', font=(FONT, 12)), sg.InputText(size=4, default_text=existing_data.get('snack_pm', ''), key=f'{resident_name}_snack_pm'),
-             sg.Text('Water In-Take', font=(FONT, 12)), sg.InputText(size=4, default_text=existing_data.get('water_intake', ''), key=f'{resident_name}_water_intake')],
+            [sg.Text('Breakfast', font=(FONT, 12)), sg.InputText(size=4, default_text=existing_data.get('breakfast', ''), key=f'ADL_breakfast'),
+             sg.Text('Lunch', font=(FONT, 12)), sg.InputText(size=4, default_text=existing_data.get('lunch', ''), key=f'ADL_lunch'),
+             sg.Text('Dinner', font=(FONT, 12)), sg.InputText(size=4, default_text=existing_data.get('dinner', ''), key=f'ADL_dinner'),
+             sg.Text('Snack AM', font=(FONT, 12)), sg.InputText(size=4, default_text=existing_data.get('snack_am', ''), key=f'ADL_snack_am'),
+             sg.Text('Snack PM', font=(FONT, 12)), sg.InputText(size=4, default_text=existing_data.get('snack_pm', ''), key=f'ADL_snack_pm'),
+             sg.Text('Water In-Take', font=(FONT, 12)), sg.InputText(size=4, default_text=existing_data.get('water_intake', ''), key=f'ADL_water_intake')],
              [sg.Text('', expand_x=True), sg.Button('Save', key=('-ADL_SAVE-'), font=(FONT, 12), pad=((10, 10),(12,10))), sg.Button('View/Edit Current Month ADL Chart', key=('-CURRENT_ADL_CHART-'), font=(FONT, 12), pad=((10, 10),(12,10))),
              sg.Text('', expand_x=True)], [sg.Text('', expand_x=True), sg.Text('Or Search by Month and Year:', font=(FONT, 12)), sg.Text('',expand_x=True)], 
-             [sg.Text(text="", expand_x=True),sg.Text(text="Enter Month: (MM)", font=(FONT, 12)), sg.InputText(size=4, key="-ADL_MONTH-") , sg.Text("Enter Year: (YYYY)", font=(FONT, 12)), sg.InputText(size=5, key='-ADL_YEAR-'), 
-             sg.Button("Search", key='-ADL_SEARCH-', font=(FONT, 12)), sg.Text(text="", expand_x=True)]
+             [sg.Text(text="", expand_x=True),sg.Text(text="Month:", font=(FONT, 12)), sg.Combo(chart_months.get(default_year, []), default_value=default_month, size=(4,1), key="-ADL_MONTH-", readonly=True) , sg.Text("Year:", font=(FONT, 12)), sg.Combo(chart_years, default_value=default_year, size=(6,1), key='-ADL_YEAR-', readonly=True, enable_events=True), 
+             sg.Button("Search", key='-ADL_SEARCH-', font=(FONT, 12), disabled=not chart_years), sg.Text(text="", expand_x=True)]
         ]
     
     # Create the activities frame
@@ -121,30 +130,42 @@ def update_clock(window):
     window['-TIME-'].update(current_time)
 
 
-def retrieve_adl_data_from_window(window, resident_name):
-    # Define the keys as they appear in the window and database
-    adl_keys = [
-        'first_shift_sp', 'second_shift_sp', 'first_shift_activity1',
-        'first_shift_activity2', 'first_shift_activity3',
-        'second_shift_activity4',
-        'first_shift_bm', 'second_shift_bm', 'shower', 'shampoo',
-        'sponge_bath', 'peri_care_am', 'peri_care_pm', 'oral_care_am',
-        'oral_care_pm', 'nail_care', 'skin_care', 'shave', 'breakfast',
-        'lunch', 'dinner', 'snack_am', 'snack_pm', 'water_intake'
-    ]
+def update_adl_tab(window, resident_name, existing_adl_data, resident_care_levels):
+    """
+    Show another resident's ADL data in the existing tab, setting the same
+    values and checkbox states get_adl_tab_layout would build them with.
+    """
+    is_supervisory_care = is_supervisory_care_resident(resident_name, resident_care_levels)
+
+    for key in ADL_KEYS:
+        value = existing_adl_data.get(key)
+        if is_supervisory_care and key in AUTO_SELF_FIELDS:
+            value = 'S'
+        # update(value=None) would leave the previous resident's value in place
+        window[f'ADL_{key}'].update(value='' if value is None else value)
+
+    for key in SERVICE_PLAN_FIELDS:
+        initialed = existing_adl_data.get(key, '') not in ('', None)
+        window[f'CHECK_ADL_{key}'].update(value=initialed, disabled=initialed)
+
+    chart_years, chart_months, default_year, default_month = month_availability.picker_choices(
+        month_availability.available_months(config.global_config['month_availability'], resident_name, 'adl'))
+    window['-ADL_YEAR-'].update(values=chart_years, value=default_year)
+    window['-ADL_MONTH-'].update(values=chart_months.get(default_year, []), value=default_month)
+    window['-ADL_SEARCH-'].update(disabled=not chart_years)
+
 
+def retrieve_adl_data_from_window(window):
     # Initialize a dictionary to store the ADL data
     adl_data = {}
 
-    # Get the current values from the window for the specified resident
+    # Get the current values from the window
     values = window.read(timeout=10)[
         1]  # We use a timeout to read from the window non-blocking
 
     # Extract the data using the keys
-    for key in adl_keys:
-        # The keys in the window are prefixed with the resident's name
-        window_key = f'{resident_name}_{key}'
-        adl_data[key] = values.get(window_key,'').upper()  # Use .get() to handle missing keys
+    for key in ADL_KEYS:
+        adl_data[key] = values.get(f'ADL_{key}','').upper()  # Use .get() to handle missing keys
 
     return adl_data
 
@@ -1,8 +1,124 @@
+import base64
+import json
+import threading
+import time
 import requests
 import keyring
+import os
+import re
 import urllib.parse
+from datetime import datetime, timedelta
 import PySimpleGUI as sg
 from config import API_URL
+import audit_queue
+import month_cache
+
+
+# ---------------------------- Authentication ---------------------------- #
+
+# Refresh the access token this many seconds before it expires rather than waiting for a 401
+TOKEN_REFRESH_MARGIN = 30
+REQUEST_TIMEOUT = 30
+LOGIN_BUSY_RETRIES = 3
+
+_refresh_lock = threading.Lock()
+_session_expired = False
+
+
+class SessionExpired(requests.exceptions.RequestException):
+    """The access token could not be refreshed; the user has to log in again."""
+
+
+def session_expired():
+    """True once a refresh has failed, until the next successful login."""
+    return _session_expired
+
+
+def _store_tokens(result):
+    global _session_expired
+    keyring.set_password('CareTechApp', 'access_token', result['token'])
+    if result.get('refresh_token'):
+        keyring.set_password('CareTechApp', 'refresh_token', result['refresh_token'])
+    _session_expired = False
+
+
+def _token_expiry(token):
+    """Expiry time from the token's claims. The signature is the server's business, not checked here."""
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return 0.0
+
+
+def refresh_access_token(api_url, stale_token=None):
+    """
+    Exchange the stored refresh token for a new access token.
+
+    Concurrent callers share one refresh: whoever gets the lock second finds the
+    access token already replaced and returns it.
+
+    Args:
+        api_url (str): The base URL of the Flask API.
+        stale_token (str): The access token the caller found expired or rejected.
+
+    Returns:
+        str: The new access token, or None if the session cannot be refreshed.
+    """
+    global _session_expired
+    with _refresh_lock:
+        token = keyring.get_password('CareTechApp', 'access_token')
+        if token and token != stale_token and _token_expiry(token) > time.time() + TOKEN_REFRESH_MARGIN:
+            return token
+
+        refresh_token = keyring.get_password('CareTechApp', 'refresh_token')
+        if refresh_token:
+            try:
+                response = requests.post(f"{api_url}/refresh_token", json={'refresh_token': refresh_token},
+                                         timeout=REQUEST_TIMEOUT)
+                if response.status_code == 200:
+                    result = response.json()
+                    _store_tokens(result)
+                    return result['token']
+                print(f"Failed to refresh session: {response.status_code}")
+            except requests.exceptions.RequestException as e:
+                # The server could not be reached; the session itself may still be good
+                print(f"Request failed: {e}")
+                return None
+        _session_expired = True
+        return None
+
+
+def authorized_request(api_url, method, url, **kwargs):
+    """
+    Send a request with the stored access token, refreshing it when needed.
+
+    The token is refreshed shortly before it expires, and a 401 triggers one
+    refresh and retry, so callers never see an expired token.
+
+    Raises:
+        SessionExpired: No valid session remains and the user must log in again.
+        requests.exceptions.RequestException: The request itself failed.
+    """
+    kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+    token = keyring.get_password('CareTechApp', 'access_token')
+    if token and _token_expiry(token) <= time.time() + TOKEN_REFRESH_MARGIN:
+        token = refresh_access_token(api_url, token) or token
+    if not token:
+        raise SessionExpired("No authentication token found. Please log in.")
+
+    headers = dict(kwargs.pop('headers', None) or {})
+    headers['Authorization'] = f'Bearer {token}'
+    response = requests.request(method, url, headers=headers, **kwargs)
+    if response.status_code != 401:
+        return response
+
+    token = refresh_access_token(api_url, token)
+    if not token:
+        raise SessionExpired("Session expired. Please log in again.")
+    headers['Authorization'] = f'Bearer {token}'
+    return requests.request(method, url, headers=headers, **kwargs)
 
 
 # ---------------------------- users Table ---------------------------- #
@@ -65,35 +181,46 @@ def validate_login(api_url, username, password):
     """
     Validate user login credentials by sending a request to the Flask API.
 
+    The response also carries everything the client caches for the session, so
+    no further requests are needed to start it.
+
     Args:
         api_url (str): The base URL of the Flask API.
         username (str): The username of the user.
         password (str): The password of the user.
     
     Returns:
-        bool: True if the credentials are valid, False otherwise.
+        dict: On success, {'user': {'username', 'role', 'is_admin', 'initials', 'is_temp_password'},
+              'preferences': {'theme', 'font'}, 'counts': {'residents'}, 'server_version'}. None if the credentials are invalid.
     """
     data = {
         'username': username,
         'password': password
     }
     try:
-        response = requests.post(f"{api_url}/validate_login", json=data)
+        response = requests.post(f"{api_url}/validate_login", json=data, timeout=30)
+        for _ in range(LOGIN_BUSY_RETRIES):
+            if response.status_code != 503:
+                break
+            # The server is working through a burst of logins; wait our turn
+            time.sleep(float(response.headers.get('Retry-After', 2)))
+            response = requests.post(f"{api_url}/validate_login", json=data, timeout=30)
         if response.status_code == 200:
             result = response.json()
             if result.get('valid', False):
-                # store the token using keyring
-                token = result.get('token')
-                if token:
-                    keyring.set_password('CareTechApp', 'access_token', token)
-                    return True
-            return False
+                # store the tokens using keyring
+                if result.get('token'):
+                    _store_tokens(result)
+                    session = {key: result.get(key, {}) for key in ('user', 'preferences', 'counts')}
+                    session['server_version'] = result.get('server_version', '')
+                    return session
+            return None
         else:
             print("Failed to validate login credentials:", response.json())  # For debugging
-            return False
+            return None
     except requests.exceptions.RequestException as e:
         print(f"Request failed: {e}")
-        return False
+        return None
 
 
 def create_user(api_url, username, password, user_role='User', is_temp_password=True, initials=''):
@@ -111,13 +238,6 @@ def create_user(api_url, username, password, user_role='User', is_temp_password=
     Returns:
         bool: True if the user was successfully created, False otherwise.
     """
-    # Retrieve the stored token
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}'}
     data = {
         'username': username,
         'password': password,
@@ -127,12 +247,10 @@ def create_user(api_url, username, password, user_role='User', is_temp_password=
     }
 
     try:
-        response = requests.post(f"{api_url}/create_user", json=data, headers=headers)
+        response = authorized_request(api_url, 'post', f"{api_url}/create_user", json=data)
         if response.status_code == 201:
             print("User created successfully.")
             return True
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print(f"Failed to create user: {response.json()}")
             return False
@@ -181,28 +299,19 @@ def update_password(api_url, username, new_password):
     Returns:
         bool: True if the password was changed successfully, False otherwise.
     """
-    # Retrieve the stored token
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}'}
     data = {
         'username': username,
         'new_password': new_password
     }
 
     try:
-        response = requests.post(f"{api_url}/update_password", json=data, headers=headers)
+        response = authorized_request(api_url, 'post', f"{api_url}/update_password", json=data)
         if response.status_code == 200:
             print("Password changed successfully.")
             return True
         elif response.status_code == 404:
             print("User not found.")
             return False
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print(f"Failed to change password: {response.json()}")
             return False
@@ -224,7 +333,7 @@ def is_admin(api_url, username):
     """
     data = {'username': username}
     try:
-        response = requests.post(f"{api_url}/is_admin", json=data)
+        response = authorized_request(api_url, 'post', f"{api_url}/is_admin", json=data)
         if response.status_code == 200:
             result = response.json()
             return result.get('is_admin', False)
@@ -249,20 +358,11 @@ def get_user_initials(api_url):
     Returns:
         str: The initials of the current user, or an empty string on failure.
     """
-    # Retrieve the stored token
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return ''
-
-    headers = {'Authorization': f'Bearer {token}'}
     try:
-        response = requests.get(f"{api_url}/get_user_initials", headers=headers)
+        response = authorized_request(api_url, 'get', f"{api_url}/get_user_initials")
         if response.status_code == 200:
             result = response.json()
             return result.get('initials', '')
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to fetch user initials:", response.json())
             return ''
@@ -281,18 +381,10 @@ def get_all_users(api_url):
     Returns:
         list: A list of usernames or None on failure.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return None
-
-    headers = {'Authorization': f'Bearer {token}'}
     try:
-        response = requests.get(f"{api_url}/get_all_users", headers=headers)
+        response = authorized_request(api_url, 'get', f"{api_url}/get_all_users")
         if response.status_code == 200:
             return response.json
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print(f"Failed to fetch users: {response.json()}")
             return None
@@ -312,21 +404,13 @@ def remove_user(api_url, username):
     Returns:
         bool: True if the user was removed successfully, False otherwise.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}'}
     data = {"username": username}
 
     try:
-        response = requests.post(f"{api_url}/remove_user", json=data, headers=headers)
+        response = authorized_request(api_url, 'post', f"{api_url}/remove_user", json=data)
         if response.status_code == 200:
             print(f"User {username} removed successfully.")
             return True
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print(f"Failed to remove user: {response.json()}")
             return False
@@ -348,10 +432,9 @@ def save_user_preferences(api_url, theme, font):
     Returns:
         bool: True if the preferences were saved successfully, False otherwise.
     """
-    headers = {'Content-Type': 'application/json'}
     data = {'theme': theme, 'font': font}
     try:
-        response = requests.post(f"{api_url}/save_user_preferences", json=data, headers=headers)
+        response = authorized_request(api_url, 'post', f"{api_url}/save_user_preferences", json=data)
         if response.status_code == 200:
             print("User preferences saved successfully.")
             return True
@@ -390,17 +473,18 @@ def get_user_preferences(api_url):
 # ------------------------------------------------------------------------------ audit_logs Table ---------------------------------------------------- #
 
 def log_action(api_url, username, activity, details):
-    data = {
-        "username": username,
-        "activity": activity,
-        "details": details
-    }
-    response = requests.post(f"{api_url}/log_action", json=data)
-    if response.status_code == 200:
-        print("Action logged successfully")
-    else:
-        print("Failed to log action")
-    
+    """
+    Queue an audit log entry. It is sent to the server in the background, in
+    batches, by audit_queue, so this never blocks on the network.
+
+    Args:
+        api_url (str): The base URL of the Flask API.
+        username (str): The user who performed the action.
+        activity (str): Short name of the action.
+        details (str): Free-text description of the action.
+    """
+    audit_queue.log_action(api_url, username, activity, details)
+
 
 def fetch_audit_logs(api_url, last_10_days=False, username='', action='', date=''):
     """
@@ -417,13 +501,6 @@ def fetch_audit_logs(api_url, last_10_days=False, username='', action='', date='
         list: A list of audit log entries or an empty list on failure.
     """
     
-    # Retrieve the stored token
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-    
-    headers = {'Authorization': f'Bearer {token}'}
     params = {
         'last_10_days': last_10_days,
         'username': username,
@@ -432,11 +509,9 @@ def fetch_audit_logs(api_url, last_10_days=False, username='', action='', date='
     }
 
     try:
-        response = requests.get(f"{api_url}/fetch_audit_logs", headers=headers, params=params)
+        response = authorized_request(api_url, 'get', f"{api_url}/fetch_audit_logs", params=params)
         if response.status_code == 200:
             return response.json()
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to fetch audit logs:", response.text)
             return []
@@ -445,6 +520,87 @@ def fetch_audit_logs(api_url, last_10_days=False, username='', action='', date='
         return []
 
 
+def search_audit_logs(api_url, query, page=1, per_page=50, username='', action='', date=''):
+    """
+    Full-text search of audit log details, best match first.
+
+    Args:
+        api_url (str): The base URL of the Flask API.
+        query (str): Words to find (all must match); "quoted phrases" match exactly.
+        page (int): 1-based page of results.
+        per_page (int): Results per page.
+        username (str): Filter logs by username.
+        action (str): Filter logs by action.
+        date (str): Filter logs by specific date (YYYY-MM-DD).
+
+    Returns:
+        dict: {'results': [...], 'page': int, 'per_page': int, 'has_more': bool},
+              or None on failure.
+    """
+    params = {
+        'q': query,
+        'page': page,
+        'per_page': per_page,
+        'username': username,
+        'action': action
+    }
+    if date:
+        day = datetime.strptime(date, '%Y-%m-%d')
+        params['start'] = day.strftime('%Y-%m-%d')
+        params['end'] = (day + timedelta(days=1)).strftime('%Y-%m-%d')
+
+    try:
+        response = authorized_request(api_url, 'get', f"{api_url}/search_audit_logs", params=params, timeout=15)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            print("Failed to search audit logs:", response.text)
+            return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request failed: {e}")
+        return None
+
+
+def fetch_audit_counts(api_url, start_date, end_date, group_by=('day', 'username', 'action'), username='', action='', start_hour=None, end_hour=None):
+    """
+    Fetch pre-aggregated audit activity counts from the server.
+
+    Args:
+        api_url (str): The base URL of the Flask API.
+        start_date (str): First day included (YYYY-MM-DD).
+        end_date (str): Last day included (YYYY-MM-DD).
+        group_by (iterable): Any of 'day', 'hour', 'username', 'action'.
+        username (str): Filter counts by username.
+        action (str): Filter counts by action.
+        start_hour (int): Optional first hour of day included (0-23).
+        end_hour (int): Optional hour of day the window ends before; may wrap past midnight.
+
+    Returns:
+        dict: {'counts': [{<group_by keys>, 'count': int}, ...], 'total': int}, or None on failure.
+    """
+    params = {
+        'start': start_date,
+        'end': (datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d'),
+        'group_by': ','.join(group_by),
+        'username': username,
+        'action': action
+    }
+    if start_hour is not None and end_hour is not None:
+        params['start_hour'] = start_hour
+        params['end_hour'] = end_hour
+
+    try:
+        response = authorized_request(api_url, 'get', f"{api_url}/audit_counts", params=params, timeout=15)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            print("Failed to fetch audit counts:", response.text)
+            return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request failed: {e}")
+        return None
+
+
  # ----------------------------------------------------------------- residents Table ------------------------------------------------------------- #
         
 def get_resident_count(api_url):
@@ -480,20 +636,11 @@ def get_resident_care_level(api_url):
     Returns:
         list: A list of care levels, or an empty list on failure.
     """
-    # Retrieve the stored token
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}'}
     try:
-        response = requests.get(f"{api_url}/get_resident_care_level", headers=headers)
+        response = authorized_request(api_url, 'get', f"{api_url}/get_resident_care_level")
         if response.status_code == 200:
             result = response.json()
             return result.get('residents', [])
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to fetch resident care levels:", response.json())  # For debugging
             return []
@@ -513,21 +660,12 @@ def get_resident_names(api_url):
         list: A list of resident names, or an empty list on failure.
         
     """
-    # Retrieve the stored token
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}'}
     try:
-        response = requests.get(f"{api_url}/get_resident_names", headers=headers)
+        response = authorized_request(api_url, 'get', f"{api_url}/get_resident_names")
         if response.status_code == 200:
             # Assuming the JSON structure includes a "names" key
             names = response.json().get('names', [])
             return names
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to fetch resident names:", response.json())  # For debugging
             return []
@@ -549,25 +687,16 @@ def insert_resident(api_url, name, date_of_birth, level_of_care):
     Returns:
         bool: True if the resident was inserted successfully, False otherwise.
     """
-    # Retrieve the stored token
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}'}
     data = {
         "name": name,
         "date_of_birth": date_of_birth,
         "level_of_care": level_of_care
     }
     try:
-        response = requests.post(f"{api_url}/insert_resident", json=data, headers=headers)
+        response = authorized_request(api_url, 'post', f"{api_url}/insert_resident", json=data)
         if response.status_code == 201:
             print("Resident inserted successfully.")
             return True
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to insert resident:", response.json())
             return False
@@ -587,20 +716,12 @@ def remove_resident(api_url, resident_name):
     Returns:
         bool: True if the resident was removed successfully, False otherwise.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}'}
     data = {"resident_name": resident_name}
     try:
-        response = requests.post(f"{api_url}/remove_resident", json=data, headers=headers)
+        response = authorized_request(api_url, 'post', f"{api_url}/remove_resident", json=data)
         if response.status_code == 200:
             print("Resident removed successfully.")
             return True
-        elif response.status_code == 401:
-            return 'token_expired'
         elif response.status_code == 403:
             print("Unauthorized to remove resident.")
             return False
@@ -628,22 +749,13 @@ def fetch_adl_data_for_resident(api_url, resident_name):
     Returns:
         dict: ADL data for the resident, or an empty dict on failure.
     """
-    # Retrieve the stored token
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return {}
-
-    headers = {'Authorization': f'Bearer {token}'}
     encoded_resident_name = urllib.parse.quote(resident_name)  # URL-encode the resident name
     url = f"{api_url}/fetch_adl_data_for_resident/{encoded_resident_name}"
     try:
-        response = requests.get(url, headers=headers)
+        response = authorized_request(api_url, 'get', url)
         if response.status_code == 200:
             result = response.json()
             return result
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to fetch ADL data:", response.json())
             return {}
@@ -656,23 +768,14 @@ def fetch_adl_chart_data_for_month(api_url, resident_name, year_month):
     """
     Fetch ADL data for a specific resident for a specific month from the Flask API.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return []
-
-    headers = {'Authorization': f'Bearer {token}'}
     encoded_resident_name = urllib.parse.quote(resident_name)
     # Updated to send year_month as a query parameter
     url = f"{api_url}/fetch_adl_chart_data_for_month/{encoded_resident_name}?year_month={year_month}"
     
     try:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            result = response.json()
+        result, response = _fetch_month_data(api_url, 'adl', resident_name, year_month, url)
+        if result is not None:
             return result
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to fetch ADL chart data:", response.json())
             return []
@@ -693,25 +796,16 @@ def save_adl_data_from_management_window(api_url, resident_name, adl_data, audit
     Returns:
         bool: True if the data was saved successfully, False otherwise.
     """
-    # Retrieve the stored token
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}'}
     data = {
         "resident_name": resident_name,
         "adl_data": adl_data,
         "audit_description": audit_description
     }
     try:
-        response = requests.post(f"{api_url}/save_adl_data_from_management_window", json=data, headers=headers)
+        response = authorized_request(api_url, 'post', f"{api_url}/save_adl_data_from_management_window", json=data)
         if response.status_code == 200:
             print("ADL data saved successfully.")
             return True
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to save ADL data:", response.json())
             return False
@@ -720,34 +814,6 @@ def save_adl_data_from_management_window(api_url, resident_name, adl_data, audit
         return False
 
 
-def does_adl_chart_exist(api_url, resident_name, year_month):
-    """
-    Checks if ADL chart data exists for a specific resident and month.
-
-    Args:
-        api_url (str): The base URL of the Flask API.
-        resident_name (int): The Name of the resident.
-        year_month (str): The year and month in 'YYYY-MM' format.
-
-    Returns:
-        bool: True if the ADL chart data exists, False otherwise.
-    """
-    url = f"{api_url}/does_adl_chart_exist/{resident_name}/{year_month}"
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            result = response.json()
-            return result.get('exists', False)
-        elif response.status_code == 401:
-            return 'token_expired'
-        else:
-            print(f"Failed to check ADL chart existence: {response.json()}")
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"Request failed: {e}")
-        return False
-
-
 def save_adl_data_from_chart_window(api_url, resident_name, year_month, adl_data):
     """
     Save ADL data for a specific resident and month.
@@ -761,12 +827,6 @@ def save_adl_data_from_chart_window(api_url, resident_name, year_month, adl_data
     Returns:
         bool: True if the data was saved successfully, False otherwise.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}'}
     data = {
         "resident_name": resident_name,
         "year_month": year_month,
@@ -774,12 +834,10 @@ def save_adl_data_from_chart_window(api_url, resident_name, year_month, adl_data
     }
 
     try:
-        response = requests.post(f"{api_url}/save_adl_data_from_chart", json=data, headers=headers)
+        response = authorized_request(api_url, 'post', f"{api_url}/save_adl_data_from_chart", json=data)
         if response.status_code == 200:
             print("ADL data saved successfully.")
             return True
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to save ADL data:", response.json())
             return False
@@ -809,13 +867,6 @@ def insert_medication(api_url, resident_name, medication_name, dosage, instructi
     Returns:
         bool: True if the medication was inserted successfully, False otherwise.
     """
-    # Retrieve the stored token
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
     payload = {
         "resident_name": resident_name,
         "medication_name": medication_name,
@@ -828,12 +879,10 @@ def insert_medication(api_url, resident_name, medication_name, dosage, instructi
     }
 
     try:
-        response = requests.post(f"{api_url}/insert_medication", json=payload, headers=headers)
+        response = authorized_request(api_url, 'post', f"{api_url}/insert_medication", json=payload)
         if response.status_code == 200:
             print("Medication inserted successfully.")
             return True
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print(f"Failed to insert medication: {response.text}")
             return False
@@ -853,23 +902,14 @@ def fetch_medications_for_resident(api_url, resident_name):
     Returns:
         dict: Medication data for the resident, or an empty dict on failure.
     """
-    # Retrieve the stored token
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return {}
-
-    headers = {'Authorization': f'Bearer {token}'}
     # URL-encode the resident name to handle spaces and special characters
     encoded_resident_name = requests.utils.quote(resident_name)
     full_url = f"{api_url}/fetch_medications_for_resident/{encoded_resident_name}"
 
     try:
-        response = requests.get(full_url, headers=headers)
+        response = authorized_request(api_url, 'get', full_url)
         if response.status_code == 200:
             return response.json()
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to fetch medications:", response.text)
             return {}
@@ -890,20 +930,12 @@ def fetch_discontinued_medications(api_url, resident_name):
     Returns:
         dict: Discontinued medication names and dates, or an empty dict on failure.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return {}
-
-    headers = {'Authorization': f'Bearer {token}'}
     url = f"{api_url}/fetch_discontinued_medications/{requests.utils.quote(resident_name)}"
 
     try:
-        response = requests.get(url, headers=headers)
+        response = authorized_request(api_url, 'get', url)
         if response.status_code == 200:
             return response.json()
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to fetch discontinued medications:", response.text)
             return {}
@@ -924,13 +956,6 @@ def filter_active_medications(api_url, resident_name, medication_names):
     Returns:
         list: A list of active medication names for the resident, or an empty list on failure.
     """
-    # Retrieve the stored token
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return []
-
-    headers = {'Authorization': f'Bearer {token}'}
     data = {
         "resident_name": resident_name,
         "medication_names": medication_names
@@ -939,12 +964,10 @@ def filter_active_medications(api_url, resident_name, medication_names):
     full_url = f"{api_url}/filter_active_medications"
 
     try:
-        response = requests.post(full_url, json=data, headers=headers)
+        response = authorized_request(api_url, 'post', full_url, json=data)
         if response.status_code == 200:
             # Expecting the server to return a list of active medication names
             return response.json().get('active_medications', [])
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to filter medications:", response.text)
             return []
@@ -964,18 +987,10 @@ def save_non_medication_order(api_url, resident_name, order_data):
         resident_name (str): The name of the resident for whom the order is being added.
         order_data (dict): The order data to be sent to the server.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return
-
-    headers = {'Authorization': f'Bearer {token}'}
-    response = requests.post(f"{api_url}/add_non_medication_order/{resident_name}", json=order_data, headers=headers)
+    response = authorized_request(api_url, 'post', f"{api_url}/add_non_medication_order/{resident_name}", json=order_data)
 
     if response.status_code == 200:
         print("Non-medication order added successfully.")
-    elif response.status_code == 401:
-            return 'token_expired'
     else:
         print(f"Failed to add non-medication order: {response.text}")
 
@@ -991,18 +1006,10 @@ def fetch_all_non_medication_orders(api_url, resident_name):
     Returns:
         A list of non-medication orders for the resident, or an error message.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return []
-
-    headers = {'Authorization': f'Bearer {token}'}
-    response = requests.get(f"{api_url}/fetch_non_medication_orders/{resident_name}", headers=headers)
+    response = authorized_request(api_url, 'get', f"{api_url}/fetch_non_medication_orders/{resident_name}")
 
     if response.status_code == 200:
         return response.json()
-    elif response.status_code == 401:
-            return 'token_expired'
     else:
         print(f"Failed to fetch non-medication orders: {response.text}")
         return []
@@ -1019,21 +1026,13 @@ def get_controlled_medication_details(api_url, resident_name, medication_name):
     Returns:
         tuple: A tuple containing the medication count and form, or (None, None) on failure.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return None, None
-
-    headers = {'Authorization': f'Bearer {token}'}
     url = f"{api_url}/get_controlled_medication_details/{resident_name}/{medication_name}"
 
     try:
-        response = requests.get(url, headers=headers)
+        response = authorized_request(api_url, 'get', url)
         if response.status_code == 200:
             data = response.json()
             return data.get('count'), data.get('form')
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to fetch controlled medication details:", response.json())
             return None, None
@@ -1056,23 +1055,14 @@ def fetch_emar_data_for_resident(api_url, resident_name):
         dict: A dictionary containing eMAR data organized by medication name and time slot,
               or an empty dictionary if no data is found or an error occurs.
     """
-    # Retrieve the stored token
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return {}
-
-    headers = {'Authorization': f'Bearer {token}'}
     # URL-encode the resident name to handle spaces and special characters
     encoded_resident_name = requests.utils.quote(resident_name)
     full_url = f"{api_url}/fetch_emar_data_for_resident/{encoded_resident_name}"
 
     try:
-        response = requests.get(full_url, headers=headers)
+        response = authorized_request(api_url, 'get', full_url)
         if response.status_code == 200:
             return response.json()
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to fetch eMAR data:", response.text)
             return {}
@@ -1092,21 +1082,13 @@ def fetch_emar_data_for_resident_audit_log(api_url, resident_name):
     Returns:
         list: A list of dictionaries, each containing eMAR data for the resident for today's date. Returns an empty list on failure.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return []
-
-    headers = {'Authorization': f'Bearer {token}'}
     url = f"{api_url}/fetch_emar_data_for_resident_audit_log/{resident_name}"
     
     try:
-        response = requests.get(url, headers=headers)
+        response = authorized_request(api_url, 'get', url)
         if response.status_code == 200:
             emar_data = response.json()
             return emar_data
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print(f"Failed to fetch eMAR data for {resident_name}:", response.json())
             return []
@@ -1115,6 +1097,41 @@ def fetch_emar_data_for_resident_audit_log(api_url, resident_name):
         return []
 
 
+def _fetch_month_data(api_url, kind, resident_name, year_month, url):
+    """
+    GET one resident-month of chart data. For months the server reports closed, the
+    request carries the cached entry's ETag and a 304 is answered from month_cache.
+
+    Returns:
+        tuple: (data, response); data is None on failure.
+    """
+    cache = month_cache.get_month_cache()
+    if cache and not month_cache.closed_months_known():
+        fetch_closed_months(api_url)
+    if not month_cache.is_closed_month(year_month):
+        cache = None
+    key = month_cache.cache_key(kind, resident_name, year_month)
+    cached = cache.get(key) if cache else None
+
+    headers = {'If-None-Match': cached[1]} if cached and cached[1] else {}
+    response = authorized_request(api_url, 'get', url, headers=headers)
+    if response.status_code == 304 and cached:
+        return cached[0], response
+    if response.status_code != 200:
+        return None, response
+
+    data = response.json()
+    # Closed months are served from immutable artefacts; anything else is live data
+    frozen = 'immutable' in response.headers.get('Cache-Control', '')
+    if cache and frozen:
+        cache.put(key, data, response.headers.get('ETag'))
+    elif cache:
+        cache.discard(key)  # Reopened since the closed months were fetched
+    if frozen != month_cache.is_closed_month(year_month):
+        month_cache.forget_closed_months()
+    return data, response
+
+
 def fetch_emar_data_for_month(api_url, resident_name, year_month):
     """
     Fetch eMAR data for a specific resident for a specific month from the Flask API.
@@ -1127,21 +1144,12 @@ def fetch_emar_data_for_month(api_url, resident_name, year_month):
     Returns:
         list: A list of dictionaries containing eMAR data for the resident, or an empty list on failure.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return []
-
-    headers = {'Authorization': f'Bearer {token}'}
     url = f"{api_url}/fetch_emar_data_for_month/{resident_name}/{year_month}"
     
     try:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            emar_data = response.json()
+        emar_data, response = _fetch_month_data(api_url, 'emar', resident_name, year_month, url)
+        if emar_data is not None:
             return emar_data
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to fetch eMAR data:", response.json())
             return []
@@ -1162,21 +1170,13 @@ def save_emar_data_from_management_window(api_url, emar_data, audit_description)
     Returns:
         Response from the API.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
     payload = {"emar_data": emar_data, "audit_description": audit_description}
 
     try:
-        response = requests.post(f"{api_url}/save_emar_data", json=payload, headers=headers)
+        response = authorized_request(api_url, 'post', f"{api_url}/save_emar_data", json=payload)
         if response.status_code in [200, 201]:
             print("EMAR data saved successfully.")
             return response.json()
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print(f"Failed to save EMAR data: {response.text}")
             return response.json()
@@ -1185,32 +1185,6 @@ def save_emar_data_from_management_window(api_url, emar_data, audit_description)
         return {}
 
 
-def does_emar_chart_exist(api_url, resident_name, year_month):
-    """
-    Checks if eMARs chart data exists for a specific resident and month by resident name.
-
-    Args:
-        api_url (str): The base URL of the Flask API.
-        resident_name (str): The name of the resident.
-        year_month (str): The year and month in 'YYYY-MM' format.
-
-    Returns:
-        bool: True if the eMARs chart data exists, False otherwise.
-    """
-    url = f"{api_url}/does_emars_chart_exist/{resident_name}/{year_month}"
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            result = response.json()
-            return result.get('exists', False)
-        else:
-            print(f"Failed to check eMARs chart existence for resident {resident_name}: {response.json()}")
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"Request failed: {e}")
-        return False
-
-
 def save_prn_administration_data(api_url, resident_name, medication_name, admin_data):
     """
     Saves PRN administration data for a resident and medication.
@@ -1224,12 +1198,6 @@ def save_prn_administration_data(api_url, resident_name, medication_name, admin_
     Returns:
         bool: True if the data was saved successfully, False otherwise.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
     payload = {
         'resident_name': resident_name,
         'medication_name': medication_name,
@@ -1237,12 +1205,10 @@ def save_prn_administration_data(api_url, resident_name, medication_name, admin_
     }
 
     try:
-        response = requests.post(f"{api_url}/save_prn_administration", json=payload, headers=headers)
+        response = authorized_request(api_url, 'post', f"{api_url}/save_prn_administration", json=payload)
         if response.status_code == 201:
             print("Administration data saved successfully.")
             return True
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print(f"Failed to save administration data: {response.json()}")
             return False
@@ -1265,21 +1231,13 @@ def fetch_prn_data_for_day(api_url, resident_name, medication_name, year_month,
     Returns:
         list: A list of dictionaries containing PRN data for the specified criteria, or None on failure.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return None
-
-    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
     url = f"{api_url}/fetch_prn_data_for_day/{resident_name}/{medication_name}/{year_month}/{day}"
 
     try:
-        response = requests.get(url, headers=headers)
+        response = authorized_request(api_url, 'get', url)
         if response.status_code == 200:
             prn_data = response.json()
             return prn_data
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print(f"Failed to fetch PRN data: {response.json()}")
             return None
@@ -1302,21 +1260,13 @@ def fetch_monthly_medication_data(api_url, resident_name, medication_name, year_
     Returns:
         list: A list of tuples containing medication data for the specified month, or an empty list on failure.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return []
-
-    headers = {'Authorization': f'Bearer {token}'}
     url = f"{api_url}/fetch_monthly_medication_data/{resident_name}/{medication_name}/{year_month}/{medication_type}"
 
     try:
-        response = requests.get(url, headers=headers)
+        response = authorized_request(api_url, 'get', url)
         if response.status_code == 200:
             medication_data = response.json()
             return medication_data
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to fetch monthly medication data:", response.json())
             return []
@@ -1339,12 +1289,6 @@ def save_controlled_administration_data(api_url, resident_name, medication_name,
     Returns:
         bool: True if the data was saved successfully, False otherwise.
     """
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
     data = {
         'resident_name': resident_name,
         'medication_name': medication_name,
@@ -1353,11 +1297,9 @@ def save_controlled_administration_data(api_url, resident_name, medication_name,
     }
 
     try:
-        response = requests.post(f"{api_url}/save_controlled_administration", json=data, headers=headers)
+        response = authorized_request(api_url, 'post', f"{api_url}/save_controlled_administration", json=data)
         if response.status_code == 200:
             return True
-        elif response.status_code == 401:
-            return 'token_expired'
         else:
             print("Failed to save controlled medication administration data:", response.json())
             return False
@@ -1367,30 +1309,26 @@ def save_controlled_administration_data(api_url, resident_name, medication_name,
 
 
 def save_emar_data_from_chart_window(api_url, resident_name, year_month, values):
-    token = keyring.get_password('CareTechApp', 'access_token')
-    if not token:
-        print("No authentication token found. Please log in.")
-        return False
-
-    headers = {'Authorization': f'Bearer {token}'}
     emar_data = []
 
-    num_days = 31
-    for day in range(1, num_days + 1):
-        date_str = f"{year_month}-{str(day).zfill(2)}"
-        
-        for key, value in values.items():
-            if key.startswith('-') and key.endswith(f'-{day}-') and value.strip():
-                parts = key.strip('-').split('_')
-                medication_name = '_'.join(parts[:-1])  # Rejoin all parts except the last one
-                time_slot = parts[-1].split('-')[0]
-
-                emar_data.append({
-                    'chart_date': date_str,
-                    'medication_name': medication_name,
-                    'time_slot': time_slot,
-                    'administered': value
-                })
+    # Single pass over the window keys ('-{medication}_{time_slot}-{day}-') so the
+    # server receives the whole month as one batch for a single bulk upsert
+    for key, value in values.items():
+        if not (isinstance(key, str) and key.startswith('-') and key.endswith('-')):
+            continue
+        if not (isinstance(value, str) and value.strip()):
+            continue
+        cell, _, day = key.strip('-').rpartition('-')
+        medication_name, _, time_slot = cell.rpartition('_')
+        if not (day.isdigit() and 1 <= int(day) <= 31 and medication_name):
+            continue
+
+        emar_data.append({
+            'chart_date': f"{year_month}-{day.zfill(2)}",
+            'medication_name': medication_name,
+            'time_slot': time_slot,
+            'administered': value
+        })
 
     if not emar_data:
         print("No eMAR data to save.")
@@ -1402,12 +1340,10 @@ def save_emar_data_from_chart_window(api_url, resident_name, year_month, values)
         "emar_data": emar_data
     }
 
-    response = requests.post(f"{api_url}/save_emar_data_from_chart", json=data, headers=headers)
+    response = authorized_request(api_url, 'post', f"{api_url}/save_emar_data_from_chart", json=data)
     if response.status_code == 200:
         print("eMAR data saved successfully.")
         return True
-    elif response.status_code == 401:
-        return 'token_expired'
     else:
         print(f"Failed to save eMAR data: {response.json()}")
         return False
@@ -1604,3 +1540,126 @@ def remove_meal(api_url, meal_type, meal_option):
     except requests.exceptions.RequestException as e:
         print(f"Request failed: {e}")
         return False
+
+
+# --------------------------------- month_availability ------------------------------------- #
+
+def fetch_month_availability(api_url):
+    """
+    Fetch which months have eMAR, ADL or non-med data for every resident, in one request.
+
+    Returns:
+        dict: {resident_name: {kind: {'YYYY': bitmap of months}}} (decode with
+              month_availability.available_months), or None on failure.
+    """
+    try:
+        response = authorized_request(api_url, 'get', f"{api_url}/month_availability")
+        if response.status_code == 200:
+            return response.json().get('residents', {})
+        print("Failed to fetch month availability:", response.text)
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request failed: {e}")
+        return None
+
+
+# --------------------------------- closed_months ------------------------------------------- #
+
+def close_month(api_url, year_month):
+    """
+    Close a month: the server freezes its eMAR and ADL data and precomputes charts, summaries and PDFs.
+
+    Args:
+        api_url (str): The base URL of the Flask API.
+        year_month (str): The month to close in 'YYYY-MM' format.
+
+    Returns:
+        tuple: (True, result dict) on success, or (False, error message).
+    """
+    try:
+        response = authorized_request(api_url, 'post', f"{api_url}/close_month", json={'year_month': year_month},
+                                      timeout=300)
+        if response.status_code == 200:
+            return True, response.json()
+        return False, response.json().get('error', 'Failed to close month')
+    except requests.exceptions.RequestException as e:
+        print(f"Request failed: {e}")
+        return False, str(e)
+
+
+def reopen_month(api_url, year_month):
+    """
+    Reopen a closed month so its charts can be corrected.
+
+    Returns:
+        tuple: (True, message) on success, or (False, error message).
+    """
+    try:
+        response = authorized_request(api_url, 'post', f"{api_url}/reopen_month", json={'year_month': year_month})
+        result = response.json()
+        if response.status_code == 200:
+            return True, result.get('message', '')
+        return False, result.get('error', 'Failed to reopen month')
+    except requests.exceptions.RequestException as e:
+        print(f"Request failed: {e}")
+        return False, str(e)
+
+
+def fetch_closed_months(api_url):
+    """
+    Fetch the closed months, and record them as the months month_cache may cache.
+
+    Returns:
+        list: [{'month', 'closed_by', 'closed_at'}] newest first, or an empty list on failure.
+    """
+    try:
+        response = authorized_request(api_url, 'get', f"{api_url}/closed_months")
+        if response.status_code == 200:
+            months = response.json().get('months', [])
+            month_cache.set_closed_months(months)
+            return months
+        print("Failed to fetch closed months:", response.text)
+        return []
+    except requests.exceptions.RequestException as e:
+        print(f"Request failed: {e}")
+        return []
+
+
+def download_month_artefacts(api_url, year_month, directory):
+    """
+    Save a closed month's chart PDFs and summaries into a directory (month-end survey prep).
+
+    Args:
+        api_url (str): The base URL of the Flask API.
+        year_month (str): The closed month in 'YYYY-MM' format.
+        directory (str): Where the files are written.
+
+    Returns:
+        list: Paths of the files written; empty on failure.
+    """
+    file_names = {'emar_pdf': ('eMAR', 'pdf'), 'adl_pdf': ('ADL_Chart', 'pdf'), 'summary': ('Summary', 'json')}
+    try:
+        response = authorized_request(api_url, 'get', f"{api_url}/month_artefacts/{year_month}")
+        if response.status_code != 200:
+            print("Failed to fetch month artefacts:", response.text)
+            return []
+        paths = []
+        for resident_name, artefacts in response.json()['artefacts'].items():
+            for kind, digest in artefacts.items():
+                if kind not in file_names:
+                    continue
+                body = authorized_request(api_url, 'get', f"{api_url}/artefacts/{digest}")
+                if body.status_code != 200:
+                    print(f"Failed to download {kind} for {resident_name or 'facility'}: {body.status_code}")
+                    continue
+                label, extension = file_names[kind]
+                # Resident names come from the server; keep them from naming a path outside `directory`
+                name = os.path.basename(re.sub(r'[\\/:]', '_', resident_name or 'Facility')).lstrip('.') or 'Resident'
+                path = os.path.join(directory, f"{name}_{label}_{year_month}.{extension}")
+                with open(path, 'wb') as f:
+                    f.write(body.content)
+                paths.append(path)
+        return paths
+    except (requests.exceptions.RequestException, OSError) as e:
+        print(f"Failed to download month artefacts: {e}")
+        return []
@@ -0,0 +1,225 @@
+"""
+Background, batched delivery of audit log events to the API server.
+
+`log_action` only appends the event to an in-process queue and returns. A daemon
+thread sends queued events to `/log_actions` in batches, either when
+`batch_size` events are waiting or every `flush_interval` seconds. If a send
+fails, the batch goes back to the front of the queue and is retried with
+backoff. Events still queued at interpreter exit (or beyond `max_pending`) are
+appended to a JSON-lines spill file. The next run loads that file back into the
+queue, so an offline server or a closed client does not lose audit entries.
+
+The server logs a batch under the user of the access token it was sent with,
+so a batch only ever holds one user's events and is sent while that user is
+logged in. Events of another user wait (and spill at exit) until they log in
+again.
+"""
+import atexit
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+import requests
+import config
+
+
+def _current_user():
+    return config.global_config.get('logged_in_user')
+
+
+class AuditQueue:
+    def __init__(self, api_url, spill_path=None, batch_size=100, flush_interval=2.0, timeout=5, max_pending=10000):
+        """
+        Args:
+            api_url (str): The base URL of the Flask API.
+            spill_path (str): JSON-lines file holding events that could not be sent.
+            batch_size (int): Maximum number of events per request.
+            flush_interval (float): Seconds between flushes of a partial batch.
+            timeout (float): Seconds before a batch request is abandoned and retried.
+            max_pending (int): Events kept in memory before new ones spill to disk.
+        """
+        self.api_url = api_url
+        self.spill_path = spill_path or config.AUDIT_SPILL_PATH
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._held = []  # Events of users other than the one logged in
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._load_spill()
+
+    def put(self, username, activity, details):
+        """Queue an audit event, stamped with the client-side time it happened."""
+        event = {
+            'username': username,
+            'activity': activity,
+            'details': details,
+            'log_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with self._cond:
+            if self._stopping or len(self._pending) >= self.max_pending:
+                self._spill([event])
+            else:
+                self._pending.append(event)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is None and not self._stopping:
+                self._thread = threading.Thread(target=self._run, name='audit-queue', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _take_batch(self):
+        """Up to batch_size leading events, all of the same user."""
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            if batch and self._pending[0].get('username') != batch[0].get('username'):
+                break
+            batch.append(self._pending.popleft())
+        return batch
+
+    def _release_held(self):
+        """Move the logged-in user's held events back to the front of the queue."""
+        user = _current_user()
+        if user is None or not self._held:
+            return
+        released = [event for event in self._held if event.get('username') == user]
+        if released:
+            self._held = [event for event in self._held if event.get('username') != user]
+            self._pending.extendleft(reversed(released))
+
+    def _deliver(self, batch):
+        """
+        Returns:
+            bool: False when the batch should be retried later. A batch of a user
+                  who is not the one logged in is held and counts as handled.
+        """
+        user = _current_user()
+        if user is None:
+            return False  # Logged out (or not yet logged in); no token to send with
+        if batch[0].get('username') != user:
+            with self._cond:
+                if self._stopping:
+                    self._spill(batch)
+                else:
+                    self._held.extend(batch)
+            return True
+        return self._send(batch)
+
+    def _run(self):
+        backoff = self.flush_interval
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopping or len(self._pending) >= self.batch_size,
+                                    self.flush_interval)
+                if self._stopping:
+                    return
+                self._release_held()
+                batch = self._take_batch()
+
+            if not batch or self._deliver(batch):
+                backoff = self.flush_interval
+                continue
+
+            # Put the batch back in order and wait before retrying (server down, network out)
+            with self._cond:
+                if self._stopping:
+                    self._spill(batch)  # close() may already have spilled the rest
+                    return
+                self._pending.extendleft(reversed(batch))
+                self._cond.wait_for(lambda: self._stopping, backoff)
+                if self._stopping:
+                    return
+            backoff = min(backoff * 2, 60)
+
+    def _send(self, batch):
+        from api_functions import authorized_request  # api_functions imports this module
+        try:
+            response = authorized_request(self.api_url, 'POST', f"{self.api_url}/log_actions",
+                                          json={'events': batch}, timeout=self.timeout)
+            if response.status_code in (200, 202):
+                return True
+            print(f"Failed to log {len(batch)} actions: {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            print(f"Audit log request failed: {e}")
+        return False
+
+    def close(self):
+        """Stop the sender, make one last attempt to deliver, and spill whatever is left."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(self.timeout)
+
+        # A sender still running (the join timed out) delivers or spills its own batch;
+        # sending again from here could log it twice
+        if self._thread is None or not self._thread.is_alive():
+            with self._cond:
+                self._release_held()
+            while True:
+                with self._cond:
+                    batch = self._take_batch()
+                if not batch:
+                    break
+                if not self._deliver(batch):  # Network calls stay outside the lock
+                    with self._cond:
+                        self._pending.extendleft(reversed(batch))
+                    break
+
+        with self._cond:
+            if self._pending or self._held:
+                self._spill(list(self._pending) + self._held)
+                self._pending.clear()
+                self._held = []
+
+    def _spill(self, events):
+        try:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                for event in events:
+                    f.write(json.dumps(event) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"Error writing audit spill file: {e}")
+
+    def _load_spill(self):
+        if not os.path.exists(self.spill_path):
+            return
+        try:
+            with open(self.spill_path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self._pending.append(json.loads(line))
+            os.remove(self.spill_path)
+        except (OSError, ValueError) as e:
+            print(f"Error loading audit spill file: {e}")
+        if self._pending:
+            self._ensure_started()
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_audit_queue(api_url):
+    """Return the process-wide audit queue for `api_url`, creating it on first use."""
+    with _queues_lock:
+        audit_queue = _queues.get(api_url)
+        if audit_queue is None:
+            audit_queue = _queues[api_url] = AuditQueue(api_url)
+        return audit_queue
+
+
+def log_action(api_url, username, activity, details):
+    get_audit_queue(api_url).put(username, activity, details)
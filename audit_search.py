@@ -0,0 +1,135 @@
+"""
+Full-text search over audit_logs.details.
+
+MySQL cannot put a FULLTEXT index on the month-partitioned audit_logs table, so
+the text lives in `audit_log_search`, an unpartitioned copy of the searchable
+columns with a FULLTEXT index on `details`. Triggers on audit_logs keep it
+current, and dropping a month partition does not fire them, so archived months
+stay searchable. Schema migration 10 creates it and backfills from
+audit_logs_history.
+
+The sqlite server backend uses an FTS5 external-content table, `audit_logs_fts`
+(see server/schema_sqlite.sql).
+
+`search_audit_logs` runs a ranked, paginated search against either one.
+"""
+import re
+
+CREATE_AUDIT_LOG_SEARCH = '''
+    CREATE TABLE IF NOT EXISTS audit_log_search (
+        log_id INT NOT NULL PRIMARY KEY,
+        log_time DATETIME NOT NULL,
+        username VARCHAR(255),
+        activity VARCHAR(255),
+        details TEXT,
+        KEY idx_audit_log_search_time (log_time),
+        FULLTEXT KEY ft_audit_log_search_details (details)
+    ) ENGINE=InnoDB
+'''
+
+AUDIT_SEARCH_TRIGGERS = [
+    '''
+    CREATE TRIGGER audit_logs_search_insert AFTER INSERT ON audit_logs FOR EACH ROW
+        INSERT INTO audit_log_search (log_id, log_time, username, activity, details)
+        VALUES (NEW.log_id, NEW.log_time, NEW.username, NEW.activity, NEW.details)
+    ''',
+    '''
+    CREATE TRIGGER audit_logs_search_update AFTER UPDATE ON audit_logs FOR EACH ROW
+        UPDATE audit_log_search
+        SET log_time = NEW.log_time, username = NEW.username, activity = NEW.activity, details = NEW.details
+        WHERE log_id = OLD.log_id
+    ''',
+    '''
+    CREATE TRIGGER audit_logs_search_delete AFTER DELETE ON audit_logs FOR EACH ROW
+        DELETE FROM audit_log_search WHERE log_id = OLD.log_id
+    ''',
+]
+
+
+def backfill_audit_search(conn, cursor):
+    """Copy every live and archived audit row into audit_log_search."""
+    cursor.execute('''
+        INSERT IGNORE INTO audit_log_search (log_id, log_time, username, activity, details)
+        SELECT log_id, log_time, username, activity, details FROM audit_logs_history
+    ''')
+
+
+def _terms(text):
+    """Split a search box entry into words and "quoted phrases", dropping query-syntax characters."""
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        if phrase:
+            words = re.findall(r'\w+', phrase)
+            if words:
+                terms.append(('phrase', ' '.join(words)))
+        else:
+            terms.extend(('word', part) for part in re.findall(r'\w+', word))
+    return terms
+
+
+def mysql_boolean_query(text):
+    """Every term required; bare words also match as prefixes (`amox` finds amoxicillin)."""
+    return ' '.join(f'+"{value}"' if kind == 'phrase' else f'+{value}*' for kind, value in _terms(text))
+
+
+def fts5_query(text):
+    """FTS5 equivalent of mysql_boolean_query: implicit AND, prefix match on bare words."""
+    return ' '.join(f'"{value}"' if kind == 'phrase' else f'"{value}"*' for kind, value in _terms(text))
+
+
+SEARCH_SQL = {
+    'mysql': '''
+        SELECT log_time, username, activity, details, MATCH (details) AGAINST (%s IN BOOLEAN MODE) AS score
+        FROM audit_log_search
+        WHERE MATCH (details) AGAINST (%s IN BOOLEAN MODE) {filters}
+        ORDER BY score DESC, log_time DESC
+        LIMIT %s OFFSET %s
+    ''',
+    'sqlite': '''
+        SELECT a.log_time, a.username, a.activity, a.details, -audit_logs_fts.rank AS score
+        FROM audit_logs_fts
+        JOIN audit_logs a ON a.log_id = audit_logs_fts.rowid
+        WHERE audit_logs_fts MATCH %s {filters}
+        ORDER BY audit_logs_fts.rank, a.log_time DESC
+        LIMIT %s OFFSET %s
+    ''',
+}
+
+
+def search_audit_logs(cursor, dialect, text, page=1, per_page=50, username='', action='', start='', end=''):
+    """
+    Ranked full-text search of audit log details.
+
+    Args:
+        cursor: DB-API cursor using %s placeholders (mysql.connector or the sqlite backend).
+        dialect (str): 'mysql' or 'sqlite'.
+        text (str): Search box entry; words are ANDed, "quoted phrases" match exactly.
+        page (int): 1-based page number.
+        per_page (int): Results per page.
+        username (str): Optional exact username filter.
+        action (str): Optional exact activity filter.
+        start (str): Optional inclusive lower bound on log_time ('YYYY-MM-DD[ HH:MM:SS]').
+        end (str): Optional exclusive upper bound on log_time.
+
+    Returns:
+        tuple: (rows, has_more) where rows are (log_time, username, activity, details, score),
+               best match first.
+    """
+    match = mysql_boolean_query(text) if dialect == 'mysql' else fts5_query(text)
+    if not match:
+        return [], False
+
+    prefix = '' if dialect == 'mysql' else 'a.'
+    filters, params = [], []
+    for column, op, value in (('username', '=', username), ('activity', '=', action),
+                              ('log_time', '>=', start), ('log_time', '<', end)):
+        if value:
+            filters.append(f"AND {prefix}{column} {op} %s")
+            params.append(value)
+
+    sql = SEARCH_SQL[dialect].format(filters=' '.join(filters))
+    match_params = [match, match] if dialect == 'mysql' else [match]
+    # One extra row tells us whether there is a next page without a COUNT(*) over the whole index
+    cursor.execute(sql, (*match_params, *params, per_page + 1, (page - 1) * per_page))
+    rows = cursor.fetchall()
+    return rows[:per_page], len(rows) > per_page
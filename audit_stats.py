@@ -0,0 +1,127 @@
+"""
+Pre-aggregated audit activity counts.
+
+`audit_daily_counts` holds one row per (day, hour, username, activity) with the
+number of audit entries, kept current by triggers on audit_logs. Activity
+questions ("eMAR saves by night shift this week") read a few hundred counter
+rows instead of scanning raw logs. Partitions dropped by partition_maintenance.py
+fire no triggers, so counts for archived months remain.
+
+MySQL: schema migration 11 creates the table and triggers and backfills from
+audit_logs_history. The sqlite server backend creates the equivalent in
+server/schema_sqlite.sql.
+"""
+
+CREATE_AUDIT_DAILY_COUNTS = '''
+    CREATE TABLE IF NOT EXISTS audit_daily_counts (
+        log_date DATE NOT NULL,
+        log_hour TINYINT UNSIGNED NOT NULL,
+        username VARCHAR(255) NOT NULL DEFAULT '',
+        activity VARCHAR(255) NOT NULL DEFAULT '',
+        action_count INT UNSIGNED NOT NULL DEFAULT 0,
+        PRIMARY KEY (log_date, log_hour, username, activity),
+        KEY idx_audit_daily_counts_user (username, log_date),
+        KEY idx_audit_daily_counts_activity (activity, log_date)
+    ) ENGINE=InnoDB
+'''
+
+
+def _count_change(row, delta):
+    return f'''
+        INSERT INTO audit_daily_counts (log_date, log_hour, username, activity, action_count)
+        VALUES (DATE({row}.log_time), HOUR({row}.log_time), COALESCE({row}.username, ''), COALESCE({row}.activity, ''),
+                GREATEST({delta}, 0))
+        ON DUPLICATE KEY UPDATE action_count = GREATEST(CAST(action_count AS SIGNED) + {delta}, 0)
+    '''
+
+
+AUDIT_COUNT_TRIGGERS = [
+    f'''
+    CREATE TRIGGER audit_logs_counts_insert AFTER INSERT ON audit_logs FOR EACH ROW
+        {_count_change('NEW', 1)}
+    ''',
+    f'''
+    CREATE TRIGGER audit_logs_counts_update AFTER UPDATE ON audit_logs FOR EACH ROW
+    BEGIN
+        {_count_change('OLD', -1)};
+        {_count_change('NEW', 1)};
+    END
+    ''',
+    f'''
+    CREATE TRIGGER audit_logs_counts_delete AFTER DELETE ON audit_logs FOR EACH ROW
+        {_count_change('OLD', -1)}
+    ''',
+]
+
+
+def backfill_audit_counts(conn, cursor):
+    """Rebuild audit_daily_counts from every live and archived audit row."""
+    cursor.execute("DELETE FROM audit_daily_counts")
+    cursor.execute('''
+        INSERT INTO audit_daily_counts (log_date, log_hour, username, activity, action_count)
+        SELECT DATE(log_time), HOUR(log_time), COALESCE(username, ''), COALESCE(activity, ''), COUNT(*)
+        FROM audit_logs_history
+        GROUP BY DATE(log_time), HOUR(log_time), COALESCE(username, ''), COALESCE(activity, '')
+    ''')
+
+
+# Dimensions callers may group by, mapped to their columns
+GROUP_COLUMNS = {
+    'day': 'log_date',
+    'hour': 'log_hour',
+    'username': 'username',
+    'action': 'activity',
+}
+
+
+def fetch_audit_counts(cursor, start, end, group_by=('day', 'username', 'action'), username='', action='',
+                       start_hour=None, end_hour=None):
+    """
+    Sum audit activity counts between two dates.
+
+    Args:
+        cursor: DB-API cursor using %s placeholders (mysql.connector or the sqlite backend).
+        start (str): First day included (YYYY-MM-DD).
+        end (str): Day after the last one included (YYYY-MM-DD).
+        group_by (iterable): Any of 'day', 'hour', 'username', 'action'; empty for a grand total.
+        username (str): Optional exact username filter.
+        action (str): Optional exact activity filter.
+        start_hour (int): Optional first hour of day included (0-23).
+        end_hour (int): Optional hour of day the window ends before. A window that wraps past
+                        midnight (start_hour=22, end_hour=6) is allowed, e.g. for night shift.
+
+    Returns:
+        list: dicts keyed by the group_by names plus 'count', largest count first.
+    """
+    group_by = list(group_by)
+    unknown = set(group_by) - set(GROUP_COLUMNS)
+    if unknown:
+        raise ValueError(f"Cannot group audit counts by {', '.join(sorted(unknown))}")
+
+    filters, params = ["log_date >= %s", "log_date < %s"], [start, end]
+    for column, value in (('username', username), ('activity', action)):
+        if value:
+            filters.append(f"{column} = %s")
+            params.append(value)
+    if start_hour is not None and end_hour is not None:
+        joiner = 'AND' if start_hour <= end_hour else 'OR'
+        filters.append(f"(log_hour >= %s {joiner} log_hour < %s)")
+        params.extend([start_hour, end_hour])
+
+    columns = [GROUP_COLUMNS[name] for name in group_by]
+    select = ', '.join(columns + ['SUM(action_count)'])
+    group = f"GROUP BY {', '.join(columns)}" if columns else ''
+    cursor.execute(f'''
+        SELECT {select} FROM audit_daily_counts
+        WHERE {' AND '.join(filters)}
+        {group}
+        ORDER BY SUM(action_count) DESC
+    ''', params)
+
+    counts = []
+    for row in cursor.fetchall():
+        entry = {name: (str(value) if name == 'day' else value) for name, value in zip(group_by, row)}
+        entry['count'] = int(row[-1] or 0)
+        if entry['count']:
+            counts.append(entry)
+    return counts
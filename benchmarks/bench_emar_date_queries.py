@@ -0,0 +1,107 @@
+"""
+Compare the legacy strftime/LIKE eMAR date filters against the half-open range
+queries in db_functions on a synthetic multi-year SQLite dataset.
+
+Usage: python benchmarks/bench_emar_date_queries.py [--years 3] [--residents 20] [--meds 10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import config
+import db_functions
+
+TIME_SLOTS = ['Morning', 'Noon', 'Evening', 'Night']
+
+LEGACY_MONTH_QUERY = '''
+    SELECT m.medication_name, e.date, e.time_slot, e.administered
+    FROM emar_chart e
+    JOIN residents r ON e.resident_id = r.id
+    JOIN medications m ON e.medication_id = m.id
+    WHERE r.name = ? AND strftime('%Y-%m', e.date) = ?
+'''
+
+LEGACY_DAY_QUERY = '''
+    SELECT e.date, e.administered, e.notes
+    FROM emar_chart e
+    JOIN residents r ON e.resident_id = r.id
+    JOIN medications m ON e.medication_id = m.id
+    WHERE r.name = ? AND m.medication_name = ? AND e.date LIKE ?
+'''
+
+
+def build_dataset(conn, years, residents, meds):
+    conn.executescript('''
+        CREATE TABLE residents (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT);
+        CREATE TABLE medications (id INTEGER PRIMARY KEY AUTOINCREMENT, resident_id INTEGER, medication_name TEXT,
+            medication_type TEXT DEFAULT 'Scheduled', discontinued_date DATE DEFAULT NULL);
+        CREATE TABLE emar_chart (chart_id INTEGER PRIMARY KEY AUTOINCREMENT, resident_id INTEGER, medication_id INTEGER,
+            date TEXT, time_slot TEXT, administered TEXT, current_count INTEGER DEFAULT NULL, notes TEXT DEFAULT '',
+            UNIQUE(resident_id, medication_id, date, time_slot));
+        CREATE INDEX idx_emar_chart_resident_date ON emar_chart (resident_id, date);
+    ''')
+    start = date.today().replace(day=1) - timedelta(days=365 * years)
+    days = [(start + timedelta(days=offset)).isoformat() for offset in range(365 * years)]
+    for resident in range(1, residents + 1):
+        conn.execute("INSERT INTO residents (name) VALUES (?)", (f'Resident {resident}',))
+        for med in range(1, meds + 1):
+            conn.execute("INSERT INTO medications (resident_id, medication_name) VALUES (?, ?)", (resident, f'Med{med}'))
+            medication_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            conn.executemany(
+                "INSERT INTO emar_chart (resident_id, medication_id, date, time_slot, administered) VALUES (?, ?, ?, ?, 'AB')",
+                ((resident, medication_id, day, slot) for day in days for slot in TIME_SLOTS))
+    conn.commit()
+    return days
+
+
+def timed(label, func, repeat):
+    func()  # Warm the page cache
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows = func()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {label:<28} {elapsed:9.2f} ms  ({len(rows)} rows)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--residents', type=int, default=20)
+    parser.add_argument('--meds', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        with db_functions.db_connection() as conn:
+            days = build_dataset(conn, args.years, args.residents, args.meds)
+            total = conn.execute("SELECT COUNT(*) FROM emar_chart").fetchone()[0]
+        print(f"emar_chart rows: {total:,} ({args.years} years, {args.residents} residents, {args.meds} meds)")
+
+        resident_name = 'Resident 1'
+        year_month = days[-1][:7]
+        day = days[-1]
+        conn = db_functions.get_connection()
+
+        print(f"Month query ({year_month}):")
+        legacy = timed('strftime (legacy)', lambda: conn.execute(LEGACY_MONTH_QUERY, (resident_name, year_month)).fetchall(), args.repeat)
+        ranged = timed('half-open range', lambda: db_functions.fetch_emar_data_for_month(resident_name, year_month), args.repeat)
+        print(f"  speedup: {legacy / ranged:.1f}x")
+
+        print(f"Day query ({day}):")
+        event_key = f'-PRN_Med1-{int(day[8:])}-'
+        legacy = timed('LIKE prefix (legacy)', lambda: conn.execute(LEGACY_DAY_QUERY, (resident_name, 'Med1', day + '%')).fetchall(), args.repeat)
+        ranged = timed('half-open range', lambda: db_functions.fetch_prn_data_for_day(event_key, resident_name, year_month), args.repeat)
+        print(f"  speedup: {legacy / ranged:.1f}x")
+
+        db_functions.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
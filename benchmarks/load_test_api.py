@@ -0,0 +1,132 @@
+"""
+Concurrent load test for the API server and its connection pool.
+
+    # Against a running server (gunicorn/waitress):
+    python benchmarks/load_test_api.py --url http://127.0.0.1:5000/test_db --concurrency 32 --requests 2000
+
+    # Zero-infrastructure server on the sqlite backend, then point --url at it:
+    RESIDENT_MGMT_DB_BACKEND=sqlite python wsgi.py
+
+    # Pool only, against the MySQL in config.MYSQL_CONFIG or the sqlite backend:
+    python benchmarks/load_test_api.py --pool mysql --concurrency 32 --requests 2000
+    python benchmarks/load_test_api.py --pool sqlite --concurrency 32 --requests 2000
+
+Pool mode also runs an unpooled pass (connect per request, as scratch.py used to do)
+so the two can be compared. Reports throughput and p50/p95/p99 latency.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import config
+from server.backends import MySQLBackend, SQLiteBackend
+from server.pool import ConnectionPool
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(label, task, concurrency, total):
+    latencies = []
+    errors = 0
+
+    def timed(_):
+        started = time.perf_counter()
+        task()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(timed, i) for i in range(total)]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception as e:
+                errors += 1
+                if errors == 1:
+                    print(f"  first error: {e}")
+    elapsed = time.perf_counter() - started
+
+    if latencies:
+        print(f"{label:<12} {len(latencies) / elapsed:8.0f} req/s   "
+              f"p50 {percentile(latencies, 50) * 1000:7.2f} ms   "
+              f"p95 {percentile(latencies, 95) * 1000:7.2f} ms   "
+              f"p99 {percentile(latencies, 99) * 1000:7.2f} ms   errors {errors}")
+    else:
+        print(f"{label:<12} all {errors} requests failed")
+
+
+def http_task(url):
+    import requests
+    session_local = threading.local()
+
+    def task():
+        session = getattr(session_local, 'session', None)
+        if session is None:
+            session = session_local.session = requests.Session()
+        response = session.get(url, timeout=30)
+        response.raise_for_status()
+    return task
+
+
+def query(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM residents WHERE name = %s", ('Load Test',))
+    cursor.fetchall()
+    cursor.close()
+
+
+def make_backend(name):
+    if name == 'mysql':
+        return MySQLBackend()
+    backend = SQLiteBackend(os.path.join(tempfile.mkdtemp(), 'load_test.db'))
+    backend.init_schema()
+    return backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help="Endpoint to hit over HTTP")
+    target.add_argument('--pool', choices=['mysql', 'sqlite'], help="Exercise the connection pool directly")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--pool-size', type=int, default=config.DB_POOL_SIZE)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    if args.url:
+        run('http', http_task(args.url), args.concurrency, args.requests)
+        return
+
+    connect = make_backend(args.pool).connect
+
+    def unpooled():
+        conn = connect()
+        try:
+            query(conn)
+        finally:
+            conn.close()
+
+    pool = ConnectionPool(connect, size=args.pool_size, timeout=config.DB_POOL_TIMEOUT)
+
+    def pooled():
+        with pool.connection() as conn:
+            query(conn)
+
+    run('unpooled', unpooled, args.concurrency, args.requests)
+    run('pooled', pooled, args.concurrency, args.requests)
+    print(f"pool status: {pool.status()}")
+    pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
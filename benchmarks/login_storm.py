@@ -0,0 +1,179 @@
+"""
+Shift-change login storm: many staff log in at once while others keep working.
+
+Runs bursts of /validate_login alongside a steady stream of cheap database
+requests (/test_db, standing in for eMAR saves) and reports the latency of
+both, so the effect of bcrypt work on unrelated requests is visible.
+
+    # In-process app on a throwaway sqlite database (no server needed):
+    python benchmarks/login_storm.py --logins 200 --login-concurrency 32
+
+    # Compare against bcrypt on every request thread (the pre-executor behaviour):
+    python benchmarks/login_storm.py --inline
+
+    # Against a running server with an existing account:
+    python benchmarks/login_storm.py --url http://127.0.0.1:5000 --username nurse1 --password secret
+
+Set RESIDENT_MGMT_BCRYPT_ROUNDS / _WORKERS / _QUEUE_SIZE to try other settings.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from load_test_api import percentile
+
+
+def report(label, latencies, errors):
+    if not latencies:
+        print(f"{label:<10} all {errors} requests failed")
+        return
+    print(f"{label:<10} n={len(latencies):<5} "
+          f"p50 {percentile(latencies, 50) * 1000:8.1f} ms   "
+          f"p95 {percentile(latencies, 95) * 1000:8.1f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:8.1f} ms   errors {errors}")
+
+
+def local_clients(users, inline):
+    os.environ.setdefault('RESIDENT_MGMT_JWT_SECRET_KEY', 'login-storm-benchmark-secret-key-0123')
+    import config
+    config.DB_BACKEND = 'sqlite'
+    config.SERVER_DB_PATH = os.path.join(tempfile.mkdtemp(), 'login_storm.db')
+    config.JWT_SECRET_KEY = os.environ['RESIDENT_MGMT_JWT_SECRET_KEY']
+    if inline:
+        # One bcrypt thread per possible request thread: no limit, like hashing inline
+        config.BCRYPT_WORKERS = 256
+    from server import create_app
+    app = create_app()
+
+    hasher = app.extensions['password_hasher']
+    with app.app_context():
+        from server.db import get_db
+        conn = get_db()
+        cursor = conn.cursor()
+        password_hash = hasher.hash('storm-password')
+        cursor.executemany("INSERT INTO users (username, password_hash, user_role, initials, is_temp_password) "
+                           "VALUES (%s, %s, 'User', 'LS', 0)",
+                           [(f'storm{i}', password_hash) for i in range(users)])
+        conn.commit()
+        cursor.close()
+    print(f"bcrypt cost {hasher.rounds}, {hasher.status()['workers']} hashing threads per worker")
+
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        return local.client
+
+    def login(i):
+        response = client().post('/validate_login', json={'username': f'storm{i % users}', 'password': 'storm-password'})
+        return response.status_code
+
+    def work():
+        return client().get('/test_db').status_code
+
+    return login, work, lambda: hasher.status()
+
+
+def http_clients(url, username, password):
+    import requests
+    local = threading.local()
+
+    def session():
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return local.session
+
+    def login(_):
+        return session().post(f"{url}/validate_login", json={'username': username, 'password': password},
+                              timeout=60).status_code
+
+    def work():
+        return session().get(f"{url}/test_db", timeout=60).status_code
+
+    def status():
+        return requests.get(f"{url}/health", timeout=10).json().get('passwords')
+
+    return login, work, status
+
+
+def storm(login, work, logins, login_concurrency, work_concurrency):
+    results = {'login': ([], [0]), 'other': ([], [0])}
+    lock = threading.Lock()
+    next_login = iter(range(logins))
+    done = threading.Event()
+
+    def timed(kind, call, *args):
+        started = time.perf_counter()
+        try:
+            ok = call(*args) in (200, 401)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - started
+        latencies, errors = results[kind]
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors[0] += 1
+
+    def login_worker():
+        while True:
+            with lock:
+                i = next(next_login, None)
+            if i is None:
+                return
+            timed('login', login, i)
+
+    def work_worker():
+        while not done.is_set():
+            timed('other', work)
+            time.sleep(0.01)
+
+    others = [threading.Thread(target=work_worker) for _ in range(work_concurrency)]
+    logins_threads = [threading.Thread(target=login_worker) for _ in range(login_concurrency)]
+    started = time.perf_counter()
+    for thread in others + logins_threads:
+        thread.start()
+    for thread in logins_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    for thread in others:
+        thread.join()
+
+    print(f"{logins} logins in {elapsed:.1f}s ({logins / elapsed:.1f}/s)")
+    report('login', *(results['login'][0], results['login'][1][0]))
+    report('other', *(results['other'][0], results['other'][1][0]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="Base URL of a running API server (default: in-process sqlite app)")
+    parser.add_argument('--username', help="Existing account to log in as with --url")
+    parser.add_argument('--password', help="Password for --username")
+    parser.add_argument('--users', type=int, default=50, help="Accounts to create in-process")
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--login-concurrency', type=int, default=32)
+    parser.add_argument('--work-concurrency', type=int, default=4)
+    parser.add_argument('--inline', action='store_true', help="In-process only: no limit on bcrypt threads")
+    args = parser.parse_args()
+
+    if args.url:
+        if not (args.username and args.password):
+            parser.error("--url needs --username and --password")
+        login, work, status = http_clients(args.url.rstrip('/'), args.username, args.password)
+    else:
+        login, work, status = local_clients(args.users, args.inline)
+
+    storm(login, work, args.logins, args.login_concurrency, args.work_concurrency)
+    print(f"password pool: {status()}")
+
+
+if __name__ == '__main__':
+    main()
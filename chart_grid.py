@@ -0,0 +1,352 @@
+"""
+Virtualised month grid for the chart windows.
+
+A monthly chart is a list of rows (a medication time slot, a PRN summary, an
+ADL) by 31 day columns. Building it from one sg.InputText per cell meant
+thousands of Tk widgets for a resident on many medications, seconds to open and
+hundreds of MB to hold. ChartGrid draws the whole grid on a single canvas and
+only draws the rows in view; scrolling redraws the canvas. Cells are edited in
+place with one shared Entry placed over the cell being edited.
+
+Values live in a chart_model.ChartModel; each grid row maps to its model row
+once, up front, so drawing and editing index the model's flat list directly.
+`load` swaps in a model built from the API payload in one call and `update`
+sets many cells at once. Edits are tracked: `dirty_cells()` / `dirty_values()`
+return only the changed cells, drawn tinted until `mark_clean()`. Cells keep
+the keys the InputText widgets had, '-{row key}-{day}-', so `values()` goes
+straight to the existing save functions.
+
+While editing, Enter / Up / Down move between rows and Tab / Shift-Tab between
+days, skipping read-only and locked cells. Clicking a read-only cell (the PRN /
+Controlled summaries) posts its key as a window event with the cell text as the
+value, as the read-only inputs did, and clicking a row label with an `event`
+posts that event.
+
+    grid = ChartGrid(rows)
+    window = sg.Window('Chart', [grid.layout()], finalize=True)
+    grid.attach(window)
+"""
+import tkinter as tk
+from collections import namedtuple
+import PySimpleGUI as sg
+from chart_model import NUM_DAYS, ChartModel
+
+# Row styles
+INPUT = 'input'        # Editable day cells
+READONLY = 'readonly'  # Day cells that post an event when clicked
+LABEL = 'label'        # Text only, no cells
+BAR = 'bar'            # Section heading across the grid
+
+# key: the row's part of the cell keys; source: its model row key (defaults to key)
+GridRow = namedtuple('GridRow', 'key label style event source', defaults=(INPUT, None, None))
+
+GRID_LINE = '#c8c8c8'
+BAR_FILL = '#e4e4e4'
+LOCKED_FILL = '#f2f2f2'
+DIRTY_FILL = '#fff3c4'
+
+
+def cell_key(row_key, day):
+    """Window key of a day cell ('-{row_key}-{day}-', day from 1)."""
+    return f'-{row_key}-{day}-'
+
+
+class ChartGrid:
+    def __init__(self, rows, key='-GRID-', visible_rows=28, label_width=180, cell_width=44, row_height=26,
+                 font=('Helvetica', 10)):
+        """
+        Args:
+            rows (list): GridRow entries, top to bottom.
+            key (str): Key of the canvas element.
+            visible_rows (int): Rows drawn at once; the rest are reached by scrolling.
+        """
+        self.rows = list(rows)
+        self.key = key
+        self.visible_rows = max(min(visible_rows, len(self.rows)), 1)
+        self.label_width = label_width
+        self.cell_width = cell_width
+        self.row_height = row_height
+        self.font = font
+        self.bold_font = (*font[:2], 'bold')
+        self._index = {row.key: i for i, row in enumerate(self.rows) if row.style in (INPUT, READONLY)}
+        # Model row key of every row with cells, in grid order
+        self.row_keys = [self._source(row) for row in self.rows if row.style in (INPUT, READONLY)]
+        self.model = ChartModel(self.row_keys)
+        # Grid row index -> start of its days in model.cells (None for rows without cells)
+        self._offsets = [self.model.offset(self._source(row)) if row.style in (INPUT, READONLY) else None
+                         for row in self.rows]
+        self._locked = {}  # (row index, day index) -> text shown instead of an editable value
+        self._dirty = {}  # (row index, day index) -> value before it was edited
+        self._top = 0
+        self._window = None
+        self._canvas = None
+        self._scrollbar = None
+        self._entry = None
+        self._edit_item = None
+        self._editing = None  # (row index, day index) under the Entry
+
+    # ---------------------------- Layout ---------------------------- #
+
+    def layout(self):
+        """The grid's element, for one row of the window layout."""
+        width = self.label_width + self.cell_width * NUM_DAYS
+        height = self.row_height * (self.visible_rows + 1)
+        return [sg.Canvas(size=(width, height), key=self.key, background_color='white', pad=(0, 0))]
+
+    def attach(self, window):
+        """Bind the grid to its finalized window and draw it."""
+        self._window = window
+        canvas = self._canvas = window[self.key].TKCanvas
+        self._entry = tk.Entry(canvas, justify='center', font=self.font, relief='solid', bd=1)
+        self._entry.bind('<FocusOut>', self._commit_edit)
+        self._entry.bind('<Escape>', self._cancel_edit)
+        for sequence, d_row, d_day in (('<Return>', 1, 0), ('<Down>', 1, 0), ('<Up>', -1, 0),
+                                       ('<Tab>', 0, 1), ('<Shift-Tab>', 0, -1), ('<ISO_Left_Tab>', 0, -1)):
+            self._entry.bind(sequence, lambda event, d_row=d_row, d_day=d_day: self._move(d_row, d_day))
+        canvas.bind('<Button-1>', self._on_click)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            canvas.bind(sequence, self._on_wheel)
+        if len(self.rows) > self.visible_rows:
+            # Packed beside the canvas in the element's row frame
+            self._scrollbar = tk.Scrollbar(canvas.master, orient=tk.VERTICAL, command=self._on_scrollbar)
+            self._scrollbar.pack(side=tk.LEFT, fill=tk.Y)
+        self.redraw()
+
+    # ---------------------------- Cells ---------------------------- #
+
+    @staticmethod
+    def _source(row):
+        return row.key if row.source is None else row.source
+
+    def load(self, model):
+        """
+        Show `model` (a ChartModel over `row_keys`, e.g. from chart_model.emar_model) and
+        start dirty tracking afresh.
+        """
+        if model.row_keys != self.row_keys:
+            raise ValueError("Model rows do not match the grid's rows")
+        self._cancel_edit()
+        self.model = model
+        self._dirty.clear()
+        self.redraw()
+
+    def update(self, cells):
+        """Set many cells at once ((model row key, day, value) triples, see ChartModel.update) and redraw."""
+        self._cancel_edit()
+        self.model.update(cells)
+        self.redraw()
+
+    def get(self, row_key, day):
+        index = self._index[row_key]
+        return self._locked.get((index, day - 1), self.model.cells[self._offsets[index] + day - 1])
+
+    def lock(self, row_key, from_day, text='DC'):
+        """Show `text` in the row from `from_day` to the end of the month; locked cells cannot be edited or saved."""
+        index = self._index.get(row_key)
+        if index is None:
+            return
+        for day_index in range(max(from_day, 1) - 1, NUM_DAYS):
+            self._locked[(index, day_index)] = text
+
+    def values(self):
+        """{'-{row key}-{day}-': text} for every editable cell, as the window values of the InputText grid were."""
+        self._commit_edit()
+        values = {}
+        cells = self.model.cells
+        for row_key, index in self._index.items():
+            if self.rows[index].style != INPUT:
+                continue
+            offset = self._offsets[index]
+            for day_index in range(NUM_DAYS):
+                if (index, day_index) not in self._locked:
+                    values[cell_key(row_key, day_index + 1)] = cells[offset + day_index]
+        return values
+
+    def dirty_values(self):
+        """{'-{row key}-{day}-': text} for the cells edited since `load` or `mark_clean`."""
+        return {cell_key(self.rows[index].key, day): value for index, day, value in self._dirty_cells()}
+
+    def dirty_cells(self):
+        """[(model row key, day from 1, value)] for the cells edited since `load` or `mark_clean`."""
+        return [(self._source(self.rows[index]), day, value) for index, day, value in self._dirty_cells()]
+
+    def _dirty_cells(self):
+        self._commit_edit()
+        cells = self.model.cells
+        return [(index, day_index + 1, cells[self._offsets[index] + day_index])
+                for index, day_index in sorted(self._dirty)]
+
+    def is_dirty(self):
+        self._commit_edit()
+        return bool(self._dirty)
+
+    def mark_clean(self):
+        """Accept the current values as saved."""
+        self._commit_edit()
+        self._dirty.clear()
+        self.redraw()
+
+    # ---------------------------- Drawing ---------------------------- #
+
+    def redraw(self):
+        if self._canvas is None:
+            return
+        canvas = self._canvas
+        canvas.delete('all')
+        self._edit_item = None
+        rh, cw, lw = self.row_height, self.cell_width, self.label_width
+        right = lw + cw * NUM_DAYS
+
+        for day_index in range(NUM_DAYS):
+            canvas.create_text(lw + cw * day_index + cw // 2, rh // 2, text=str(day_index + 1), font=self.bold_font)
+        canvas.create_line(0, rh, right, rh, fill=GRID_LINE)
+
+        last = min(self._top + self.visible_rows, len(self.rows))
+        for screen_row, index in enumerate(range(self._top, last), start=1):
+            row = self.rows[index]
+            top = rh * screen_row
+            middle = top + rh // 2
+            if row.style == BAR:
+                canvas.create_rectangle(0, top, right, top + rh, fill=BAR_FILL, outline=GRID_LINE)
+                canvas.create_text(right // 2, middle, text=row.label, font=self.bold_font)
+                continue
+            label_font = self.bold_font if row.event else self.font
+            canvas.create_text(lw // 2, middle, text=row.label, font=label_font, width=lw - 6,
+                               fill='blue' if row.event else 'black')
+            if row.style == LABEL:
+                continue
+
+            cells, offset = self.model.cells, self._offsets[index]
+            text_color = 'blue' if row.style == READONLY else 'black'
+            cell_font = self.bold_font if row.style == READONLY else self.font
+            for day_index in range(NUM_DAYS):
+                left = lw + cw * day_index
+                locked = self._locked.get((index, day_index))
+                if locked is not None:
+                    canvas.create_rectangle(left, top, left + cw, top + rh, fill=LOCKED_FILL, outline='')
+                elif (index, day_index) in self._dirty:
+                    canvas.create_rectangle(left, top, left + cw, top + rh, fill=DIRTY_FILL, outline='')
+                text = locked if locked is not None else cells[offset + day_index]
+                if text:
+                    canvas.create_text(left + cw // 2, middle, text=text, font=cell_font, fill=text_color)
+            canvas.create_line(lw, top, right, top, fill=GRID_LINE)
+            canvas.create_line(lw, top + rh, right, top + rh, fill=GRID_LINE)
+            for day_index in range(NUM_DAYS + 1):
+                x = lw + cw * day_index
+                canvas.create_line(x, top, x, top + rh, fill=GRID_LINE)
+
+        if self._scrollbar is not None:
+            self._scrollbar.set(self._top / len(self.rows), last / len(self.rows))
+
+    # ---------------------------- Scrolling ---------------------------- #
+
+    def scroll_to(self, top):
+        top = max(0, min(int(top), len(self.rows) - self.visible_rows))
+        if top != self._top:
+            self._commit_edit()
+            self._top = top
+            self.redraw()
+
+    def _on_wheel(self, event):
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            self.scroll_to(self._top - 3)
+        else:
+            self.scroll_to(self._top + 3)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(round(float(amount) * len(self.rows)))
+        elif action == 'scroll':
+            step = self.visible_rows - 1 if unit == 'pages' else 1
+            self.scroll_to(self._top + int(amount) * step)
+
+    # ---------------------------- Editing ---------------------------- #
+
+    def _cell_at(self, x, y):
+        """(row index, day index or None for the label column) under a canvas point, or None."""
+        screen_row = int(y // self.row_height)
+        index = self._top + screen_row - 1
+        if screen_row < 1 or index >= len(self.rows):
+            return None
+        if x < self.label_width:
+            return index, None
+        day_index = int((x - self.label_width) // self.cell_width)
+        return (index, day_index) if day_index < NUM_DAYS else None
+
+    def _on_click(self, event):
+        self._commit_edit()
+        cell = self._cell_at(event.x, event.y)
+        if cell is None:
+            return
+        index, day_index = cell
+        row = self.rows[index]
+        if day_index is None:
+            if row.event:
+                self._window.write_event_value(row.event, row.key)
+        elif row.style == READONLY:
+            self._window.write_event_value(cell_key(row.key, day_index + 1), self.get(row.key, day_index + 1))
+        elif row.style == INPUT and (index, day_index) not in self._locked:
+            self._begin_edit(index, day_index)
+
+    def _editable(self, index, day_index):
+        return self.rows[index].style == INPUT and (index, day_index) not in self._locked
+
+    def _next_cell(self, index, day_index, d_row, d_day):
+        """Nearest editable cell from (index, day_index) in the direction, or None."""
+        index, day_index = index + d_row, day_index + d_day
+        while 0 <= index < len(self.rows) and 0 <= day_index < NUM_DAYS:
+            if self._editable(index, day_index):
+                return index, day_index
+            index, day_index = index + d_row, day_index + d_day
+        return None
+
+    def _move(self, d_row, d_day):
+        if self._editing is None:
+            return 'break'
+        target = self._next_cell(*self._editing, d_row, d_day)
+        self._commit_edit()
+        if target is not None:
+            index, day_index = target
+            # Bring the row into view before placing the Entry over it
+            if index < self._top:
+                self.scroll_to(index)
+            elif index >= self._top + self.visible_rows:
+                self.scroll_to(index - self.visible_rows + 1)
+            self._begin_edit(index, day_index)
+        return 'break'  # Keep Tk from moving focus or the cursor as well
+
+    def _begin_edit(self, index, day_index):
+        left = self.label_width + self.cell_width * day_index
+        top = self.row_height * (index - self._top + 1)
+        self._editing = (index, day_index)
+        self._entry.delete(0, tk.END)
+        self._entry.insert(0, self.model.cells[self._offsets[index] + day_index])
+        self._edit_item = self._canvas.create_window(left + 1, top + 1, window=self._entry, anchor='nw',
+                                                     width=self.cell_width - 1, height=self.row_height - 1)
+        self._entry.focus_set()
+        self._entry.select_range(0, tk.END)
+
+    def _end_edit(self):
+        self._editing = None
+        if self._edit_item is not None:
+            self._canvas.delete(self._edit_item)
+            self._edit_item = None
+
+    def _commit_edit(self, event=None):
+        if self._editing is None:
+            return
+        index, day_index = self._editing
+        value = self._entry.get().strip()
+        cells, position = self.model.cells, self._offsets[index] + day_index
+        if value != cells[position]:
+            original = self._dirty.setdefault((index, day_index), cells[position])
+            if value == original:
+                del self._dirty[(index, day_index)]
+            cells[position] = value
+        self._end_edit()
+        self.redraw()
+
+    def _cancel_edit(self, event=None):
+        if self._editing is not None:
+            self._end_edit()
+            self._canvas.focus_set()
@@ -0,0 +1,89 @@
+"""
+Cell values of a monthly chart, in one flat list.
+
+A ChartModel holds a row x day grid as a single list indexed
+`row * NUM_DAYS + day_index`, with rows addressed by their data coordinates:
+(medication_name, time_slot) for a scheduled eMAR slot, (medication_name, None)
+for a PRN / Controlled summary row, or the ADL column name. The builders below
+fill a model from the API payload in one pass over the entries, reading the day
+straight out of the fixed-format chart_date, so no per-entry key strings are
+built or parsed. chart_grid.ChartGrid draws from the model.
+"""
+
+NUM_DAYS = 31
+
+ADMINISTERED = 'ADM'  # Summary cell text for a PRN / Controlled day with an administration
+
+
+class ChartModel:
+    def __init__(self, row_keys):
+        """
+        Args:
+            row_keys (list): Data coordinates of each row, top to bottom.
+        """
+        self.row_keys = list(row_keys)
+        self.rows = {key: row for row, key in enumerate(self.row_keys)}
+        self.cells = [''] * (len(self.row_keys) * NUM_DAYS)
+
+    def offset(self, row_key):
+        """Index of the row's first day in `cells`, or None if there is no such row."""
+        row = self.rows.get(row_key)
+        return None if row is None else row * NUM_DAYS
+
+    def get(self, row_key, day):
+        return self.cells[self.rows[row_key] * NUM_DAYS + day - 1]
+
+    def update(self, cells):
+        """
+        Set many cells at once.
+
+        Args:
+            cells: Iterable of (row_key, day from 1, value); rows not in the model are skipped.
+        """
+        rows, values = self.rows, self.cells
+        for row_key, day, value in cells:
+            row = rows.get(row_key)
+            if row is not None and 1 <= day <= NUM_DAYS:
+                values[row * NUM_DAYS + day - 1] = '' if value is None else str(value)
+
+
+def emar_model(row_keys, emar_data):
+    """
+    Model of a month of /fetch_emar_data_for_month entries.
+
+    Scheduled rows ((medication_name, time_slot)) get the administered initials;
+    summary rows ((medication_name, None)) show ADMINISTERED on every day with at
+    least one administration.
+    """
+    model = ChartModel(row_keys)
+    rows, cells = model.rows, model.cells
+    for entry in emar_data or []:
+        # 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+        day_index = int(entry['chart_date'][8:10]) - 1
+        medication_name = entry['medication_name']
+        administered = entry['administered']
+        time_slot = entry['time_slot']
+        if time_slot:
+            row = rows.get((medication_name, time_slot))
+            if row is not None:
+                cells[row * NUM_DAYS + day_index] = administered or ''
+        if administered:
+            row = rows.get((medication_name, None))
+            if row is not None:
+                cells[row * NUM_DAYS + day_index] = ADMINISTERED
+    return model
+
+
+def adl_model(adl_keys, adl_data):
+    """Model of a month of /fetch_adl_chart_data_for_month entries, one row per ADL column."""
+    model = ChartModel(adl_keys)
+    cells = model.cells
+    columns = list(enumerate(model.row_keys))
+    for entry in adl_data or []:
+        # HTTP date: 'Tue, 27 Feb 2024 00:00:00 GMT'
+        day_index = int(entry['chart_date'][5:7]) - 1
+        for row, adl_key in columns:
+            value = entry.get(adl_key)
+            if value is not None:
+                cells[row * NUM_DAYS + day_index] = str(value)
+    return model
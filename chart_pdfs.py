@@ -0,0 +1,186 @@
+"""
+Chart PDF layouts that need no GUI, so both the desktop client (pdf.py) and the
+API server's month close (month_close.py) can render them.
+"""
+import calendar
+from datetime import datetime
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet
+
+
+def _footer(label, generated_at=None):
+    """Page callback printing '<label> Generated <time>' in the bottom margin."""
+    footer_text = f"{label} Generated {(generated_at or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')}"
+
+    def add_footer(canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Times-Roman', 10)
+        canvas.drawString(doc.leftMargin, 15, footer_text)
+        canvas.restoreState()
+    return add_footer
+
+
+def build_adl_chart_pdf(output, resident_name, year_month, adl_data, generated_at=None):
+    """
+    Lay out a resident's monthly ADL chart.
+
+    Args:
+        output: File name or binary file object the PDF is written to.
+        resident_name (str): Resident shown in the title.
+        year_month (str): Month in 'YYYY-MM' format.
+        adl_data (list): ADL rows as returned by /fetch_adl_chart_data_for_month.
+        generated_at (datetime): Time printed in the footer; defaults to now.
+    """
+    doc = SimpleDocTemplate(output, pagesize=landscape(letter), topMargin=20, leftMargin=36, rightMargin=36, bottomMargin=36)
+    elements = []
+    
+    # Styles for the document
+    styles = getSampleStyleSheet()
+    title_style = styles['Title']
+
+    # Adding a title at the top of the document
+    title = f"ADL Chart {resident_name} - {year_month}"
+    elements.append(Paragraph(title, title_style))
+    elements.append(Spacer(1, 8))  # Adding some space after the title
+
+    # Days of the month as column headers
+    days_in_month = calendar.monthrange(int(year_month.split('-')[0]), int(year_month.split('-')[1]))[1]
+    headers = ["ADL Activity"] + [str(day) for day in range(1, days_in_month + 1)]
+    
+    # ADL Activities as row headers
+    adl_activities = [
+        "First Shift SP", "Second Shift SP", "First Shift Activity1", "First Shift Activity2",
+        "First Shift Activity3", "Second Shift Activity4", "First Shift BM", "Second Shift BM",
+        "Shower", "Shampoo", "Sponge Bath", "Peri Care AM", "Peri Care PM",
+        "Oral Care AM", "Oral Care PM", "Nail Care", "Skin Care", "Shave",
+        "Breakfast", "Lunch", "Dinner", "Snack AM", "Snack PM", "Water Intake"
+    ]
+    
+    # Initialize table data
+    table_data = [headers]  # Adding the headers as the first row
+    
+    # Filling the table with ADL activities and placeholders for each day's data
+    for activity in adl_activities:
+        row = [activity] + ['' for _ in range(days_in_month)]  # Placeholder for each day
+        table_data.append(row)
+    
+    for entry in adl_data:
+        chart_date_str = entry["chart_date"]
+        date_part = ' '.join(chart_date_str.split(' ')[1:4])
+        chart_date = datetime.strptime(date_part, "%d %b %Y")
+        day_number = chart_date.day - 1  # Adjust for 0 indexing
+        for i, adl_key in enumerate(adl_activities):
+            value = entry.get(adl_key.lower().replace(" ", "_"), "")
+            if value:
+                table_data[i + 1][day_number + 1] = value  # +1 because of headers row
+
+    
+    # Creating the table
+    table = Table(table_data, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('GRID', (0,0), (-1,-1), 1, colors.black),
+        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ]))
+    
+    elements.append(table)
+
+    # Add some space before the activities legend
+    elements.append(Spacer(1, 6))
+
+    # # Activities legend title
+    # elements.append(Paragraph("Activities", styles['Heading3']))
+
+    # Activities list
+    activities = [
+        "1. Movie & Snack or TV",
+        "2. Exercise/Walking",
+        "3. Games/Puzzles",
+        "4. Outside/Patio",
+        "5. Arts & Crafts",
+        "6. Music Therapy",
+        "7. Gardening",
+        "8. Listen to Music",
+        "9. Social Hour",
+        "10. Cooking/Baking",
+        "11. Birdwatching",
+        "12. Outing/Excursion",
+        "13. Hospice Visit",
+        "14. Other as Listed on the Service Plan",
+        "15. Social Media"
+    ]
+
+    # Calculate the number of activities in each column (assuming 3 columns with roughly equal distribution)
+    num_per_column = len(activities) // 3 + (1 if len(activities) % 3 > 0 else 0)
+
+    # Prepare data for the table, ensuring each row has three columns
+    table_data = [activities[i:i+num_per_column] for i in range(0, len(activities), num_per_column)]
+    # Ensure all rows have 3 columns (fill missing with empty strings)
+    for row in table_data:
+        while len(row) < 3:
+            row.append("")
+
+    # Create the table for activities legend
+    activities_table = Table(table_data)
+    activities_table.setStyle(TableStyle([
+        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+        ('FONTSIZE', (0,0), (-1,-1), 8),
+        # Adjust paddings and spacing as necessary
+        ('LEFTPADDING', (0,0), (-1,-1), 1),  # Reduced padding
+        ('RIGHTPADDING', (0,0), (-1,-1), 1),
+        ('TOPPADDING', (0,0), (-1,-1), 1),
+        ('BOTTOMPADDING', (0,0), (-1,-1), 1),
+    ]))
+
+    # Add the table to the elements
+    elements.append(activities_table)
+    
+    # Build and save the PDF
+    footer = _footer("CareTech ADL Chart PDF", generated_at)
+    doc.build(elements, onFirstPage=footer, onLaterPages=footer)
+
+
+def build_emar_chart_pdf(output, resident_name, year_month, emar_data, generated_at=None):
+    """
+    Lay out a resident's monthly eMAR: one row per medication and time slot, one column per day.
+
+    Args:
+        output: File name or binary file object the PDF is written to.
+        resident_name (str): Resident shown in the title.
+        year_month (str): Month in 'YYYY-MM' format.
+        emar_data (list): eMAR entries as returned by /fetch_emar_data_for_month.
+        generated_at (datetime): Time printed in the footer; defaults to now.
+    """
+    doc = SimpleDocTemplate(output, pagesize=landscape(letter), topMargin=20, leftMargin=36, rightMargin=36, bottomMargin=36)
+    styles = getSampleStyleSheet()
+    elements = [Paragraph(f"eMAR {resident_name} - {year_month}", styles['Title']), Spacer(1, 8)]
+
+    days_in_month = calendar.monthrange(int(year_month.split('-')[0]), int(year_month.split('-')[1]))[1]
+    rows = {}
+    for entry in emar_data:
+        # PRN and Controlled entries carry a time ('YYYY-MM-DD HH:MM:SS') and no slot
+        day = int(entry['chart_date'].split()[0].split('-')[2])
+        label = f"{entry['medication_name']} ({entry.get('time_slot') or 'PRN'})"
+        cells = rows.setdefault(label, [''] * days_in_month)
+        if entry.get('administered'):
+            cells[day - 1] = entry['administered'] if not cells[day - 1] else 'ADM'
+
+    table_data = [["Medication"] + [str(day) for day in range(1, days_in_month + 1)]]
+    table_data += [[label] + cells for label, cells in sorted(rows.items())]
+    table = Table(table_data, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('GRID', (0,0), (-1,-1), 1, colors.black),
+        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+        ('ALIGN', (1,0), (-1,-1), 'CENTER'),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ('FONTSIZE', (0,0), (-1,-1), 7),
+    ]))
+    elements.append(table)
+
+    footer = _footer("CareTech eMAR PDF", generated_at)
+    doc.build(elements, onFirstPage=footer, onLaterPages=footer)
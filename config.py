@@ -1,3 +1,5 @@
+import os
+
 global_config = {
     'logged_in_user': None,
     'is_admin': None,
@@ -6,11 +8,66 @@ global_config = {
     'theme': None,
     'font': None,
     'resident_names': None,
-    'resident_care_levels': None
+    'resident_care_levels': None,
+    'resident_count': None,
+    'server_version': None,
+    'month_availability': None
 }
 
 # Heroku API URL
 #API_URL = 'https://resident-mgmt-flask-651cd3003add.herokuapp.com'
 
 # Local API URL
-API_URL = 'http://127.0.0.1:5000'
\ No newline at end of file
+API_URL = 'http://127.0.0.1:5000'
+
+# Encrypted cache of closed months' chart data (see month_cache.py); 0 bytes disables it
+MONTH_CACHE_DIR = os.environ.get('RESIDENT_MGMT_MONTH_CACHE_DIR', 'month_cache')
+MONTH_CACHE_MAX_BYTES = int(os.environ.get('RESIDENT_MGMT_MONTH_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+# Audit events that could not be delivered to the API yet (see audit_queue.py)
+AUDIT_SPILL_PATH = os.environ.get('RESIDENT_MGMT_AUDIT_SPILL_PATH', 'audit_spill.jsonl')
+
+# Local SQLite database used by the standalone/offline deployment
+DB_PATH = os.environ.get('RESIDENT_MGMT_DB_PATH', 'resident_data.db')
+
+# MySQL server database (used by the API server and schema_migrations.py)
+MYSQL_CONFIG = {
+    'host': os.environ.get('RESIDENT_MGMT_MYSQL_HOST', '127.0.0.1'),
+    'user': os.environ.get('RESIDENT_MGMT_MYSQL_USER', ''),
+    'password': os.environ.get('RESIDENT_MGMT_MYSQL_PASSWORD', ''),
+    'database': os.environ.get('RESIDENT_MGMT_MYSQL_DATABASE', 'resident_data'),
+}
+
+# API server database backend: 'mysql' (MYSQL_CONFIG) or 'sqlite' (SERVER_DB_PATH, no external services)
+DB_BACKEND = os.environ.get('RESIDENT_MGMT_DB_BACKEND', 'mysql')
+SERVER_DB_PATH = os.environ.get('RESIDENT_MGMT_SERVER_DB_PATH', 'server_data.db')
+
+# API server connection pool (per worker process)
+DB_POOL_SIZE = int(os.environ.get('RESIDENT_MGMT_DB_POOL_SIZE', 10))
+DB_POOL_RECYCLE = int(os.environ.get('RESIDENT_MGMT_DB_POOL_RECYCLE', 1800))  # Seconds before a connection is replaced
+DB_POOL_TIMEOUT = int(os.environ.get('RESIDENT_MGMT_DB_POOL_TIMEOUT', 10))  # Seconds a request waits for a connection
+DB_POOL_PING_INTERVAL = int(os.environ.get('RESIDENT_MGMT_DB_POOL_PING_INTERVAL', 30))  # Idle seconds before a health check
+
+# API server audit write-behind queue (server/audit_writer.py)
+AUDIT_QUEUE_SIZE = int(os.environ.get('RESIDENT_MGMT_AUDIT_QUEUE_SIZE', 10000))  # Rows held before clients get 503
+AUDIT_BATCH_SIZE = int(os.environ.get('RESIDENT_MGMT_AUDIT_BATCH_SIZE', 500))  # Rows per INSERT
+AUDIT_FLUSH_INTERVAL = float(os.environ.get('RESIDENT_MGMT_AUDIT_FLUSH_INTERVAL', 1.0))  # Seconds
+AUDIT_WRITER_SPILL_PATH = os.environ.get('RESIDENT_MGMT_AUDIT_WRITER_SPILL_PATH', 'server_audit_spill.jsonl')
+# Client event times further than this before receipt (queued offline) are noted in the details, not used as log_time
+AUDIT_CLIENT_TIME_WINDOW = int(os.environ.get('RESIDENT_MGMT_AUDIT_CLIENT_TIME_WINDOW', 300))  # Seconds
+
+# API server access tokens (HS256). The secret must be identical on every API worker/host.
+JWT_SECRET_KEY = os.environ.get('RESIDENT_MGMT_JWT_SECRET_KEY', '')
+# Access tokens carry role and initials; a short TTL bounds how long a changed role stays in use
+JWT_ACCESS_TTL = int(os.environ.get('RESIDENT_MGMT_JWT_ACCESS_TTL', 900))  # Seconds
+JWT_REFRESH_TTL = int(os.environ.get('RESIDENT_MGMT_JWT_REFRESH_TTL', 12 * 3600))  # Seconds of inactivity before re-login
+SERVER_CACHE_TTL = float(os.environ.get('RESIDENT_MGMT_SERVER_CACHE_TTL', 60))  # Seconds a worker may serve cached settings
+
+# Password hashing on the API server (server/passwords.py). BCRYPT_ROUNDS is a bcrypt cost
+# factor, or 'auto' to pick the highest cost hashing within BCRYPT_TARGET_MS on each worker;
+# pin a number when workers run on different hardware.
+BCRYPT_ROUNDS = os.environ.get('RESIDENT_MGMT_BCRYPT_ROUNDS', 'auto')
+BCRYPT_TARGET_MS = int(os.environ.get('RESIDENT_MGMT_BCRYPT_TARGET_MS', 250))
+BCRYPT_WORKERS = int(os.environ.get('RESIDENT_MGMT_BCRYPT_WORKERS', 2))  # Threads per API worker
+BCRYPT_QUEUE_SIZE = int(os.environ.get('RESIDENT_MGMT_BCRYPT_QUEUE_SIZE', 64))
+BCRYPT_TIMEOUT = float(os.environ.get('RESIDENT_MGMT_BCRYPT_TIMEOUT', 30))  # Seconds
@@ -1,11 +1,18 @@
-import sqlite3
+from db_functions import db_connection, get_connection
+import schema_migrations
 
 
 def initialize_database():
-    # Connect to SQLite database
-    # The database file will be 'resident_data.db'
-    conn = sqlite3.connect('resident_data.db')
-    c = conn.cursor()
+    # Use the pooled connection so the schema is created in the database file
+    # configured by config.DB_PATH (WAL mode and pragmas are applied on open)
+    with db_connection() as conn:
+        _create_tables(conn.cursor())
+
+    # Secondary indexes are versioned in schema_migrations
+    schema_migrations.run_migrations(get_connection(), 'sqlite')
+
+
+def _create_tables(c):
 
     
     # CREATE TABLE IF NOT EXISTS users (
@@ -145,6 +152,3 @@ def initialize_database():
 #     unique (resident_id, chart_date)
 # )
 # engine=InnoDB;
-
-    conn.commit()
-    conn.close()
\ No newline at end of file
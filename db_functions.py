@@ -1,9 +1,213 @@
 import sqlite3
+import threading
+import atexit
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import config
+import audit_queue
+from adl_fields import ADL_KEYS
+
+
+# ---------------------------- Connection Pool ---------------------------- #
+
+# One long-lived connection per thread. sqlite3 connections must not be shared
+# across threads, so each loader thread gets its own handle and keeps its page
+# cache warm between calls instead of reconnecting every time.
+_local = threading.local()
+_all_connections = set()
+_pool_lock = threading.Lock()
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,       # Negative value is in KiB (~20 MB per connection)
+    'mmap_size': 268435456,     # 256 MB of memory-mapped I/O
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,       # Milliseconds to wait on a locked database
+}
+
+
+def _open_connection(db_path):
+    """Open a new SQLite connection and apply the performance pragmas."""
+    conn = sqlite3.connect(db_path, timeout=SQLITE_PRAGMAS['busy_timeout'] / 1000)
+    for pragma, value in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    with _pool_lock:
+        _all_connections.add(conn)
+    return conn
+
+
+def get_connection():
+    """
+    Return the calling thread's pooled connection, opening it on first use.
+    The connection is reopened if config.DB_PATH has changed since it was opened.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.db_path != config.DB_PATH:
+        close_connection()
+        clear_id_cache()
+        conn = None
+    if conn is None:
+        conn = _open_connection(config.DB_PATH)
+        _local.conn = conn
+        _local.db_path = config.DB_PATH
+        _local.depth = 0
+    return conn
+
+
+@contextmanager
+def db_connection():
+    """
+    Context manager around the calling thread's pooled connection.
+
+    Commits when the outermost block exits cleanly and rolls back on error, so
+    nested helpers (e.g. get_resident_id inside a save) share one transaction.
+    """
+    conn = get_connection()
+    _local.depth += 1
+    try:
+        yield conn
+    except BaseException:
+        if _local.depth == 1:
+            conn.rollback()
+        raise
+    else:
+        if _local.depth == 1:
+            conn.commit()
+    finally:
+        _local.depth -= 1
+
+
+def close_connection():
+    """Close the calling thread's pooled connection, if it has one."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        with _pool_lock:
+            _all_connections.discard(conn)
+        conn.close()
+        _local.conn = None
+
+
+def close_all_connections():
+    """Close every pooled connection. Called on application shutdown."""
+    with _pool_lock:
+        connections = list(_all_connections)
+        _all_connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.ProgrammingError:
+            pass  # Owned by another thread; closed when that thread exits
+    _local.conn = None
+
+
+atexit.register(close_all_connections)
+
+
+# ---------------------------- Id Resolution Cache ---------------------------- #
+
+# In-process name -> id identity maps. Only ids that exist are cached, so an
+# insert never needs to invalidate; renames and removals must call the
+# invalidate_* helpers below.
+_resident_ids = {}
+_medication_ids = {}
+_id_cache_lock = threading.Lock()
+
+
+def get_resident_id(resident_name):
+    """Return the id of the named resident, or None if there is no such resident."""
+    resident_id = _resident_ids.get(resident_name)
+    if resident_id is not None:
+        return resident_id
+
+    with db_connection() as conn:
+        result = conn.execute("SELECT id FROM residents WHERE name = ?", (resident_name,)).fetchone()
+    if result is None:
+        return None
+
+    with _id_cache_lock:
+        _resident_ids[resident_name] = result[0]
+    return result[0]
+
+
+def get_medication_id(medication_name, resident_id):
+    """Return the id of a resident's medication, or None if it does not exist."""
+    key = (resident_id, medication_name)
+    medication_id = _medication_ids.get(key)
+    if medication_id is not None:
+        return medication_id
+
+    with db_connection() as conn:
+        result = conn.execute("SELECT id FROM medications WHERE medication_name = ? AND resident_id = ?",
+                              (medication_name, resident_id)).fetchone()
+    if result is None:
+        return None
+
+    with _id_cache_lock:
+        _medication_ids[key] = result[0]
+    return result[0]
+
+
+def get_resident_and_medication_ids(resident_name, medication_name):
+    """Return (resident_id, medication_id); either may be None if not found."""
+    resident_id = get_resident_id(resident_name)
+    if resident_id is None:
+        return None, None
+    return resident_id, get_medication_id(medication_name, resident_id)
+
+
+def invalidate_resident_id(resident_name):
+    """Drop a resident, and every medication cached under it, from the id cache."""
+    with _id_cache_lock:
+        resident_id = _resident_ids.pop(resident_name, None)
+        if resident_id is not None:
+            for key in [key for key in _medication_ids if key[0] == resident_id]:
+                del _medication_ids[key]
+
+
+def invalidate_medication_id(medication_name, resident_id):
+    """Drop a single medication from the id cache."""
+    with _id_cache_lock:
+        _medication_ids.pop((resident_id, medication_name), None)
+
+
+def month_bounds(year_month):
+    """
+    Return the half-open ['YYYY-MM-01', first of next month) range for a 'YYYY-MM' string.
+
+    Dates are stored as ISO text ('YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'), which sort
+    lexicographically, so `date >= start AND date < end` can use an index on date
+    where strftime(...) = ? or LIKE 'YYYY-MM%' cannot.
+    """
+    year, month = (int(part) for part in year_month.split('-')[:2])
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year:04d}-{month:02d}-01", f"{next_year:04d}-{next_month:02d}-01"
+
+
+def day_bounds(date_str):
+    """Return the half-open [date, next day) range for a 'YYYY-MM-DD' string."""
+    day = datetime.strptime(date_str[:10], '%Y-%m-%d').date()
+    return day.isoformat(), (day + timedelta(days=1)).isoformat()
+
+
+def clear_id_cache():
+    """Empty both identity maps, e.g. after switching to a different database file."""
+    with _id_cache_lock:
+        _resident_ids.clear()
+        _medication_ids.clear()
+
+
+def log_action(username, activity, details):
+    """Queue an audit event for background delivery; never blocks the write path that calls it."""
+    audit_queue.log_action(config.API_URL, username, activity, details)
+
+
+# ---------------------------- Resident / Medication Queries ---------------------------- #
 
 
 def fetch_resident_information(resident_name):
     """Fetch and decrypt a resident's information from the database."""
-    with sqlite3.connect('resident_data.db') as conn:
+    with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT name, date_of_birth FROM residents WHERE name = ?", (resident_name,))
         result = cursor.fetchone()
@@ -16,60 +220,49 @@ def fetch_resident_information(resident_name):
 
 
 def update_resident_info(old_name, new_name, new_dob):
-    with sqlite3.connect('resident_data.db') as conn:
+    with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("UPDATE residents SET name = ?, date_of_birth = ? WHERE name = ?", (new_name, new_dob, old_name))
-        conn.commit()
+    invalidate_resident_id(old_name)
 
 
 def remove_resident(resident_name):
     """ Removes a resident from the database. """
-    with sqlite3.connect('resident_data.db') as conn:
+    with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('DELETE FROM residents WHERE name = ?', (resident_name,))
-        conn.commit()
+    invalidate_resident_id(resident_name)
 
 
 def remove_medication(medication_name, resident_name):
     resident_id = get_resident_id(resident_name)
-    # Connect to the database
-    conn = sqlite3.connect('resident_data.db')
-    c = conn.cursor()
 
     try:
-        # Start a transaction
-        conn.execute('BEGIN')
+        # All deletes run in a single transaction on the pooled connection
+        with db_connection() as conn:
+            c = conn.cursor()
 
-        # Get the medication ID
-        c.execute('SELECT id FROM medications WHERE medication_name = ? AND resident_id = ?', (medication_name, resident_id))
-        medication_id = c.fetchone()
-        if medication_id:
-            medication_id = medication_id[0]
+            medication_id = get_medication_id(medication_name, resident_id)
+            if medication_id:
+                # Delete related entries from medication_time_slots
+                c.execute('DELETE FROM medication_time_slots WHERE medication_id = ?', (medication_id,))
 
-            # Delete related entries from medication_time_slots
-            c.execute('DELETE FROM medication_time_slots WHERE medication_id = ?', (medication_id,))
+                # Delete related entries from emar_chart
+                c.execute('DELETE FROM emar_chart WHERE medication_id = ?', (medication_id,))
 
-            # Delete related entries from emar_chart
-            c.execute('DELETE FROM emar_chart WHERE medication_id = ?', (medication_id,))
+                # Finally, delete the medication itself
+                c.execute('DELETE FROM medications WHERE id = ?', (medication_id,))
 
-            # Finally, delete the medication itself
-            c.execute('DELETE FROM medications WHERE id = ?', (medication_id,))
-
-        # Commit the transaction
-        conn.commit()
+        invalidate_medication_id(medication_name, resident_id)
         log_action(config.global_config['logged_in_user'], 'Medication Deleted', f'{medication_name} removed')
         print(f"Medication '{medication_name}' and all related data successfully removed.")
     except Exception as e:
-        # Rollback in case of error
-        conn.rollback()
+        # db_connection has already rolled back
         print(f"Error removing medication: {e}")
-    finally:
-        # Close the connection
-        conn.close()
 
 
 def fetch_medication_details(medication_name, resident_id):
-    with sqlite3.connect('resident_data.db') as conn:
+    with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT medication_name, dosage, instructions FROM medications WHERE medication_name = ? AND resident_id = ?", (medication_name, resident_id))
         result = cursor.fetchone()
@@ -80,24 +273,21 @@ def fetch_medication_details(medication_name, resident_id):
 
 
 def update_medication_details(old_name, resident_id, new_name, new_dosage, new_instructions):
-    with sqlite3.connect('resident_data.db') as conn:
+    with db_connection() as conn:
         encrypted_new_dosage = encrypt_data(new_dosage)
         encrypted_new_instructions = encrypt_data(new_instructions)
         cursor = conn.cursor()
         cursor.execute("UPDATE medications SET medication_name = ?, dosage = ?, instructions = ? WHERE medication_name = ? AND resident_id = ?", (new_name, encrypted_new_dosage, encrypted_new_instructions, old_name, resident_id))
-        conn.commit()
+    invalidate_medication_id(old_name, resident_id)
 
 
 def get_controlled_medication_count_and_form(resident_name, medication_name):
-    with sqlite3.connect('resident_data.db') as conn:
-        cursor = conn.cursor()
+    resident_id = get_resident_id(resident_name)
+    if resident_id is None:
+        return None, None  # Resident not found
 
-        # Fetch the resident ID based on the resident's name
-        cursor.execute("SELECT id FROM residents WHERE name = ?", (resident_name,))
-        resident_id_result = cursor.fetchone()
-        if resident_id_result is None:
-            return None, None  # Resident not found
-        resident_id = resident_id_result[0]
+    with db_connection() as conn:
+        cursor = conn.cursor()
 
         # Fetch the count and form for the specified controlled medication
         cursor.execute('''
@@ -113,15 +303,10 @@ def get_controlled_medication_count_and_form(resident_name, medication_name):
 
 
 def save_controlled_administration_data(resident_name, medication_name, admin_data, new_count):
-    with sqlite3.connect('resident_data.db') as conn:
-        cursor = conn.cursor()
+    resident_id, medication_id = get_resident_and_medication_ids(resident_name, medication_name)
 
-        # Retrieve resident ID and medication ID
-        cursor.execute("SELECT id FROM residents WHERE name = ?", (resident_name,))
-        resident_id = cursor.fetchone()[0]
-
-        cursor.execute("SELECT id FROM medications WHERE medication_name = ? AND resident_id = ?", (medication_name, resident_id))
-        medication_id = cursor.fetchone()[0]
+    with db_connection() as conn:
+        cursor = conn.cursor()
 
         # Insert administration data into emar_chart, including the new count
         cursor.execute('''
@@ -136,14 +321,12 @@ def save_controlled_administration_data(resident_name, medication_name, admin_da
             WHERE id = ?
         ''', (new_count, medication_id))
 
-        conn.commit()
-
 
 def discontinue_medication(resident_name, medication_name, discontinued_date):
     # Get the resident's ID
     resident_id = get_resident_id(resident_name)
     if resident_id is not None:
-        with sqlite3.connect('resident_data.db') as conn:
+        with db_connection() as conn:
             cursor = conn.cursor()
 
             # Update the medication record with the discontinued date
@@ -152,29 +335,31 @@ def discontinue_medication(resident_name, medication_name, discontinued_date):
                 SET discontinued_date = ? 
                 WHERE resident_id = ? AND medication_name = ? AND (discontinued_date IS NULL OR discontinued_date = '')
             ''', (discontinued_date, resident_id, medication_name))
-            
-            conn.commit()
 
 
 def filter_active_medications(medication_names, resident_name):
-    active_medications = []
-
-    with sqlite3.connect('resident_data.db') as conn:
-        cursor = conn.cursor()
+    """
+    Return the medications from medication_names that are still active for the resident.
 
-        for med_name in medication_names:
-            cursor.execute('''
-                SELECT discontinued_date FROM medications
-                JOIN residents ON medications.resident_id = residents.id
-                WHERE residents.name = ? AND medications.medication_name = ?
-            ''', (resident_name, med_name))
-            result = cursor.fetchone()
+    A medication is active unless it has a discontinued_date on or before today. All
+    names are checked in a single query covered by idx_medications_resident_name.
+    """
+    if not medication_names:
+        return []
 
-            # Check if the medication is discontinued and if the discontinuation date is past the current date
-            if result is None or (result[0] is None or datetime.now().date() < datetime.strptime(result[0], '%Y-%m-%d').date()):
-                active_medications.append(med_name)
+    placeholders = ', '.join('?' for _ in medication_names)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT medications.medication_name FROM medications
+            JOIN residents ON medications.resident_id = residents.id
+            WHERE residents.name = ? AND medications.medication_name IN ({placeholders})
+            AND medications.discontinued_date IS NOT NULL AND medications.discontinued_date != ''
+            AND medications.discontinued_date <= date('now', 'localtime')
+        ''', (resident_name, *medication_names))
+        discontinued = {row[0] for row in cursor.fetchall()}
 
-    return active_medications
+    return [med_name for med_name in medication_names if med_name not in discontinued]
 
 
 def fetch_discontinued_medications(resident_name):
@@ -186,15 +371,12 @@ def fetch_discontinued_medications(resident_name):
     """
     discontinued_medications = {}
 
-    with sqlite3.connect('resident_data.db') as conn:
-        cursor = conn.cursor()
+    resident_id = get_resident_id(resident_name)
+    if resident_id is None:
+        return discontinued_medications  # Resident not found
 
-        # Fetch the resident's ID
-        cursor.execute("SELECT id FROM residents WHERE name = ?", (resident_name,))
-        resident_id_result = cursor.fetchone()
-        if resident_id_result is None:
-            return discontinued_medications  # Resident not found
-        resident_id = resident_id_result[0]
+    with db_connection() as conn:
+        cursor = conn.cursor()
 
         # Fetch discontinued medications
         cursor.execute('''
@@ -211,7 +393,7 @@ def fetch_discontinued_medications(resident_name):
 
 
 def save_non_medication_order(resident_id, order_name, frequency, specific_days, special_instructions):
-    with sqlite3.connect('resident_data.db') as conn:
+    with db_connection() as conn:
         cursor = conn.cursor()
         
         # Prepare the frequency and specific_days values for insertion
@@ -228,8 +410,6 @@ def save_non_medication_order(resident_id, order_name, frequency, specific_days,
             VALUES (?, ?, ?, ?, ?)
         ''', (resident_id, order_name, frequency_value, specific_days, special_instructions))
 
-        conn.commit()
-
 
 def update_non_med_order_details(order_name, resident_id, new_order_name, new_instructions):
     """
@@ -241,7 +421,7 @@ def update_non_med_order_details(order_name, resident_id, new_order_name, new_in
         new_order_name (str): The new name for the order.
         new_instructions (str): The new special instructions for the order.
     """
-    with sqlite3.connect('resident_data.db') as conn:
+    with db_connection() as conn:
         cursor = conn.cursor()
 
         # Prepare the SQL statement for updating the order details.
@@ -257,9 +437,6 @@ def update_non_med_order_details(order_name, resident_id, new_order_name, new_in
         # Execute the SQL statement with the new values and the original order name and resident ID.
         cursor.execute(sql, (new_order_name, new_instructions, order_name, resident_id))
         
-        # Commit the transaction to save changes.
-        conn.commit()
-        
         if cursor.rowcount == 0:
             # If no rows were updated, it could mean the order name/resident ID didn't match.
             print("No order was updated. Please check the order name and resident ID.")
@@ -275,18 +452,13 @@ def remove_non_med_order(order_name, resident_name):
         order_name (str): The name of the non-medication order to be removed.
         resident_name (str): The name of the resident from whom the order is to be removed.
     """
-    with sqlite3.connect('resident_data.db') as conn:
-        cursor = conn.cursor()
-
-        # First, get the resident ID for the given resident name to ensure accuracy
-        cursor.execute("SELECT id FROM residents WHERE name = ?", (resident_name,))
-        resident_result = cursor.fetchone()
-        
-        if resident_result is None:
-            print(f"No resident found with the name {resident_name}.")
-            return
+    resident_id = get_resident_id(resident_name)
+    if resident_id is None:
+        print(f"No resident found with the name {resident_name}.")
+        return
 
-        resident_id = resident_result[0]
+    with db_connection() as conn:
+        cursor = conn.cursor()
 
         # Prepare the SQL statement for deleting the non-medication order
         sql = """
@@ -297,9 +469,6 @@ def remove_non_med_order(order_name, resident_name):
         # Execute the SQL statement with the order name and resident ID
         cursor.execute(sql, (order_name, resident_id))
         
-        # Commit the transaction to save changes
-        conn.commit()
-        
         if cursor.rowcount == 0:
             # If no rows were deleted, it means the order name/resident ID didn't match any record
             print("No non-medication order was removed. Please check the order name and resident name.")
@@ -308,33 +477,30 @@ def remove_non_med_order(order_name, resident_name):
 
 
 def fetch_administrations_for_order(order_id, month, year):
-    # Connect to the SQLite database
-    conn = sqlite3.connect('resident_data.db')
-    cursor = conn.cursor()
-
-    # Update the query to include the initials field
-    query = """
-    SELECT administration_date, notes, initials
-    FROM non_med_order_administrations
-    WHERE order_id = ? AND strftime('%m', administration_date) = ? AND strftime('%Y', administration_date) = ?
-    ORDER BY administration_date ASC
-    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
 
-    # Execute the query
-    cursor.execute(query, (order_id, month.zfill(2), year))
+        # Update the query to include the initials field
+        query = """
+        SELECT administration_date, notes, initials
+        FROM non_med_order_administrations
+        WHERE order_id = ? AND administration_date >= ? AND administration_date < ?
+        ORDER BY administration_date ASC
+        """
 
-    # Fetch and format the results, now including initials
-    results = cursor.fetchall()
-    formatted_results = [[datetime.strptime(row[0], '%Y-%m-%d').strftime('%b %d, %Y'), row[1], row[2]] for row in results]
+        # Execute the query
+        cursor.execute(query, (order_id, *month_bounds(f"{year}-{month}")))
+
+        # Fetch and format the results, now including initials
+        results = cursor.fetchall()
 
-    # Close the database connection
-    conn.close()
+    formatted_results = [[datetime.strptime(row[0], '%Y-%m-%d').strftime('%b %d, %Y'), row[1], row[2]] for row in results]
 
     return formatted_results
 
 
 def record_non_med_order_performance(order_name, resident_id, notes, user_initials):
-    with sqlite3.connect('resident_data.db') as conn:
+    with db_connection() as conn:
         cursor = conn.cursor()
 
         # Step 1: Look up the order_id
@@ -362,84 +528,61 @@ def record_non_med_order_performance(order_name, resident_id, notes, user_initia
             WHERE order_id = ?
         ''', (current_date, order_id))
 
-        conn.commit()
         log_action(config.global_config['logged_in_user'], 'Non-Medication Order Administered', f'{order_name} administered for {resident_id}')
 
 
-ADL_KEYS = [
-                "first_shift_sp", "second_shift_sp", "first_shift_activity1", "first_shift_activity2",
-                "first_shift_activity3", "second_shift_activity4", "first_shift_bm", "second_shift_bm",
-                "shower", "shampoo", "sponge_bath", "peri_care_am", "peri_care_pm", "oral_care_am", "oral_care_pm",
-                "nail_care", "skin_care", "shave", "breakfast", "lunch", "dinner", "snack_am",
-                "snack_pm", "water_intake"]
-
-
-
 def fetch_adl_chart_data_for_month(resident_name, year_month):
     # year_month should be in the format 'YYYY-MM'
     resident_id = get_resident_id(resident_name)
-    with sqlite3.connect('resident_data.db') as conn:
+    with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT * FROM adl_chart
-            WHERE resident_id = ? AND strftime('%Y-%m', date) = ?
+            WHERE resident_id = ? AND date >= ? AND date < ?
             ORDER BY date
-        ''', (resident_id, year_month))
+        ''', (resident_id, *month_bounds(year_month)))
         return cursor.fetchall()
 
 
 def save_adl_data_from_chart_window(resident_name, year_month, window_values):
     resident_id = get_resident_id(resident_name)
-    with sqlite3.connect('resident_data.db') as conn:
-        cursor = conn.cursor()
-        # Define the number of days
-        num_days = 31
-
-        # Loop over each day of the month
-        for day in range(1, num_days + 1):
-            # Extract values for each ADL key for the day
-            adl_data = [window_values[f'-{key}-{day}-'] for key in ADL_KEYS]
-            
-            # Construct the date string for the specific day
-            date_str = f"{year_month}-{str(day).zfill(2)}"
-            
-            # Prepare the SQL statement
-            sql = '''
-                INSERT INTO adl_chart (resident_id, date, first_shift_sp, second_shift_sp, 
-                first_shift_activity1, first_shift_activity2, first_shift_activity3, second_shift_activity4, 
-                first_shift_bm, second_shift_bm, shower, shampoo, sponge_bath, peri_care_am, 
-                peri_care_pm, oral_care_am, oral_care_pm, nail_care, skin_care, shave, 
-                breakfast, lunch, dinner, snack_am, snack_pm, water_intake)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(resident_id, date) DO UPDATE SET
-                first_shift_sp = excluded.first_shift_sp, second_shift_sp = excluded.second_shift_sp, 
-                first_shift_activity1 = excluded.first_shift_activity1, first_shift_activity2 = excluded.first_shift_activity2,
-                first_shift_activity3 = excluded.first_shift_activity3, second_shift_activity4 = excluded.second_shift_activity4,
-                first_shift_bm = excluded.first_shift_bm, second_shift_bm = excluded.second_shift_bm, shower = excluded.shower,
-                shampoo = excluded.shampoo,sponge_bath = excluded.sponge_bath, peri_care_am = excluded.peri_care_am, 
-                peri_care_pm = excluded.peri_care_pm, oral_care_am = excluded.oral_care_am, oral_care_pm = excluded.oral_care_pm,
-                nail_care = excluded.nail_care, skin_care = excluded.skin_care, shave = excluded.shave, breakfast = excluded.breakfast,
-                lunch = excluded.lunch, dinner = excluded.dinner, snack_am = excluded.snack_am, snack_pm = excluded.snack_pm,
-                water_intake = excluded.water_intake
-            '''
-            
-            # Execute the SQL statement
-            cursor.execute(sql, (resident_id, date_str, *adl_data))
-            
-        # Commit the changes to the database
-        conn.commit()
+    num_days = 31
+
+    # Build every day's row in one pass, then upsert the month in a single transaction
+    rows = []
+    for day in range(1, num_days + 1):
+        date_str = f"{year_month}-{str(day).zfill(2)}"
+        adl_data = [window_values[f'-{key}-{day}-'] for key in ADL_KEYS]
+        rows.append((resident_id, date_str, *adl_data))
+
+    sql = '''
+        INSERT INTO adl_chart (resident_id, date, first_shift_sp, second_shift_sp, 
+        first_shift_activity1, first_shift_activity2, first_shift_activity3, second_shift_activity4, 
+        first_shift_bm, second_shift_bm, shower, shampoo, sponge_bath, peri_care_am, 
+        peri_care_pm, oral_care_am, oral_care_pm, nail_care, skin_care, shave, 
+        breakfast, lunch, dinner, snack_am, snack_pm, water_intake)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(resident_id, date) DO UPDATE SET
+        first_shift_sp = excluded.first_shift_sp, second_shift_sp = excluded.second_shift_sp, 
+        first_shift_activity1 = excluded.first_shift_activity1, first_shift_activity2 = excluded.first_shift_activity2,
+        first_shift_activity3 = excluded.first_shift_activity3, second_shift_activity4 = excluded.second_shift_activity4,
+        first_shift_bm = excluded.first_shift_bm, second_shift_bm = excluded.second_shift_bm, shower = excluded.shower,
+        shampoo = excluded.shampoo,sponge_bath = excluded.sponge_bath, peri_care_am = excluded.peri_care_am, 
+        peri_care_pm = excluded.peri_care_pm, oral_care_am = excluded.oral_care_am, oral_care_pm = excluded.oral_care_pm,
+        nail_care = excluded.nail_care, skin_care = excluded.skin_care, shave = excluded.shave, breakfast = excluded.breakfast,
+        lunch = excluded.lunch, dinner = excluded.dinner, snack_am = excluded.snack_am, snack_pm = excluded.snack_pm,
+        water_intake = excluded.water_intake
+    '''
+
+    with db_connection() as conn:
+        conn.executemany(sql, rows)
 
 
 def save_prn_administration_data(resident_name, medication_name, admin_data):
-    with sqlite3.connect('resident_data.db') as conn:
-        cursor = conn.cursor()
-
-        # Retrieve resident ID and medication ID
-        cursor.execute("SELECT id FROM residents WHERE name = ?", (resident_name,))
-        resident_id = cursor.fetchone()[0]
+    resident_id, medication_id = get_resident_and_medication_ids(resident_name, medication_name)
 
-        cursor.execute("SELECT id FROM medications WHERE medication_name = ? AND resident_id = ?", (medication_name, resident_id))
-        medication_id = cursor.fetchone()[0]
+    with db_connection() as conn:
+        cursor = conn.cursor()
 
         # Insert administration data into emar_chart
         cursor.execute('''
@@ -447,39 +590,41 @@ def save_prn_administration_data(resident_name, medication_name, admin_data):
             VALUES (?, ?, ?, ?, ?)
         ''', (resident_id, medication_id, admin_data['datetime'], admin_data['initials'], admin_data['notes']))
 
-        conn.commit()
-
 
 def save_emar_data_from_chart_window(resident_name, year_month, window_values):
-    with sqlite3.connect('resident_data.db') as conn:
-        cursor = conn.cursor()
-        num_days = 31
-
-        for day in range(1, num_days + 1):
-            date_str = f"{year_month}-{str(day).zfill(2)}"
-            
-            for key, value in window_values.items():
-                if key.startswith('-') and key.endswith(f'-{day}-'):
-                    # Extract medication name and time slot from the key
-                    parts = key.strip('-').split('_')
-                    medication_name = '_'.join(parts[:-1])  # Rejoin all parts except the last one
-                    time_slot = parts[-1].split('-')[0]
-
-                    sql = '''
-                        INSERT INTO emar_chart (resident_id, medication_id, date, time_slot, administered)
-                        SELECT residents.id, medications.id, ?, ?, ?
-                        FROM residents, medications
-                        WHERE residents.name = ? AND medications.medication_name = ?
-                        ON CONFLICT(resident_id, medication_id, date, time_slot) DO UPDATE SET
-                        administered = excluded.administered
-                    '''
-                    cursor.execute(sql, (date_str, time_slot, value, resident_name, medication_name))
-
-        conn.commit()
+    resident_id = get_resident_id(resident_name)
+    if resident_id is None:
+        return
+
+    # Single pass over the window keys. Keys look like '-{medication}_{time_slot}-{day}-';
+    # PRN/Controlled cells ('-PRN_{medication}-{day}-') resolve to no medication and are skipped.
+    rows = []
+    for key, value in window_values.items():
+        if not (isinstance(key, str) and key.startswith('-') and key.endswith('-')):
+            continue
+        cell, _, day = key.strip('-').rpartition('-')
+        medication_name, _, time_slot = cell.rpartition('_')
+        if not (day.isdigit() and 1 <= int(day) <= 31 and medication_name):
+            continue
+
+        medication_id = get_medication_id(medication_name, resident_id)
+        if medication_id is None:
+            continue
+        rows.append((resident_id, medication_id, f"{year_month}-{day.zfill(2)}", time_slot, value))
+
+    sql = '''
+        INSERT INTO emar_chart (resident_id, medication_id, date, time_slot, administered)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(resident_id, medication_id, date, time_slot) DO UPDATE SET
+        administered = excluded.administered
+    '''
+
+    with db_connection() as conn:
+        conn.executemany(sql, rows)
 
 
 def fetch_current_emar_data_for_resident_date(resident_name, date):
-    with sqlite3.connect('resident_data.db') as conn:
+    with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''SELECT m.medication_name, ec.time_slot, ec.administered, ec.date
                           FROM emar_chart ec
@@ -491,23 +636,14 @@ def fetch_current_emar_data_for_resident_date(resident_name, date):
 
 
 def save_emar_data_from_management_window(emar_data):
-    with sqlite3.connect('resident_data.db') as conn:
+    with db_connection() as conn:
         cursor = conn.cursor()
 
         for entry in emar_data:
-            # Fetch the resident_id
-            cursor.execute("SELECT id FROM residents WHERE name = ?", (entry['resident_name'],))
-            resident_id_result = cursor.fetchone()
-            if resident_id_result is None:
-                continue  # Skip if resident not found
-            resident_id = resident_id_result[0]
-
-            # Fetch medication_id based on resident_id and unencrypted medication_name
-            cursor.execute("SELECT id FROM medications WHERE resident_id = ? AND medication_name = ?", (resident_id, entry['medication_name']))
-            medication_id_result = cursor.fetchone()
-            if medication_id_result is None:
-                continue  # Skip if medication not found
-            medication_id = medication_id_result[0]
+            # Ids come from the in-process cache after the first lookup
+            resident_id, medication_id = get_resident_and_medication_ids(entry['resident_name'], entry['medication_name'])
+            if medication_id is None:
+                continue  # Skip if resident or medication not found
 
             # Insert or update emar_chart data
             cursor.execute('''
@@ -517,20 +653,18 @@ def save_emar_data_from_management_window(emar_data):
                 DO UPDATE SET administered = excluded.administered
             ''', (resident_id, medication_id, entry['date'], entry['time_slot'], entry['administered']))
 
-        conn.commit()
-
 
 def fetch_emar_data_for_month(resident_name, year_month):
-    with sqlite3.connect('resident_data.db') as conn:
+    resident_id = get_resident_id(resident_name)
+    with db_connection() as conn:
         cursor = conn.cursor()
-        # Query to fetch eMAR data for the given month and resident
+        # Query to fetch eMAR data for the given month and resident (idx_emar_chart_resident_date)
         cursor.execute('''
             SELECT m.medication_name, e.date, e.time_slot, e.administered
             FROM emar_chart e
-            JOIN residents r ON e.resident_id = r.id
             JOIN medications m ON e.medication_id = m.id
-            WHERE r.name = ? AND strftime('%Y-%m', e.date) = ?
-        ''', (resident_name, year_month))
+            WHERE e.resident_id = ? AND e.date >= ? AND e.date < ?
+        ''', (resident_id, *month_bounds(year_month)))
         return cursor.fetchall()
 
 
@@ -541,19 +675,17 @@ def fetch_prn_data_for_day(event_key, resident_name, year_month):
     day = day.zfill(2)  # Ensure day is two digits
     date_query = f'{year_month}-{day}'
 
-    # Debugging: Print the values
-    # print(f"Medication Name: {med_name}, Date Query: {date_query}")
+    resident_id, medication_id = get_resident_and_medication_ids(resident_name, med_name)
 
-    with sqlite3.connect('resident_data.db') as conn:
+    with db_connection() as conn:
         cursor = conn.cursor()
+        # Range on date so the (resident_id, medication_id, date, time_slot) key is used
         query = '''
             SELECT e.date, e.administered, e.notes
             FROM emar_chart e
-            JOIN residents r ON e.resident_id = r.id
-            JOIN medications m ON e.medication_id = m.id
-            WHERE r.name = ? AND m.medication_name = ? AND e.date LIKE ?
+            WHERE e.resident_id = ? AND e.medication_id = ? AND e.date >= ? AND e.date < ?
         '''
-        cursor.execute(query, (resident_name, med_name, date_query + '%'))
+        cursor.execute(query, (resident_id, medication_id, *day_bounds(date_query)))
         result = cursor.fetchall()
     
         return result
@@ -566,42 +698,36 @@ def fetch_controlled_data_for_day(event_key, resident_name, year_month):
     day = day.zfill(2)  # Ensure day is two digits
     date_query = f'{year_month}-{day}'
 
-    with sqlite3.connect('resident_data.db') as conn:
+    resident_id, medication_id = get_resident_and_medication_ids(resident_name, med_name)
+
+    with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT e.date, e.administered, e.notes, e.current_count
             FROM emar_chart e
-            JOIN residents r ON e.resident_id = r.id
             JOIN medications m ON e.medication_id = m.id
-            WHERE r.name = ? AND m.medication_name = ? AND e.date LIKE ? AND m.medication_type = 'Controlled'
-        ''', (resident_name, med_name, date_query + '%'))
+            WHERE e.resident_id = ? AND e.medication_id = ? AND e.date >= ? AND e.date < ? AND m.medication_type = 'Controlled'
+        ''', (resident_id, medication_id, *day_bounds(date_query)))
         return cursor.fetchall()
 
 
 def fetch_monthly_medication_data(resident_name, medication_name, year_month, medication_type):
-    with sqlite3.connect('resident_data.db') as conn:
-        cursor = conn.cursor()
+    resident_id, medication_id = get_resident_and_medication_ids(resident_name, medication_name)
+    if medication_id is None:
+        return []  # Medication not found
 
-        resident_id = get_resident_id(resident_name)
-
-        # Fetch medication ID
-        cursor.execute("SELECT id FROM medications WHERE medication_name = ? AND resident_id = ?", (medication_name, resident_id))
-        medication_id_result = cursor.fetchone()
-        if not medication_id_result:
-            return []  # Medication not found
-        medication_id = medication_id_result[0]
+    with db_connection() as conn:
+        cursor = conn.cursor()
 
-        # Query for the entire month
-        year, month = year_month.split('-')
-        start_date = f"{year}-{month}-01"
-        end_date = f"{year}-{month}-{calendar.monthrange(int(year), int(month))[1]}"
+        # Query for the entire month; half-open so timestamps on the last day are included
+        start_date, end_date = month_bounds(year_month)
 
         if medication_type == 'Control':
             # For Controlled medications, include count information
             cursor.execute('''
                 SELECT date, administered, notes, current_count
                 FROM emar_chart
-                WHERE resident_id = ? AND medication_id = ? AND date BETWEEN ? AND ?
+                WHERE resident_id = ? AND medication_id = ? AND date >= ? AND date < ?
                 ORDER BY date
             ''', (resident_id, medication_id, start_date, end_date))
         else:
@@ -609,7 +735,7 @@ def fetch_monthly_medication_data(resident_name, medication_name, year_month, me
             cursor.execute('''
                 SELECT date, administered, notes
                 FROM emar_chart
-                WHERE resident_id = ? AND medication_id = ? AND date BETWEEN ? AND ?
+                WHERE resident_id = ? AND medication_id = ? AND date >= ? AND date < ?
                 ORDER BY date
             ''', (resident_id, medication_id, start_date, end_date))
 
@@ -617,15 +743,15 @@ def fetch_monthly_medication_data(resident_name, medication_name, year_month, me
 
 
 def does_emars_chart_data_exist(resident_name, year_month):
-    with sqlite3.connect('resident_data.db') as conn:
+    resident_id = get_resident_id(resident_name)
+    with db_connection() as conn:
         cursor = conn.cursor()
         # Query to check if there is any eMAR chart data for the resident in the given month
         cursor.execute('''
             SELECT EXISTS(
                 SELECT 1 FROM emar_chart
-                JOIN residents ON emar_chart.resident_id = residents.id
-                WHERE residents.name = ? AND strftime('%Y-%m', emar_chart.date) = ?
+                WHERE resident_id = ? AND date >= ? AND date < ?
             )
-        ''', (resident_name, year_month))
+        ''', (resident_id, *month_bounds(year_month)))
         return cursor.fetchone()[0] == 1
 
@@ -1,3 +1,6 @@
+-- Base tables. Secondary indexes are added by numbered migrations:
+--     python schema_migrations.py mysql --verify
+
 create table if not exists users (
 	user_id int auto_increment primary key,
     username varchar(150) unique not null,
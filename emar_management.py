@@ -3,6 +3,7 @@ import api_functions
 import db_functions
 from datetime import datetime
 import config
+import month_availability
 from datetime import datetime
 from progress_bar import show_loading_window, show_progress_bar
 
@@ -98,7 +99,7 @@ def add_medication_window(resident_name):
             # Insert the new medication
             #success = api_functions.insert_medication(API_URL, resident_name, medication_name, dosage, instructions, medication_type, selected_time_slots, medication_form, medication_count)
             success = show_progress_bar(api_functions.insert_medication, API_URL, resident_name, medication_name, dosage, instructions, medication_type, selected_time_slots, medication_form, medication_count)
-            if success == 'token_expired':
+            if api_functions.session_expired():
                 from new_main import logout
                 logout()
             elif success:
@@ -639,8 +640,14 @@ def edit_non_med_order_window(selected_resident):
     window.close()
 
 
-def get_emar_tab_layout(resident_name, all_medications_data, active_medications, non_medication_orders, existing_emar_data):
-    
+def get_emar_sections(all_medications_data, active_medications, non_medication_orders, existing_emar_data):
+    """
+    Frames of the eMAR tab that depend on the resident: scheduled medications
+    by time slot, non-medication orders due today, PRN and Controlled.
+
+    Returns:
+        tuple: (layout rows, True if every scheduled medication has been administered)
+    """
     filtered_medications_data = filter_medications_data(all_medications_data, active_medications)
     
     #existing_emar_data = api_functions.fetch_emar_data_for_resident(API_URL, resident_name)
@@ -695,9 +702,19 @@ def get_emar_tab_layout(resident_name, all_medications_data, active_medications,
         controlled_section_frame = sg.Frame('Controlled Medications', controlled_section_layout, font=(FONT_BOLD, 12))
         sections.append([controlled_section_frame])
 
+    return sections, all_administered
+
+
+def get_emar_tab_layout(resident_name, all_medications_data, active_medications, non_medication_orders, existing_emar_data):
+    
+    sections, all_administered = get_emar_sections(all_medications_data, active_medications, non_medication_orders, existing_emar_data)
 
     is_admin = config.global_config['is_admin']
     
+    # Only months the server has eMAR data for (see month_availability.py)
+    chart_years, chart_months, default_year, default_month = month_availability.picker_choices(
+        month_availability.available_months(config.global_config['month_availability'], resident_name, 'emar'))
+
     # Bottom part of the layout with buttons
     bottom_layout = [
         [sg.Text('', expand_x=True), sg.Button('Save', key='-EMAR_SAVE-', font=(FONT, 11), disabled=all_administered), 
@@ -708,19 +725,86 @@ def get_emar_tab_layout(resident_name, all_medications_data, active_medications,
          sg.Button('Edit Non-Medication Order', key='-EDIT_NON_MEDICATION-', font=(FONT, 11)), sg.Button('View Non-Medication Orders', font=(FONT, 11), key='-NON_MEDICATION_ORDERS-'), sg.Text('', expand_x=True)],
         [sg.Text('', expand_x=True), sg.Button('View Current Month eMARS Chart', key='CURRENT_EMAR_CHART', font=(FONT, 11)), sg.Button('Generate Medication List', key='-MED_LIST-', font=(FONT, 11)), sg.Text('', expand_x=True)],
         [sg.Text('', expand_x=True), sg.Text('Search eMARS Chart by Month and Year', font=(FONT, 11)), sg.Text('', expand_x=True)],
-        [sg.Text(text="", expand_x=True), sg.Text(text="Enter Month: (MM)", font=(FONT, 11)), sg.InputText(size=4, key="-EMAR_MONTH-"), sg.Text("Enter Year: (YYYY)", font=(FONT, 11)), sg.InputText(size=5, key='-EMAR_YEAR-'), sg.Button("Search", key='-EMAR_SEARCH-', font=(FONT, 11)), sg.Text(text="", expand_x=True)]
+        [sg.Text(text="", expand_x=True), sg.Text(text="Month:", font=(FONT, 11)), sg.Combo(chart_months.get(default_year, []), default_value=default_month, size=(4,1), key="-EMAR_MONTH-", readonly=True), sg.Text("Year:", font=(FONT, 11)), sg.Combo(chart_years, default_value=default_year, size=(6,1), key='-EMAR_YEAR-', readonly=True, enable_events=True), sg.Button("Search", key='-EMAR_SEARCH-', font=(FONT, 11), disabled=not chart_years), sg.Text(text="", expand_x=True)]
     ]
 
-    combined_layout = sections + bottom_layout
+    # The resident's sections sit in their own Column inside -EMAR_BODY- so update_emar_tab can swap them
+    sections_container = sg.Column([[sg.Column(sections, key='-EMAR_SECTIONS-', pad=(0, 0))]], key='-EMAR_BODY-', pad=(0, 0))
+    combined_layout = [[sections_container]] + bottom_layout
     #print(combined_layout)
 
     # Create a scrollable container for the combined layout
-    scrollable_layout = sg.Column(combined_layout, scrollable=True, vertical_scroll_only=True, size=(750, 695))  # Adjust the size as needed
+    scrollable_layout = sg.Column(combined_layout, scrollable=True, vertical_scroll_only=True, size=(750, 695), key='-EMAR_SCROLL-')  # Adjust the size as needed
 
     # Return the scrollable layout
     return [[scrollable_layout]]
 
 
+def update_emar_tab(window, resident_name, all_medications_data, active_medications, non_medication_orders, existing_emar_data):
+    """
+    Show another resident's eMAR tab in the existing window: the medication
+    sections are rebuilt and swapped in, the buttons and month pickers below
+    them are only updated.
+    """
+    sections, all_administered = get_emar_sections(all_medications_data, active_medications, non_medication_orders, existing_emar_data)
+    replace_column(window, '-EMAR_BODY-', '-EMAR_SECTIONS-', sections)
+
+    window['-EMAR_SAVE-'].update(disabled=all_administered)
+
+    chart_years, chart_months, default_year, default_month = month_availability.picker_choices(
+        month_availability.available_months(config.global_config['month_availability'], resident_name, 'emar'))
+    window['-EMAR_YEAR-'].update(values=chart_years, value=default_year)
+    window['-EMAR_MONTH-'].update(values=chart_months.get(default_year, []), value=default_month)
+    window['-EMAR_SEARCH-'].update(disabled=not chart_years)
+
+    # The sections may be taller or shorter than before
+    window['-EMAR_SCROLL-'].contents_changed()
+
+
+def replace_column(window, container_key, column_key, rows):
+    """
+    Replace the Column `column_key` inside `container_key` with a new Column of `rows`.
+
+    PySimpleGUI cannot remove elements, so the old Column's row frame is
+    destroyed and its keys and layout row dropped from the window before
+    extend_layout packs the new one; otherwise the new elements would be
+    renamed as duplicate keys and window.read() would still visit the old ones.
+
+    This relies on PySimpleGUI 4.60 internals (ParentRowFrame, AllKeysDict, Rows);
+    requirements.txt pins that version. tests/test_replace_column.py covers it.
+    """
+    old_column = window[column_key]
+    old_column.ParentRowFrame.destroy()
+    for key in _element_keys(old_column):
+        window.AllKeysDict.pop(key, None)
+    _drop_layout_row(window, old_column)
+
+    window.extend_layout(window[container_key], [[sg.Column(rows, key=column_key, pad=(0, 0))]])
+
+
+def _element_keys(element):
+    keys = [element.Key]
+    for row in getattr(element, 'Rows', []):
+        for child in row:
+            keys.extend(_element_keys(child))
+    return keys
+
+
+def _drop_layout_row(container, element):
+    """Remove the layout row holding `element` from `container` or a container below it."""
+    for row in container.Rows:
+        if any(child is element for child in row):
+            container.Rows.remove(row)
+            return True
+        for child in row:
+            if getattr(child, 'Rows', None) and _drop_layout_row(child, element):
+                if child.Key is None and not child.Rows and len(row) == 1:
+                    # The keyless Column extend_layout wrapped the element in
+                    container.Rows.remove(row)
+                return True
+    return False
+
+
 # if __name__ == "__main__":
 #     # Create the eMAR tab layout for a specific resident
 #     eMAR_tab_layout = get_emar_tab_layout("Resident Name")
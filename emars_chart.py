@@ -5,18 +5,13 @@ import db_functions
 import api_functions
 import config
 from progress_bar import show_progress_bar
+from chart_grid import ChartGrid, GridRow, INPUT, READONLY, LABEL, BAR
+from chart_model import emar_model
 
 API_URL = config.API_URL
 
 FONT = config.global_config['font']
 
-# Define the width of the label cell and regular cells
-label_cell_width = 12  # This may need to be adjusted to align perfectly
-regular_cell_width = 5  # This may need to be adjusted to align perfectly
-
-# Define the spacer width to align with the table header
-spacer_width = 3  # Adjust as needed
-
 # Define the number of days
 num_days = 31
 
@@ -25,57 +20,26 @@ def create_horizontal_bar(text):
     return [sg.Text(f'{text}', justification='center', expand_x=True, relief=sg.RELIEF_SUNKEN)]
 
 
-def create_row_label(text):
-    return [sg.Text(f'{text}', size=(label_cell_width+7, 1), pad=(0,0), justification='center')]
-
-
-def create_row_label_noninput(text):
-    return [sg.Text(f'{text}', size=(label_cell_width+8, 1), pad=(0,0), justification='center')]
-
-
-def create_input_text(key):
-    return [sg.InputText(size=(regular_cell_width, 1), pad=(3, 3), justification='center', key=f'-{key}-{i}-') for i in range(1, num_days + 1)]
-
-
-def create_prn_controlled_input_text(key):
-    return [sg.InputText(size=(regular_cell_width, 1), 
-                         pad=(3, 3), 
-                         justification='center', 
-                         key=f'-{key}-{i}-', 
-                         readonly=True,
-                         text_color='blue',
-                         font = ('Helvetica', 10, 'bold'), 
-                         enable_events=True) for i in range(1, num_days + 1)]
-
-
-def create_medication_section(medication_name, medication_info):
-    section_layout = []
-    section_layout.append(create_row_label_noninput(medication_name))
-    section_layout.append(create_row_label_noninput(f"{medication_info['dosage']}"))
-    section_layout.append(create_row_label_noninput(f"{medication_info['instructions']}"))
-
+def create_medication_rows(medication_name, medication_info):
+    rows = [GridRow(None, medication_name, LABEL),
+            GridRow(None, f"{medication_info['dosage']}", LABEL),
+            GridRow(None, f"{medication_info['instructions']}", LABEL)]
     for time_slot in medication_info['time_slots']:
-        row = create_row_label(time_slot)  + [sg.Text('      ')] + create_input_text(f"{medication_name}_{time_slot}")
-        section_layout.append(row)
-
-    section_layout.append(create_horizontal_bar(''))  # End with a horizontal bar
-    return section_layout
-
+        rows.append(GridRow(f"{medication_name}_{time_slot}", time_slot, INPUT, source=(medication_name, time_slot)))
+    rows.append(GridRow(None, '', BAR))  # End with a horizontal bar
+    return rows
 
-def create_prn_controlled_medication_section(medication_name, medication_info, type='PRN'):
-    section_layout = []
-    section_layout.append(create_row_label_noninput(medication_name))
-    section_layout.append(create_row_label_noninput(f"{medication_info['dosage']}"))
-    section_layout.append(create_row_label_noninput(f"{medication_info['instructions']}"))
 
-    # Adding a label to indicate that this is a PRN medication
-    # section_layout.append(create_row_label("As Needed (PRN)"))
-    row = create_row_label("As Needed (PRN)" if type=='PRN' else "Controlled Medication") + [sg.Text('      ')] + create_prn_controlled_input_text(f"{type}_{medication_name}")
-    section_layout.append(row)
-    table_view_button = [sg.Text('     '),sg.Button('Table View', key=f'-TABLE_VIEW_{type}_{medication_name}-')]
-    section_layout.append(table_view_button)
-    section_layout.append(create_horizontal_bar(''))  # End with a horizontal bar
-    return section_layout
+def create_prn_controlled_medication_rows(medication_name, medication_info, type='PRN'):
+    rows = [GridRow(None, medication_name, LABEL),
+            GridRow(None, f"{medication_info['dosage']}", LABEL),
+            GridRow(None, f"{medication_info['instructions']}", LABEL)]
+    # Clicking the row label opens the month's table view
+    label = "As Needed (PRN)" if type == 'PRN' else "Controlled Medication"
+    rows.append(GridRow(f"{type}_{medication_name}", label, READONLY, event=f'-TABLE_VIEW_{type}_{medication_name}-',
+                        source=(medication_name, None)))
+    rows.append(GridRow(None, '', BAR))  # End with a horizontal bar
+    return rows
 
 
 # def create_prn_details_window(event_key, resident_name, year_month, medication_name):
@@ -274,13 +238,6 @@ def show_emar_chart(resident_name, year_month, emar_data, discontinued_medicatio
     # Define the number of days
     num_days = 31
 
-    # Define the width of the label cell and regular cells
-    label_cell_width = 22  # This may need to be adjusted to align perfectly
-    regular_cell_width = 5  # This may need to be adjusted to align perfectly
-
-    # Empty row for the table to just show headers
-    data = [[]]  # No data rows, only headers
-
     # Parse the year and month
     year, month_number = year_month.split('-')
     month_name = calendar.month_name[int(month_number)]
@@ -361,41 +318,29 @@ def show_emar_chart(resident_name, year_month, emar_data, discontinued_medicatio
 
     # Use filtered_new_structure and filtered_prn_structure for creating the layout
 
-    # Medication layout
-    medication_layout = []
+    # Medication rows, drawn on one virtualised grid instead of an InputText per cell
+    grid_rows = []
     for med_name, med_info in filtered_new_structure.items():
-        medication_layout.extend(create_medication_section(med_name, med_info))
+        grid_rows.extend(create_medication_rows(med_name, med_info))
     for med_name, med_info in filtered_prn_structure.items():
-        medication_layout.extend(create_prn_controlled_medication_section(med_name, med_info))
+        grid_rows.extend(create_prn_controlled_medication_rows(med_name, med_info))
     for med_name, med_info in filtered_control_structure.items():
-        medication_layout.extend(create_prn_controlled_medication_section(med_name, med_info, type='Control'))
+        grid_rows.extend(create_prn_controlled_medication_rows(med_name, med_info, type='Control'))
+    grid = ChartGrid(grid_rows)
 
     # Define the layout of the window
     layout = [
         [sg.Text('CareTech Monthly eMAR Chart', font=('Helvetica', 16), justification='center', expand_x=True)],
         [sg.Text('RESIDENT:', size=(10, 1)), sg.Text(f'{resident_name}', key='-RESIDENT-', size=(20, 1)),
         sg.Text('MONTH:', size=(10, 1)), sg.Text(f'{month_name} {year}', key='-MONTH-', size=(20, 1))],
-        # Table as a header row of cells
-        [sg.Table(values=data,
-              headings=[''] + [str(i) for i in range(1, num_days + 1)],
-              max_col_width=regular_cell_width,
-              auto_size_columns=False,
-              col_widths=[label_cell_width] + [regular_cell_width]*num_days,
-              display_row_numbers=False,
-              justification='center',
-              num_rows=0,
-              key='-TABLE-',
-              row_height=25,
-              pad=(0,0),
-              hide_vertical_scroll=True)],
         create_horizontal_bar(text=''),
-        [sg.Column(medication_layout, scrollable=True, vertical_scroll_only=True, size=(1600, 750))]
+        grid.layout()
     ]
 
     instruction_text = (
     "Instructions for Viewing PRN and Controlled Medication Details:\n"
-    "1. Select the PRN or Controlled Medication Day: Click on the input box for the day you wish to view.\n"
-    "2. Press Any Alphanumeric Key (A-Z or 0-9) to view the detailed administration records for that day.\n"
+    "1. Click a marked day of a PRN or Controlled Medication to view the administration records for that day.\n"
+    "2. Click the 'As Needed (PRN)' or 'Controlled Medication' label to view the records for the whole month.\n"
     )
     legend_text = ("Legend:\n"
     "- 'ADM' indicates the medication was administered on that day.\n"
@@ -405,89 +350,7 @@ def show_emar_chart(resident_name, year_month, emar_data, discontinued_medicatio
     layout.append([sg.Button('Save Changes Made'), sg.Button('Hide Buttons/Instructions')])
     # Create the window
     window = sg.Window(' CareTech Monthly eMARS', layout, finalize=True, resizable=True)
-
-    # # Convert the eMAR data into a more convenient structure
-    # emar_data_dict = {}
-    
-    # for med_name, date, time_slot, administered in emar_data:
-    #     if med_name not in emar_data_dict:
-    #         emar_data_dict[med_name] = {}
-    #     if date not in emar_data_dict[med_name]:
-    #         emar_data_dict[med_name][date] = {}
-    #     emar_data_dict[med_name][date][time_slot] = administered
-
-    # Correctly restructuring the eMAR data for GUI update
-    emar_data_dict = {}
-
-    for entry in emar_data:  # Directly using the list of dictionaries from emar_data
-        med_name = entry['medication_name']
-        date = entry['chart_date']
-        time_slot = entry['time_slot']
-        administered = entry['administered']
-
-        if med_name not in emar_data_dict:
-            emar_data_dict[med_name] = {}
-        if date not in emar_data_dict[med_name]:
-            emar_data_dict[med_name][date] = {}
-        emar_data_dict[med_name][date][time_slot] = administered
-    
-    # # print(original_structure)
-    
-    # print(prn_structure)
-    # print('-----------------------')
-    # print(new_structure)
-
-    # print(f'EMAR DATA DICT: {emar_data_dict}')
-
-    # # If data is found, update the layout fields accordingly
-    # for med_name, med_info in filtered_new_structure.items():
-    #     if med_info['type'] == 'Scheduled':
-    #         # Handle scheduled medications
-    #         for date, slots in emar_data_dict.get(med_name, {}).items():
-    #             day = int(date.split('-')[2])  # Extract the day from 'YYYY-MM-DD'
-    #             for time_slot, administered in slots.items():
-    #                 key = f'-{med_name}_{time_slot}-{day}-'
-    #                 if window[key]:
-    #                     window[key].update(administered)
-
-    for med_name, dates_info in emar_data_dict.items():
-        for date, slots in dates_info.items():
-            day = int(date.split('-')[2])  # Extract the day from 'YYYY-MM-DD'
-            for time_slot, administered in slots.items():
-                key = f'-{med_name}_{time_slot}-{day}-'
-                if key in window.AllKeysDict:  # Check if key exists
-                    window[key].update(administered)
-                else:
-                    print(f"Key not found in window: {key}")
-
-
-        # Update layout for PRN medications
-    for med_name in filtered_prn_structure.keys():
-        for datetime_string, slots in emar_data_dict.get(med_name, {}).items():
-            # Split the date and time, and then extract the day
-            date_part = datetime_string.split()[0]  # Get the 'YYYY-MM-DD' part
-            day = int(date_part.split('-')[2])  # Extract the day
-
-            control_key = f'-PRN_{med_name}-{day}-'
-            # Check if there is any administration data for the day
-            if any(slots.values()):
-                administered_text = 'ADM'  # Indicating at least one administration
-                if window[control_key]:
-                    window[control_key].update(administered_text)
-
-    # Update layout for Controlled medications
-    for med_name in filtered_control_structure.keys():
-        for datetime_string, slots in emar_data_dict.get(med_name, {}).items():
-            # Split the date and time, and then extract the day
-            date_part = datetime_string.split()[0]  # Get the 'YYYY-MM-DD' part
-            day = int(date_part.split('-')[2])  # Extract the day
-
-            control_key = f'-Control_{med_name}-{day}-'
-            # Check if there is any administration data for the day
-            if any(slots.values()):
-                administered_text = 'ADM'  # Indicating at least one administration
-                if window[control_key]:
-                    window[control_key].update(administered_text)
+    grid.attach(window)
 
     # Update layout for scheduled and PRN medications
     for med_name, med_info in filtered_new_structure.items():
@@ -497,12 +360,9 @@ def show_emar_chart(resident_name, year_month, emar_data, discontinued_medicatio
             # Calculate the day of the month to start showing 'DC'
             discontinue_day = int(discontinue_date.split('-')[2])
 
-            # Update the cells from the discontinuation date forward
-            for day in range(discontinue_day, num_days + 1):
-                for time_slot in med_info['time_slots']:
-                    key = f'-{med_name}_{time_slot}-{day}-'
-                    if window[key]:
-                        window[key].update('DC')
+            # Mark the cells from the discontinuation date forward
+            for time_slot in med_info['time_slots']:
+                grid.lock(f'{med_name}_{time_slot}', discontinue_day, 'DC')
 
         # Update layout for PRN medications
     for med_name in filtered_prn_structure.keys():
@@ -512,11 +372,8 @@ def show_emar_chart(resident_name, year_month, emar_data, discontinued_medicatio
             # Calculate the day of the month to start showing 'DC'
             discontinue_day = int(discontinue_date.split('-')[2])
 
-            # Update the cells from the discontinuation date forward
-            for day in range(discontinue_day, num_days + 1):
-                key = f'-PRN_{med_name}-{day}-'
-                if window[key]:
-                    window[key].update('DC')
+            # Mark the cells from the discontinuation date forward
+            grid.lock(f'PRN_{med_name}', discontinue_day, 'DC')
     
      # Update layout for Controlled medications
     for med_name in filtered_control_structure.keys():
@@ -526,12 +383,12 @@ def show_emar_chart(resident_name, year_month, emar_data, discontinued_medicatio
             # Calculate the day of the month to start showing 'DC'
             discontinue_day = int(discontinue_date.split('-')[2])
 
-            # Update the cells from the discontinuation date forward
-            for day in range(discontinue_day, num_days + 1):
-                key = f'-Control_{med_name}-{day}-'
-                if window[key]:
-                    window[key].update('DC')
-                    
+            # Mark the cells from the discontinuation date forward
+            grid.lock(f'Control_{med_name}', discontinue_day, 'DC')
+
+    # Fill every cell from the month's entries in one pass
+    grid.load(emar_model(grid.row_keys, emar_data))
+
     # Event Loop
     while True:
         event, values = window.read()
@@ -544,7 +401,7 @@ def show_emar_chart(resident_name, year_month, emar_data, discontinued_medicatio
             window['-LEGEND-'].update(visible=False)
         elif event == 'Save Changes Made':
             #print(f'VALUES: {values}')
-            success = api_functions.save_emar_data_from_chart_window(API_URL, resident_name, year_month, values)
+            success = api_functions.save_emar_data_from_chart_window(API_URL, resident_name, year_month, grid.values())
             #show_progress_bar(api_functions.save_adl_data_from_chart_window, API_URL, resident_name, year_month, values)
             if success:
                 sg.popup("Data saved successfully.")
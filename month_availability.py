@@ -0,0 +1,172 @@
+"""
+Which months have chart data, per resident.
+
+`month_availability` holds one row per resident and month with a `kinds` bitmap
+(EMAR, ADL, NON_MED) of the data recorded that month, kept current by triggers
+on emar_chart, adl_chart and non_medication_orders. The month pickers in
+resident management read it through a single /month_availability request
+instead of asking the server whether each month exists before opening a chart.
+
+Non-medication orders are not dated by month; the month of an order's
+`last_administered_date` is marked whenever it is set, and stays marked.
+
+Over the API each resident's months are sent as one 12-bit bitmap per kind and
+year (bit m-1 set when month m has data); `available_months` turns that back
+into 'YYYY-MM' strings.
+
+MySQL: schema migration 13 creates the table and triggers and backfills from
+emar_chart_history, adl_chart and non_medication_orders. The sqlite server
+backend creates the equivalent in server/schema_sqlite.sql.
+"""
+
+EMAR = 1
+ADL = 2
+NON_MED = 4
+KINDS = {'emar': EMAR, 'adl': ADL, 'non_med': NON_MED}
+
+CREATE_MONTH_AVAILABILITY = '''
+    CREATE TABLE IF NOT EXISTS month_availability (
+        resident_id INT NOT NULL,
+        month_start DATE NOT NULL,
+        kinds TINYINT UNSIGNED NOT NULL DEFAULT 0,
+        PRIMARY KEY (resident_id, month_start)
+    ) ENGINE=InnoDB
+'''
+
+
+def _mark(row, bit):
+    return f'''
+        INSERT INTO month_availability (resident_id, month_start, kinds)
+        VALUES ({row}.resident_id, DATE_FORMAT({row}.chart_date, '%Y-%m-01'), {bit})
+        ON DUPLICATE KEY UPDATE kinds = kinds | {bit}
+    '''
+
+
+def _unmark(row, bit, table):
+    """Clear the month's bit once no row of `table` is left in it."""
+    month_start = f"DATE_FORMAT({row}.chart_date, '%Y-%m-01')"
+    return f'''
+        UPDATE month_availability SET kinds = kinds & ~{bit}
+        WHERE resident_id = {row}.resident_id AND month_start = {month_start}
+            AND NOT EXISTS (SELECT 1 FROM {table} c WHERE c.resident_id = {row}.resident_id
+                            AND c.chart_date >= {month_start} AND c.chart_date < {month_start} + INTERVAL 1 MONTH)
+    '''
+
+
+def _chart_triggers(chart_table, history_table, bit):
+    return [
+        f"CREATE TRIGGER {chart_table}_availability_insert AFTER INSERT ON {chart_table} FOR EACH ROW {_mark('NEW', bit)}",
+        f'''
+        CREATE TRIGGER {chart_table}_availability_update AFTER UPDATE ON {chart_table} FOR EACH ROW
+        BEGIN
+            IF NOT (OLD.resident_id <=> NEW.resident_id) OR NOT (OLD.chart_date <=> NEW.chart_date) THEN
+                {_unmark('OLD', bit, history_table)};
+                {_mark('NEW', bit)};
+            END IF;
+        END
+        ''',
+        f"CREATE TRIGGER {chart_table}_availability_delete AFTER DELETE ON {chart_table} FOR EACH ROW "
+        f"{_unmark('OLD', bit, history_table)}",
+    ]
+
+
+def _non_med_trigger(event):
+    return f'''
+    CREATE TRIGGER non_medication_orders_availability_{event.lower()} AFTER {event} ON non_medication_orders FOR EACH ROW
+        INSERT INTO month_availability (resident_id, month_start, kinds)
+        SELECT NEW.resident_id, DATE_FORMAT(NEW.last_administered_date, '%Y-%m-01'), {NON_MED} FROM DUAL
+        WHERE NEW.resident_id IS NOT NULL AND NEW.last_administered_date IS NOT NULL
+        ON DUPLICATE KEY UPDATE kinds = kinds | {NON_MED}
+    '''
+
+
+# Archived eMAR months live in emar_chart_archive, so clearing a bit checks emar_chart_history
+AVAILABILITY_TRIGGERS = [
+    *_chart_triggers('emar_chart', 'emar_chart_history', EMAR),
+    *_chart_triggers('adl_chart', 'adl_chart', ADL),
+    _non_med_trigger('INSERT'),
+    _non_med_trigger('UPDATE'),
+]
+
+AVAILABILITY_TRIGGER_NAMES = [
+    f'{table}_availability_{event}'
+    for table in ('emar_chart', 'adl_chart') for event in ('insert', 'update', 'delete')
+] + ['non_medication_orders_availability_insert', 'non_medication_orders_availability_update']
+
+# Each kind appears once per (resident, month) in the union, so SUM(DISTINCT) is the OR of the bits
+BACKFILL_MONTH_AVAILABILITY = f'''
+    INSERT INTO month_availability (resident_id, month_start, kinds)
+    SELECT resident_id, month_start, SUM(DISTINCT kind) FROM (
+        SELECT DISTINCT resident_id, DATE_FORMAT(chart_date, '%Y-%m-01') AS month_start, {EMAR} AS kind
+        FROM emar_chart_history
+        UNION ALL
+        SELECT DISTINCT resident_id, DATE_FORMAT(chart_date, '%Y-%m-01'), {ADL} FROM adl_chart
+        UNION ALL
+        SELECT DISTINCT resident_id, DATE_FORMAT(last_administered_date, '%Y-%m-01'), {NON_MED}
+        FROM non_medication_orders WHERE last_administered_date IS NOT NULL
+    ) months
+    WHERE resident_id IS NOT NULL AND month_start IS NOT NULL
+    GROUP BY resident_id, month_start
+    ON DUPLICATE KEY UPDATE kinds = VALUES(kinds)
+'''
+
+
+def fetch_month_availability(cursor, resident_name=None):
+    """
+    Months with data for every resident, or only `resident_name`:
+    {resident_name: {kind: {'YYYY': bitmap of months}}} for kind in KINDS.
+    """
+    query = '''
+        SELECT r.name, a.month_start, a.kinds FROM month_availability a
+        JOIN residents r ON r.id = a.resident_id
+        WHERE a.kinds <> 0
+    '''
+    params = ()
+    if resident_name is not None:
+        query += " AND r.name = %s"
+        params = (resident_name,)
+    cursor.execute(query, params)
+
+    availability = {}
+    for name, month_start, kinds in cursor.fetchall():
+        month_start = str(month_start)
+        year, month = month_start[:4], int(month_start[5:7])
+        resident = availability.setdefault(name, {kind: {} for kind in KINDS})
+        for kind, bit in KINDS.items():
+            if kinds & bit:
+                resident[kind][year] = resident[kind].get(year, 0) | (1 << (month - 1))
+    return availability
+
+
+def available_months(availability, resident_name, *kinds):
+    """Sorted 'YYYY-MM' months in which the resident has data of any of `kinds`."""
+    resident = (availability or {}).get(resident_name, {})
+    months = set()
+    for kind in kinds:
+        for year, bitmap in resident.get(kind, {}).items():
+            months.update(f"{year}-{month:02d}" for month in range(1, 13) if bitmap & (1 << (month - 1)))
+    return sorted(months)
+
+
+def months_by_year(months):
+    """{'YYYY': ['MM', ...]} for sorted 'YYYY-MM' months."""
+    years = {}
+    for year_month in months:
+        year, month = year_month.split('-')
+        years.setdefault(year, []).append(month)
+    return years
+
+
+def picker_choices(months):
+    """
+    Values for a year / month picker pair over sorted 'YYYY-MM' months.
+
+    Returns:
+        tuple: (years newest first, {'YYYY': ['MM', ...]}, default year, default month);
+               the defaults are the latest month, or '' when there are no months.
+    """
+    by_year = months_by_year(months)
+    years = sorted(by_year, reverse=True)
+    if not years:
+        return [], by_year, '', ''
+    return years, by_year, years[0], by_year[years[0]][-1]
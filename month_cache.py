@@ -0,0 +1,153 @@
+"""
+Encrypted on-disk cache of closed-month chart data.
+
+A month's eMAR and ADL records stop changing once an admin closes it (see
+month_close.py), yet reviewing history used to download them again every time a
+chart was opened. MonthCache keeps those payloads on disk, encrypted with the
+Fernet key from encryption_utils, keyed by data kind, resident, month, when the
+month was closed and server version.
+
+Which months are closed comes from the server's /closed_months, recorded here
+with set_closed_months; months not reported closed are never cached. A month
+reopened and closed again gets a new close time and so new entries.
+
+Every read is revalidated with the ETag the server sent: a conditional request
+answered with 304 costs a round trip and no download, and a month reopened on
+another client is noticed on the next fetch. Only the immutable artefacts the
+server serves for closed months are stored. The cache holds at most
+MONTH_CACHE_MAX_BYTES; the least recently used entries are evicted first.
+
+Caching is off when RESIDENT_MGMT_DB_KEY is not set, because there is then no
+key to encrypt with.
+"""
+import hashlib
+import json
+import os
+import threading
+import config
+
+# {'YYYY-MM': closed_at} as last reported by /closed_months; None until fetched
+_closed_months = None
+
+
+def set_closed_months(months):
+    """Record the server's closed months ([{'month', 'closed_at', ...}] from /closed_months)."""
+    global _closed_months
+    _closed_months = {month['month']: month['closed_at'] for month in months}
+
+
+def closed_months_known():
+    return _closed_months is not None
+
+
+def forget_closed_months():
+    """Drop the recorded closed months (they changed on the server); the next fetch reloads them."""
+    global _closed_months
+    _closed_months = None
+
+
+def is_closed_month(year_month):
+    """True when the server reported `year_month` ('YYYY-MM') closed."""
+    return _closed_months is not None and year_month in _closed_months
+
+
+class MonthCache:
+    def __init__(self, directory, fernet, max_bytes):
+        """
+        Args:
+            directory (str): Where the encrypted entries are kept.
+            fernet: cryptography.fernet.Fernet used to encrypt entries at rest.
+            max_bytes (int): Total size of entries kept before evicting.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._fernet = fernet
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(json.dumps(key).encode()).hexdigest() + '.bin')
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (payload, etag) for a cached entry, or None. Revalidate the etag with the
+                   server before trusting the payload.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = json.loads(self._fernet.decrypt(f.read()))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Corrupt, or written under another key
+            print(f"Discarding unreadable month cache entry: {e}")
+            self._remove(path)
+            return None
+        if entry.get('key') != list(key):
+            return None
+        os.utime(path)  # Recency for eviction
+        return entry['payload'], entry.get('etag')
+
+    def put(self, key, payload, etag=None):
+        path = self._path(key)
+        data = self._fernet.encrypt(json.dumps({'key': list(key), 'etag': etag, 'payload': payload}).encode())
+        with self._lock:
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def discard(self, key):
+        with self._lock:
+            self._remove(self._path(key))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.bin'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            for name in os.listdir(self.directory):
+                if name.endswith('.bin'):
+                    self._remove(os.path.join(self.directory, name))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_month_cache():
+    """Process-wide MonthCache, or None when there is no encryption key to use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None and config.MONTH_CACHE_MAX_BYTES > 0 and os.environ.get('RESIDENT_MGMT_DB_KEY'):
+            from encryption_utils import fernet
+            _cache = MonthCache(config.MONTH_CACHE_DIR, fernet, config.MONTH_CACHE_MAX_BYTES)
+        return _cache
+
+
+def cache_key(kind, resident_name, year_month):
+    closed_at = (_closed_months or {}).get(year_month, '')
+    return (config.global_config.get('server_version') or '', kind, resident_name, year_month, closed_at)
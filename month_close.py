@@ -0,0 +1,337 @@
+"""
+Month close: freeze a month's chart data and serve precomputed artefacts.
+
+An admin closes a month once charting for it is complete. Closing:
+
+    1. records the month in `closed_months` (status 'closing') and commits, after
+       which BEFORE triggers on emar_chart and adl_chart reject any insert, update
+       or delete dated in that month;
+    2. builds, for every resident, the eMAR and ADL chart payloads (read from the
+       rollups, the same JSON /fetch_*_for_month serves for open months), the
+       non-medication orders in force, summary counts and chart PDFs, plus a
+       facility-wide summary;
+    3. stores each artefact once in `artefact_blobs` under the SHA-256 of its bytes
+       and maps (month, resident, kind) to that digest in `month_artefacts`;
+    4. marks the month 'closed'.
+
+Chart endpoints and existence checks answer closed months from month_artefacts
+without touching the chart tables, and `/artefacts/<digest>` serves stored bytes
+with the digest as an immutable ETag. `reopen_month` lifts the freeze for
+corrections and drops the month's artefacts.
+
+Non-medication orders are not dated by month, so they are snapshotted rather
+than frozen.
+
+MySQL: schema migration 12 creates the tables and triggers. The sqlite server
+backend creates the equivalent in server/schema_sqlite.sql.
+"""
+import calendar
+import hashlib
+import io
+import json
+from datetime import date, datetime, timedelta
+import rollups
+
+try:
+    import chart_pdfs
+except ImportError:  # reportlab not installed: close months without PDFs
+    chart_pdfs = None
+
+FACILITY = 0  # resident_id of facility-wide artefacts
+
+CREATE_CLOSED_MONTHS = '''
+    CREATE TABLE IF NOT EXISTS closed_months (
+        month_start DATE NOT NULL PRIMARY KEY,
+        status VARCHAR(20) NOT NULL DEFAULT 'closing',
+        closed_by VARCHAR(255),
+        closed_at DATETIME
+    ) ENGINE=InnoDB
+'''
+
+CREATE_ARTEFACT_BLOBS = '''
+    CREATE TABLE IF NOT EXISTS artefact_blobs (
+        digest CHAR(64) NOT NULL PRIMARY KEY,
+        content_type VARCHAR(100) NOT NULL,
+        size INT UNSIGNED NOT NULL,
+        body LONGBLOB NOT NULL
+    ) ENGINE=InnoDB
+'''
+
+CREATE_MONTH_ARTEFACTS = '''
+    CREATE TABLE IF NOT EXISTS month_artefacts (
+        month_start DATE NOT NULL,
+        resident_id INT NOT NULL,
+        kind VARCHAR(30) NOT NULL,
+        digest CHAR(64) NOT NULL,
+        PRIMARY KEY (month_start, resident_id, kind),
+        KEY idx_month_artefacts_digest (digest)
+    ) ENGINE=InnoDB
+'''
+
+
+def _reject_if_closed(row):
+    return f'''
+        IF EXISTS (SELECT 1 FROM closed_months
+                   WHERE month_start = {row}.chart_date - INTERVAL (DAY({row}.chart_date) - 1) DAY) THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'This month is closed; reopen it to make changes';
+        END IF;
+    '''
+
+
+FREEZE_TRIGGERS = [
+    statement
+    for table in ('emar_chart', 'adl_chart')
+    for statement in (
+        f'''
+        CREATE TRIGGER {table}_freeze_insert BEFORE INSERT ON {table} FOR EACH ROW
+        BEGIN
+            {_reject_if_closed('NEW')}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER {table}_freeze_update BEFORE UPDATE ON {table} FOR EACH ROW
+        BEGIN
+            {_reject_if_closed('OLD')}
+            {_reject_if_closed('NEW')}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER {table}_freeze_delete BEFORE DELETE ON {table} FOR EACH ROW
+        BEGIN
+            {_reject_if_closed('OLD')}
+        END
+        ''',
+    )
+]
+
+FREEZE_TRIGGER_NAMES = [f'{table}_freeze_{event}' for table in ('emar_chart', 'adl_chart')
+                        for event in ('insert', 'update', 'delete')]
+
+# Archived eMAR months live in emar_chart_archive on MySQL; the history view covers both
+EMAR_TABLE = {'mysql': 'emar_chart_history', 'sqlite': 'emar_chart'}
+
+STORE_BLOB_SQL = {
+    'mysql': "INSERT IGNORE INTO artefact_blobs (digest, content_type, size, body) VALUES (%s, %s, %s, %s)",
+    'sqlite': "INSERT OR IGNORE INTO artefact_blobs (digest, content_type, size, body) VALUES (%s, %s, %s, %s)",
+}
+
+
+class MonthCloseError(ValueError):
+    """The month cannot be closed or reopened in its current state."""
+
+
+def month_bounds(year_month):
+    """(first day, first day of next month) for 'YYYY-MM'; ValueError if malformed."""
+    start = datetime.strptime(year_month, '%Y-%m').date()
+    return start, start + timedelta(days=calendar.monthrange(start.year, start.month)[1])
+
+
+def _date_text(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else str(value)
+
+
+def non_med_month_payload(cursor, resident_id, year_month):
+    """Non-medication orders in force at any point in the month."""
+    start, end = month_bounds(year_month)
+    cursor.execute('''
+        SELECT order_name, frequency, specific_days, special_instructions, discontinued_date, last_administered_date
+        FROM non_medication_orders
+        WHERE resident_id = %s AND (discontinued_date IS NULL OR discontinued_date >= %s)
+        ORDER BY order_name
+    ''', (resident_id, start.isoformat()))
+    columns = ('order_name', 'frequency', 'specific_days', 'special_instructions', 'discontinued_date',
+               'last_administered_date')
+    orders = []
+    for row in cursor.fetchall():
+        order = dict(zip(columns, row))
+        for column in ('discontinued_date', 'last_administered_date'):
+            if order[column] is not None:
+                order[column] = _date_text(order[column])
+        orders.append(order)
+    return orders
+
+
+def month_summary(emar, adl, non_med):
+    administered = {}
+    for entry in emar:
+        if entry['administered']:
+            administered[entry['medication_name']] = administered.get(entry['medication_name'], 0) + 1
+    return {
+        'emar_entries': len(emar),
+        'emar_administered': sum(administered.values()),
+        'administered_by_medication': administered,
+        'adl_days_charted': len(adl),
+        'non_medication_orders': len(non_med),
+    }
+
+
+def _json_bytes(payload):
+    return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _pdf_bytes(build, *args):
+    buffer = io.BytesIO()
+    build(buffer, *args)
+    return buffer.getvalue()
+
+
+def store_blob(cursor, dialect, body, content_type):
+    """Store bytes under their SHA-256 (once, however many months share them) and return the digest."""
+    digest = hashlib.sha256(body).hexdigest()
+    cursor.execute(STORE_BLOB_SQL[dialect], (digest, content_type, len(body), body))
+    return digest
+
+
+def resident_artefacts(cursor, resident_id, resident_name, year_month, generated_at):
+    """
+    {kind: (bytes, content_type)} for one resident's month. Chart kinds are omitted when there is no data.
+    The charts are read from the rollups, as open months are served, so closing a month does not change them.
+    """
+    emar = rollups.emar_month_payload(cursor, resident_id, year_month)
+    adl = rollups.adl_month_payload(cursor, resident_id, year_month)
+    non_med = non_med_month_payload(cursor, resident_id, year_month)
+
+    artefacts = {'summary': (_json_bytes(month_summary(emar, adl, non_med)), 'application/json')}
+    if non_med:
+        artefacts['non_med'] = (_json_bytes(non_med), 'application/json')
+    if emar:
+        artefacts['emar'] = (_json_bytes(emar), 'application/json')
+        if chart_pdfs:
+            artefacts['emar_pdf'] = (_pdf_bytes(chart_pdfs.build_emar_chart_pdf, resident_name, year_month, emar,
+                                                generated_at), 'application/pdf')
+    if adl:
+        artefacts['adl'] = (_json_bytes(adl), 'application/json')
+        if chart_pdfs:
+            artefacts['adl_pdf'] = (_pdf_bytes(chart_pdfs.build_adl_chart_pdf, resident_name, year_month, adl,
+                                               generated_at), 'application/pdf')
+    return artefacts
+
+
+def close_month(conn, dialect, year_month, closed_by):
+    """
+    Freeze a month and precompute its artefacts.
+
+    Args:
+        conn: DB-API connection (mysql.connector or the sqlite server backend).
+        dialect (str): 'mysql' or 'sqlite'.
+        year_month (str): Month to close, 'YYYY-MM'. It must have ended.
+        closed_by (str): Username recorded against the close.
+
+    Returns:
+        dict: {'month', 'residents', 'artefacts', 'pdfs'} describing what was stored.
+
+    Raises:
+        MonthCloseError: The month has not ended or is already closed.
+    """
+    start, end = month_bounds(year_month)
+    if end > date.today():
+        raise MonthCloseError(f"{year_month} has not ended yet")
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT status FROM closed_months WHERE month_start = %s", (start.isoformat(),))
+        if cursor.fetchone() is not None:
+            raise MonthCloseError(f"{year_month} is already closed")
+        # Commit the freeze first, so no write can land while the artefacts are built
+        cursor.execute("INSERT INTO closed_months (month_start, status, closed_by, closed_at) VALUES (%s, 'closing', %s, NOW())",
+                       (start.isoformat(), closed_by))
+        conn.commit()
+
+        try:
+            generated_at = datetime.now()
+            cursor.execute("SELECT id, name FROM residents ORDER BY name")
+            residents = cursor.fetchall()
+            facility, stored, pdfs = {}, 0, 0
+            for resident_id, resident_name in residents:
+                artefacts = resident_artefacts(cursor, resident_id, resident_name, year_month, generated_at)
+                facility[resident_name] = json.loads(artefacts['summary'][0])
+                for kind, (body, content_type) in artefacts.items():
+                    digest = store_blob(cursor, dialect, body, content_type)
+                    cursor.execute("INSERT INTO month_artefacts (month_start, resident_id, kind, digest) VALUES (%s, %s, %s, %s)",
+                                   (start.isoformat(), resident_id, kind, digest))
+                    stored += 1
+                    pdfs += content_type == 'application/pdf'
+
+            digest = store_blob(cursor, dialect, _json_bytes({'month': year_month, 'residents': facility}), 'application/json')
+            cursor.execute("INSERT INTO month_artefacts (month_start, resident_id, kind, digest) VALUES (%s, %s, 'summary', %s)",
+                           (start.isoformat(), FACILITY, digest))
+            cursor.execute("UPDATE closed_months SET status = 'closed' WHERE month_start = %s", (start.isoformat(),))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            cursor.execute("DELETE FROM closed_months WHERE month_start = %s", (start.isoformat(),))
+            conn.commit()
+            raise
+    finally:
+        cursor.close()
+    return {'month': year_month, 'residents': len(residents), 'artefacts': stored + 1, 'pdfs': pdfs}
+
+
+def reopen_month(conn, year_month):
+    """Lift a month's freeze and drop its artefacts (blobs no other month uses are deleted)."""
+    start, _ = month_bounds(year_month)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM closed_months WHERE month_start = %s", (start.isoformat(),))
+        if not cursor.rowcount:
+            raise MonthCloseError(f"{year_month} is not closed")
+        cursor.execute("DELETE FROM month_artefacts WHERE month_start = %s", (start.isoformat(),))
+        cursor.execute("DELETE FROM artefact_blobs WHERE digest NOT IN (SELECT digest FROM month_artefacts)")
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def closed_months(cursor):
+    """[{'month', 'closed_by', 'closed_at'}] for every fully closed month, newest first."""
+    cursor.execute("SELECT month_start, closed_by, closed_at FROM closed_months WHERE status = 'closed' ORDER BY month_start DESC")
+    return [{'month': _date_text(month_start)[:7], 'closed_by': closed_by, 'closed_at': str(closed_at)}
+            for month_start, closed_by, closed_at in cursor.fetchall()]
+
+
+def is_month_closed(cursor, year_month):
+    start, _ = month_bounds(year_month)
+    cursor.execute("SELECT 1 FROM closed_months WHERE month_start = %s AND status = 'closed'", (start.isoformat(),))
+    return cursor.fetchone() is not None
+
+
+def resident_month_artefacts(cursor, resident_name, year_month):
+    """
+    {kind: digest} for a resident's closed month, in one indexed query; None if
+    the month is not closed (callers then read the live tables).
+    """
+    start, _ = month_bounds(year_month)
+    cursor.execute('''
+        SELECT a.kind, a.digest
+        FROM closed_months c
+        LEFT JOIN residents r ON r.name = %s
+        LEFT JOIN month_artefacts a ON a.month_start = c.month_start AND a.resident_id = r.id
+        WHERE c.month_start = %s AND c.status = 'closed'
+    ''', (resident_name, start.isoformat()))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    return {kind: digest for kind, digest in rows if kind}
+
+
+def month_artefact_index(cursor, year_month):
+    """{resident name (or '' for the facility): {kind: digest}} for a closed month."""
+    start, _ = month_bounds(year_month)
+    cursor.execute('''
+        SELECT COALESCE(r.name, ''), a.kind, a.digest
+        FROM month_artefacts a
+        JOIN closed_months c ON c.month_start = a.month_start AND c.status = 'closed'
+        LEFT JOIN residents r ON r.id = a.resident_id
+        WHERE a.month_start = %s
+    ''', (start.isoformat(),))
+    index = {}
+    for resident_name, kind, digest in cursor.fetchall():
+        index.setdefault(resident_name, {})[kind] = digest
+    return index
+
+
+def fetch_blob(cursor, digest):
+    """(content_type, bytes) of a stored artefact, or None."""
+    cursor.execute("SELECT content_type, body FROM artefact_blobs WHERE digest = %s", (digest,))
+    row = cursor.fetchone()
+    return (row[0], bytes(row[1])) if row else None
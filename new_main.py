@@ -16,13 +16,25 @@ from progress_bar import show_progress_bar, show_loading_window, show_loading_wi
 API_URL = config.API_URL
 
 # Function to load and apply the user's font and theme settings
-def apply_user_settings():
-    user_settings = api_functions.get_user_preferences(API_URL)
+def apply_user_settings(user_settings=None):
+    if user_settings is None:
+        user_settings = api_functions.get_user_preferences(API_URL)
     config.global_config['theme'] = user_settings['theme']
     config.global_config['font'] = user_settings['font']
     sg.theme(user_settings['theme'])
 
 
+def seed_session_caches(session):
+    """Fill the per-session caches from the login response instead of asking the server for each one."""
+    user = session['user']
+    config.global_config['logged_in_user'] = user['username']
+    config.global_config['is_admin'] = user['is_admin']
+    config.global_config['user_initials'] = user['initials']
+    config.global_config['resident_count'] = session['counts'].get('residents', 0)
+    config.global_config['server_version'] = session['server_version']
+    apply_user_settings(session['preferences'])
+
+
 # Apply user theme at application startup
 apply_user_settings()
 
@@ -344,6 +356,73 @@ def remove_user_window():
     window.close()
 
 
+def close_month_window():
+    """ Admin window to close finished months, download their survey files, or reopen them. """
+    def months_status():
+        closed = api_functions.fetch_closed_months(API_URL)
+        first_of_month = date.today().replace(day=1)
+        recent = []
+        for _ in range(12):
+            first_of_month = (first_of_month - timedelta(days=1)).replace(day=1)
+            recent.append(first_of_month.strftime('%Y-%m'))
+        closed_months = {month['month'] for month in closed}
+        return [month for month in recent if month not in closed_months], closed
+
+    open_months, closed = months_status()
+    layout = [
+        [sg.Text("Close a finished month to freeze its charts and prepare its PDFs.", font=(FONT, 12))],
+        [sg.Text("Month:"), sg.Combo(open_months, default_value=open_months[0] if open_months else '', key='-OPEN_MONTH-', readonly=True),
+         sg.Button("Close Month")],
+        [sg.Table(headings=['Month', 'Closed By', 'Closed At'], values=[[m['month'], m['closed_by'], m['closed_at']] for m in closed],
+                  key='-CLOSED_MONTHS-', auto_size_columns=False, col_widths=[10, 15, 20], num_rows=8, select_mode=sg.TABLE_SELECT_MODE_BROWSE)],
+        [sg.Button("Download Survey Files"), sg.Button("Reopen Month"), sg.Button("Cancel")]
+    ]
+
+    window = sg.Window("Close Month", layout)
+
+    while True:
+        event, values = window.read()
+        if event in (sg.WIN_CLOSED, "Cancel"):
+            break
+
+        if event == "Close Month":
+            year_month = values['-OPEN_MONTH-']
+            if not year_month:
+                continue
+            if sg.popup_yes_no(f"Close {year_month}? eMAR and ADL charts for {year_month} can no longer be changed unless it is reopened.",
+                               title="Confirm Close") != "Yes":
+                continue
+            ok, result = show_progress_bar(api_functions.close_month, API_URL, year_month)
+            if not ok:
+                sg.popup_error(f"Could not close {year_month}: {result}")
+                continue
+            sg.popup(f"{year_month} closed: {result['residents']} resident(s), {result['pdfs']} PDF(s) prepared.")
+        else:
+            selected = values['-CLOSED_MONTHS-']
+            if not selected:
+                sg.popup("Select a closed month first.")
+                continue
+            year_month = closed[selected[0]]['month']
+            if event == "Download Survey Files":
+                directory = sg.popup_get_folder(f"Save {year_month} files to:")
+                if directory:
+                    paths = show_progress_bar(api_functions.download_month_artefacts, API_URL, year_month, directory)
+                    sg.popup(f"Saved {len(paths)} file(s) to {directory}")
+                continue
+            if event == "Reopen Month":
+                if sg.popup_yes_no(f"Reopen {year_month} for corrections?", title="Confirm Reopen") != "Yes":
+                    continue
+                ok, message = api_functions.reopen_month(API_URL, year_month)
+                if not ok:
+                    sg.popup_error(f"Could not reopen {year_month}: {message}")
+                    continue
+
+        open_months, closed = months_status()
+        window['-OPEN_MONTH-'].update(values=open_months, value=open_months[0] if open_months else '')
+        window['-CLOSED_MONTHS-'].update(values=[[m['month'], m['closed_by'], m['closed_at']] for m in closed])
+    window.close()
+
+
 def login_window():
     layout = [
         [sg.Text("CareTech Facility Management", font=(FONT, 15), pad=10)],
@@ -362,21 +441,16 @@ def login_window():
             username = values['username']
             password = values['password']
             
-            # Wrap the validate_login function call with show_progress_bar
-            login_success = show_progress_bar(api_functions.validate_login, API_URL, username, password)
+            # One request returns the token plus the user's role, initials, reset flag, prefs and counters
+            session = show_progress_bar(api_functions.validate_login, API_URL, username, password)
             
-            if login_success:
-                # Log the successful login action
-                config.global_config['logged_in_user'] = username
+            if session:
+                seed_session_caches(session)
                 
-                # Checking if a password reset is needed
-                password_reset_needed = show_progress_bar(api_functions.needs_password_reset, API_URL, username)
-                
-                if password_reset_needed:
+                if session['user']['is_temp_password']:
                     window.close()
                     new_user_setup_window(username)
-                    resident_count = show_progress_bar(api_functions.get_resident_count, API_URL)
-                    display_welcome_window(resident_count, show_login=False)
+                    display_welcome_window(config.global_config['resident_count'], show_login=False)
                 else:
                     # Proceed to main application
                     sg.popup("Login Successful!", title="Success")
@@ -390,10 +464,11 @@ def login_window():
 
 def logout():
     """
-    Logs the user out by clearing the saved token and showing the login window.
+    Logs the user out by clearing the saved tokens and showing the login window.
     """
-    # Clear saved token
+    # Clear saved tokens
     keyring.set_password('CareTechApp', 'access_token', None)
+    keyring.set_password('CareTechApp', 'refresh_token', None)
 
     # Show login window
     display_welcome_window(api_functions.get_resident_count(API_URL), show_login=True, show_time_out=True)
@@ -401,27 +476,46 @@ def logout():
 
 def audit_logs_window():
     col_widths = [20, 15, 20, 70]  # Adjusted for readability
+    search_page_size = 50
     # Define the layout for the audit logs window
     layout = [
         [sg.Text('', expand_x=True), sg.Text('Admin Audit Logs', font=(FONT, 23)), sg.Text('', expand_x=True)],
+        [sg.Text("Search Descriptions:"), sg.InputText(key='-SEARCH_TEXT-', size=40), sg.Button("Search", bind_return_key=True)],
         [sg.Text("Filter by Username:"), sg.InputText(key='-USERNAME_FILTER-', size=14)],
         [sg.Text("Filter by Action:"), sg.Combo(['Resident Added', 'User Created', 'Medication Added', 'Add Non-Medication Order', 'Non-Medication Order Administered'], key='-ACTION_FILTER-', readonly=True)],
         [sg.Text("Filter by Date (YYYY-MM-DD):"), sg.InputText(key='-DATE_FILTER-', enable_events=True, size=10), sg.CalendarButton("Choose Date", target='-DATE_FILTER-', close_when_date_chosen=True, format='%Y-%m-%d')],
-        [sg.Button("Apply Filters"), sg.Button("Reset Filters")],
+        [sg.Button("Apply Filters"), sg.Button("Reset Filters"), sg.Button("Activity Summary")],
         [sg.Table(headings=['Date', 'Username', 'Action', 'Description'], values=[], key='-AUDIT_LOGS_TABLE-', auto_size_columns=False, display_row_numbers=True, num_rows=20, col_widths=col_widths, enable_click_events=True, select_mode=sg.TABLE_SELECT_MODE_BROWSE)],
+        [sg.Button("< Previous", key='-PREV_PAGE-', disabled=True), sg.Text('', key='-PAGE_LABEL-', size=10, justification='center'), sg.Button("Next >", key='-NEXT_PAGE-', disabled=True)],
         [sg.Button("Close")]
     ]
 
     window = sg.Window("Audit Logs", layout, finalize=True)
 
+    def show_logs(logs, page=None, has_more=False):
+        table_data = [[log['date'], log['username'], log['action'], log['description']] for log in logs]
+        window['-AUDIT_LOGS_TABLE-'].update(values=table_data)
+        # Paging only applies to search results
+        window['-PAGE_LABEL-'].update(f'Page {page}' if page else '')
+        window['-PREV_PAGE-'].update(disabled=not page or page == 1)
+        window['-NEXT_PAGE-'].update(disabled=not has_more)
+        return table_data
+
     # Function to load audit logs
     def load_audit_logs(username_filter='', action_filter='', date_filter=''):
         logs = api_functions.fetch_audit_logs(API_URL, last_10_days=True, username=username_filter, action=action_filter, date=date_filter)
-        table_data = [[log['date'], log['username'], log['action'], log['description']] for log in logs]
-        window['-AUDIT_LOGS_TABLE-'].update(values=[[log['date'], log['username'], log['action'], log['description']] for log in logs])
-        return table_data
+        return show_logs(logs if isinstance(logs, list) else [])
+
+    # Function to run a full-text search over log descriptions
+    def search_audit_logs(search_text, page, username_filter='', action_filter='', date_filter=''):
+        result = api_functions.search_audit_logs(API_URL, search_text, page=page, per_page=search_page_size, username=username_filter, action=action_filter, date=date_filter)
+        if not isinstance(result, dict):
+            sg.popup_error('Failed to search audit logs.')
+            return show_logs([])
+        return show_logs(result['results'], page=page, has_more=result['has_more'])
 
     original_table_data = load_audit_logs()  # Initial loading of logs
+    search_page = 1
 
     while True:
         event, values = window.read()
@@ -433,13 +527,78 @@ def audit_logs_window():
             clicked_row_data = original_table_data[row_index]
             description = clicked_row_data[3]  # Assuming the description is in the fourth column.
             sg.popup_scrolled(description, title='Detailed Description', size=(50, 10))
-        elif event == "Apply Filters":
-            original_table_data = load_audit_logs(username_filter=values['-USERNAME_FILTER-'], action_filter=values['-ACTION_FILTER-'], date_filter=values['-DATE_FILTER-'])
+        elif event in ("Search", "Apply Filters", '-PREV_PAGE-', '-NEXT_PAGE-'):
+            filters = dict(username_filter=values['-USERNAME_FILTER-'], action_filter=values['-ACTION_FILTER-'], date_filter=values['-DATE_FILTER-'])
+            search_text = values['-SEARCH_TEXT-'].strip()
+            if not search_text:
+                original_table_data = load_audit_logs(**filters)
+                continue
+            search_page = search_page - 1 if event == '-PREV_PAGE-' else search_page + 1 if event == '-NEXT_PAGE-' else 1
+            original_table_data = search_audit_logs(search_text, search_page, **filters)
         elif event == "Reset Filters":
+            window['-SEARCH_TEXT-'].update('')
             window['-USERNAME_FILTER-'].update('')
             window['-ACTION_FILTER-'].update('')
             window['-DATE_FILTER-'].update('')
             original_table_data = load_audit_logs()  # Reload logs without filters
+        elif event == "Activity Summary":
+            audit_summary_window()
+
+    window.close()
+
+
+def audit_summary_window():
+    """Activity counts per day / user / action from the server's pre-aggregated audit counts."""
+    group_options = {
+        'User': ('username',),
+        'Action': ('action',),
+        'User and Action': ('username', 'action'),
+        'Day': ('day',),
+        'Day and User': ('day', 'username'),
+        'Hour of Day': ('hour',),
+    }
+    hour_options = [''] + [f'{hour:02d}:00' for hour in range(24)]
+    today = date.today()
+    layout = [
+        [sg.Text('', expand_x=True), sg.Text('Audit Activity Summary', font=(FONT, 20)), sg.Text('', expand_x=True)],
+        [sg.Text("From:"), sg.InputText((today - timedelta(days=6)).strftime('%Y-%m-%d'), key='-SUMMARY_START-', size=10), sg.CalendarButton("Choose", target='-SUMMARY_START-', close_when_date_chosen=True, format='%Y-%m-%d'),
+         sg.Text("To:"), sg.InputText(today.strftime('%Y-%m-%d'), key='-SUMMARY_END-', size=10), sg.CalendarButton("Choose", target='-SUMMARY_END-', close_when_date_chosen=True, format='%Y-%m-%d')],
+        [sg.Text("Between:"), sg.Combo(hour_options, key='-SUMMARY_FROM_HOUR-', readonly=True, size=6), sg.Text("and"), sg.Combo(hour_options, key='-SUMMARY_TO_HOUR-', readonly=True, size=6), sg.Text("(e.g. 22:00 and 06:00 for night shift)")],
+        [sg.Text("Group by:"), sg.Combo(list(group_options), default_value='User', key='-SUMMARY_GROUP-', readonly=True),
+         sg.Text("Username:"), sg.InputText(key='-SUMMARY_USERNAME-', size=14), sg.Text("Action:"), sg.InputText(key='-SUMMARY_ACTION-', size=24)],
+        [sg.Button("Show Summary", bind_return_key=True)],
+        [sg.Table(headings=['Day', 'Hour', 'Username', 'Action', 'Count'], values=[], key='-SUMMARY_TABLE-', auto_size_columns=False, col_widths=[12, 6, 18, 30, 8], num_rows=15, justification='left')],
+        [sg.Text('', key='-SUMMARY_TOTAL-', font=(FONT, 13))],
+        [sg.Button("Close")]
+    ]
+
+    window = sg.Window("Audit Activity Summary", layout, modal=True, finalize=True)
+
+    def load_summary(values):
+        from_hour, to_hour = values['-SUMMARY_FROM_HOUR-'], values['-SUMMARY_TO_HOUR-']
+        try:
+            result = api_functions.fetch_audit_counts(API_URL, values['-SUMMARY_START-'], values['-SUMMARY_END-'], group_by=group_options[values['-SUMMARY_GROUP-']],
+                                                      username=values['-SUMMARY_USERNAME-'].strip(), action=values['-SUMMARY_ACTION-'].strip(),
+                                                      start_hour=int(from_hour[:2]) if from_hour and to_hour else None,
+                                                      end_hour=int(to_hour[:2]) if from_hour and to_hour else None)
+        except ValueError:
+            sg.popup_error('Dates must be in YYYY-MM-DD format.')
+            return
+        if not isinstance(result, dict):
+            sg.popup_error('Failed to load the audit summary.')
+            return
+        rows = [[entry.get('day', ''), f"{entry['hour']:02d}:00" if 'hour' in entry else '', entry.get('username', ''), entry.get('action', ''), entry['count']] for entry in result['counts']]
+        window['-SUMMARY_TABLE-'].update(values=rows)
+        window['-SUMMARY_TOTAL-'].update(f"Total actions: {result['total']}")
+
+    load_summary(window.read(timeout=0)[1])
+
+    while True:
+        event, values = window.read()
+        if event == sg.WINDOW_CLOSED or event == "Close":
+            break
+        elif event == "Show Summary":
+            load_summary(values)
 
     window.close()
 
@@ -778,6 +937,9 @@ def display_welcome_window(num_of_residents_local, show_login=False, show_time_o
         login_window()
         if show_time_out:
             return
+        # The login response carries a fresh resident count
+        if config.global_config['resident_count'] is not None:
+            num_of_residents_local = config.global_config['resident_count']
 
     logged_in_user = config.global_config['logged_in_user']
 
@@ -795,7 +957,7 @@ def display_welcome_window(num_of_residents_local, show_login=False, show_time_o
         sg.Button('Edit Resident', pad=(6, 3), font=(FONT, 12))],
         [sg.Text('', expand_x=True), sg.Button('Add User', pad=(6, 3), font=(FONT, 12)),
         sg.Button('Remove User', pad=(6, 3), font=(FONT, 12)), sg.Text('', expand_x=True), 
-        sg.Button('View Audit Logs', font=(FONT, 12)), sg.Text('', expand_x=True)]
+        sg.Button('View Audit Logs', font=(FONT, 12)), sg.Button('Close Month', font=(FONT, 12)), sg.Text('', expand_x=True)]
     ]
     
     admin_panel = sg.Frame('Admin Panel', admin_panel_layout, font=(FONT, 14), visible=config.global_config['is_admin'])
@@ -834,7 +996,7 @@ def display_welcome_window(num_of_residents_local, show_login=False, show_time_o
                 sg.popup("Your Facility Has No Residents. Please Click 'Add Resident'.", font=("Helvetica", 12), title='Error - No Residents')
             else:
                 results = show_loading_window(API_URL)
-                if results == 'token_expired':
+                if api_functions.session_expired():
                     logout()
                 elif results:
                     # Unpack the results directly if you are sure all will always be returned successfully
@@ -860,6 +1022,10 @@ def display_welcome_window(num_of_residents_local, show_login=False, show_time_o
             window.hide()
             audit_logs_window()
             window.un_hide()
+        elif event == 'Close Month':
+            window.hide()
+            close_month_window()
+            window.un_hide()
         elif event == 'Calendar Generators':
             window.hide()
             generate_calendar_window()
@@ -0,0 +1,172 @@
+"""
+Monthly partition upkeep and archival for the MySQL emar_chart and audit_logs tables.
+
+Schema migrations 7 and 8 (schema_migrations.py) partition both tables by month,
+starting from a single MAXVALUE partition, and create compressed *_archive tables
+plus *_history views (live UNION ALL archive) for reads that reach back past the
+live window. This job, meant to run daily from cron or Task Scheduler:
+
+    1. splits monthly partitions off the MAXVALUE partition, from the oldest data
+       up to `months_ahead` months in the future, and
+    2. moves every month older than the last `keep_months` months into the archive
+       table, then drops its partition, so live tables and their indexes only hold
+       the recent window.
+
+Archiving goes by age alone. Before a month is moved, `archive_bounds` records
+that the table's rows now start after it, and BEFORE triggers on emar_chart
+(migration 7) reject eMAR writes dated earlier. A late correction therefore
+fails loudly; it cannot land in a live partition beside the archived copy,
+where the chart upserts would miss that copy and emar_chart_history would
+return the cell twice.
+
+Usage:
+    python partition_maintenance.py [--months-ahead 3] [--keep-months 3] [--no-archive]
+"""
+import argparse
+import re
+import sys
+from datetime import date
+import config
+
+PARTITIONED_TABLES = {
+    'emar_chart': {'column': 'chart_date', 'archive': 'emar_chart_archive'},
+    'audit_logs': {'column': 'log_time', 'archive': 'audit_logs_archive'},
+}
+
+MONTH_PARTITION = re.compile(r'^p(\d{4})(\d{2})$')
+
+
+def add_months(year, month, count):
+    """Return (year, month) shifted by count months."""
+    index = year * 12 + (month - 1) + count
+    return index // 12, index % 12 + 1
+
+
+def partition_name(year, month):
+    return f"p{year:04d}{month:02d}"
+
+
+def existing_month_partitions(conn, table):
+    """Return the table's monthly partitions as a sorted list of (year, month)."""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT partition_name FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL
+    ''', (table,))
+    months = []
+    for (name,) in cursor.fetchall():
+        match = MONTH_PARTITION.match(name)
+        if match:
+            months.append((int(match.group(1)), int(match.group(2))))
+    cursor.close()
+    return sorted(months)
+
+
+def ensure_month_partitions(conn, table, months_ahead=3, today=None):
+    """
+    Split monthly partitions off p_future up to months_ahead months past today.
+
+    Returns:
+        list: Names of the partitions created.
+    """
+    today = today or date.today()
+    column = PARTITIONED_TABLES[table]['column']
+    existing = existing_month_partitions(conn, table)
+
+    if existing:
+        start = add_months(*existing[-1], 1)
+    else:
+        # First run: the oldest month with data gets the first monthly partition
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT MIN({column}) FROM {table}")
+        oldest = cursor.fetchone()[0]
+        cursor.close()
+        start = (oldest.year, oldest.month) if oldest else (today.year, today.month)
+
+    end = add_months(today.year, today.month, months_ahead)
+    new_months = []
+    month = start
+    while month <= end:
+        new_months.append(month)
+        month = add_months(*month, 1)
+    if not new_months:
+        return []
+
+    definitions = []
+    for year, month in new_months:
+        next_year, next_month = add_months(year, month, 1)
+        definitions.append(f"PARTITION {partition_name(year, month)} VALUES LESS THAN ('{next_year:04d}-{next_month:02d}-01')")
+    definitions.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+
+    cursor = conn.cursor()
+    cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION p_future INTO ({', '.join(definitions)})")
+    cursor.close()
+    return [partition_name(year, month) for year, month in new_months]
+
+
+def archive_old_months(conn, table, keep_months=3, today=None):
+    """
+    Move monthly partitions older than the last keep_months months into the archive table.
+
+    The month is first recorded in archive_bounds, so writes dated in it are rejected
+    from then on. Rows are copied with INSERT IGNORE before the partition is dropped,
+    so a run interrupted between the steps can simply be repeated.
+
+    Returns:
+        list: Names of the partitions archived.
+    """
+    today = today or date.today()
+    archive = PARTITIONED_TABLES[table]['archive']
+    oldest_kept = add_months(today.year, today.month, -(keep_months - 1))
+
+    archived = []
+    for year, month in existing_month_partitions(conn, table):
+        if (year, month) >= oldest_kept:
+            break
+        name = partition_name(year, month)
+        next_year, next_month = add_months(year, month, 1)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO archive_bounds (table_name, archived_before) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE archived_before = GREATEST(archived_before, VALUES(archived_before))
+        ''', (table, f"{next_year:04d}-{next_month:02d}-01"))
+        conn.commit()
+        cursor.execute(f"INSERT IGNORE INTO {archive} SELECT * FROM {table} PARTITION ({name})")
+        conn.commit()
+        cursor.execute(f"ALTER TABLE {table} DROP PARTITION {name}")
+        cursor.close()
+        archived.append(name)
+    return archived
+
+
+def run_maintenance(conn, months_ahead=3, keep_months=3, archive=True, today=None):
+    """Run partition upkeep (and archival unless disabled) for every partitioned table."""
+    report = {}
+    for table in PARTITIONED_TABLES:
+        created = ensure_month_partitions(conn, table, months_ahead, today)
+        archived = archive_old_months(conn, table, keep_months, today) if archive else []
+        report[table] = {'created': created, 'archived': archived}
+    return report
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Monthly partition upkeep and archival for emar_chart and audit_logs.')
+    parser.add_argument('--months-ahead', type=int, default=3)
+    parser.add_argument('--keep-months', type=int, default=3)
+    parser.add_argument('--no-archive', action='store_true')
+    args = parser.parse_args(argv)
+
+    import mysql.connector
+    conn = mysql.connector.connect(**config.MYSQL_CONFIG)
+    try:
+        report = run_maintenance(conn, args.months_ahead, args.keep_months, not args.no_archive)
+    finally:
+        conn.close()
+
+    for table, result in report.items():
+        print(f"{table}: created {result['created'] or 'none'}, archived {result['archived'] or 'none'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,4 +1,3 @@
-from datetime import datetime
 import PySimpleGUI as sg
 import random
 import api_functions
@@ -9,20 +8,12 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER
 import calendar
 import config
+from chart_pdfs import build_adl_chart_pdf
 #from data import breakfast, lunch, dinner
 
 API_URL = config.API_URL
 
 
-# Custom action to add a footer
-def add_footer(canvas, doc):
-    footer_text = f"CareTech ADL Chart PDF Generated {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-    canvas.saveState()
-    canvas.setFont('Times-Roman', 10)
-    canvas.drawString(doc.leftMargin, 15, footer_text)
-    canvas.restoreState()
-
-
 def create_medication_list_pdf(resident_name, medications_data):
     pdf_name = f"{resident_name}_Medication_Schedule.pdf"
     doc = SimpleDocTemplate(pdf_name, pagesize=letter)
@@ -86,116 +77,7 @@ def create_medication_list_pdf(resident_name, medications_data):
 
 def generate_adl_chart_pdf(resident_name, year_month, adl_data):
     pdf_name = f"{resident_name}_ADL_Chart_{year_month}.pdf"
-    doc = SimpleDocTemplate(pdf_name, pagesize=landscape(letter), topMargin=20, leftMargin=36, rightMargin=36, bottomMargin=36)
-    elements = []
-    
-    # Styles for the document
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-
-    # Adding a title at the top of the document
-    title = f"ADL Chart {resident_name} - {year_month}"
-    elements.append(Paragraph(title, title_style))
-    elements.append(Spacer(1, 8))  # Adding some space after the title
-
-    # Days of the month as column headers
-    days_in_month = calendar.monthrange(int(year_month.split('-')[0]), int(year_month.split('-')[1]))[1]
-    headers = ["ADL Activity"] + [str(day) for day in range(1, days_in_month + 1)]
-    
-    # ADL Activities as row headers
-    adl_activities = [
-        "First Shift SP", "Second Shift SP", "First Shift Activity1", "First Shift Activity2",
-        "First Shift Activity3", "Second Shift Activity4", "First Shift BM", "Second Shift BM",
-        "Shower", "Shampoo", "Sponge Bath", "Peri Care AM", "Peri Care PM",
-        "Oral Care AM", "Oral Care PM", "Nail Care", "Skin Care", "Shave",
-        "Breakfast", "Lunch", "Dinner", "Snack AM", "Snack PM", "Water Intake"
-    ]
-    
-    # Initialize table data
-    table_data = [headers]  # Adding the headers as the first row
-    
-    # Filling the table with ADL activities and placeholders for each day's data
-    for activity in adl_activities:
-        row = [activity] + ['' for _ in range(days_in_month)]  # Placeholder for each day
-        table_data.append(row)
-    
-    print(f'adl_data: {adl_data}')
-    for entry in adl_data:
-        chart_date_str = entry["chart_date"]
-        date_part = ' '.join(chart_date_str.split(' ')[1:4])
-        chart_date = datetime.strptime(date_part, "%d %b %Y")
-        day_number = chart_date.day - 1  # Adjust for 0 indexing
-        for i, adl_key in enumerate(adl_activities):
-            value = entry.get(adl_key.lower().replace(" ", "_"), "")
-            if value:
-                table_data[i + 1][day_number + 1] = value  # +1 because of headers row
-
-    
-    # Creating the table
-    table = Table(table_data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-    ]))
-    
-    elements.append(table)
-
-    # Add some space before the activities legend
-    elements.append(Spacer(1, 6))
-
-    # # Activities legend title
-    # elements.append(Paragraph("Activities", styles['Heading3']))
-
-    # Activities list
-    activities = [
-        "1. Movie & Snack or TV",
-        "2. Exercise/Walking",
-        "3. Games/Puzzles",
-        "4. Outside/Patio",
-        "5. Arts & Crafts",
-        "6. Music Therapy",
-        "7. Gardening",
-        "8. Listen to Music",
-        "9. Social Hour",
-        "10. Cooking/Baking",
-        "11. Birdwatching",
-        "12. Outing/Excursion",
-        "13. Hospice Visit",
-        "14. Other as Listed on the Service Plan",
-        "15. Social Media"
-    ]
-
-    # Calculate the number of activities in each column (assuming 3 columns with roughly equal distribution)
-    num_per_column = len(activities) // 3 + (1 if len(activities) % 3 > 0 else 0)
-
-    # Prepare data for the table, ensuring each row has three columns
-    table_data = [activities[i:i+num_per_column] for i in range(0, len(activities), num_per_column)]
-    # Ensure all rows have 3 columns (fill missing with empty strings)
-    for row in table_data:
-        while len(row) < 3:
-            row.append("")
-
-    # Create the table for activities legend
-    activities_table = Table(table_data)
-    activities_table.setStyle(TableStyle([
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('FONTSIZE', (0,0), (-1,-1), 8),
-        # Adjust paddings and spacing as necessary
-        ('LEFTPADDING', (0,0), (-1,-1), 1),  # Reduced padding
-        ('RIGHTPADDING', (0,0), (-1,-1), 1),
-        ('TOPPADDING', (0,0), (-1,-1), 1),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 1),
-    ]))
-
-    # Add the table to the elements
-    elements.append(activities_table)
-    
-    # Build and save the PDF
-    doc.build(elements, onFirstPage=add_footer, onLaterPages=add_footer)
+    build_adl_chart_pdf(pdf_name, resident_name, year_month, adl_data)
     sg.Popup(f"PDF generated: {pdf_name}")  # Show a popup to indicate the PDF was generated
 
 # -------------------------------------------------- Calendars -------------------------------------------------- #
@@ -8,6 +8,7 @@ from datetime import datetime
 from adl_chart import show_adl_chart
 from emars_chart import show_emar_chart
 import config
+import month_availability
 import pdf
 from progress_bar import show_progress_bar, show_loading_window, show_loading_window_for_emar
 
@@ -52,6 +53,30 @@ def create_management_window(resident_names, selected_resident, existing_adl_dat
     return window
 
 
+def refresh_management_window(window, selected_resident):
+    """
+    Load `selected_resident`'s data and show it in the open window, updating
+    the ADL and eMAR tabs in place instead of building a new window.
+
+    Returns:
+        bool: False if the data could not be loaded; the window is left as it was.
+    """
+    results = show_loading_window(API_URL, selected_resident)
+    if not results:
+        return False
+    _, _, existing_adl_data, resident_care_levels, all_medications_data, active_medications, non_medication_orders, existing_emar_data = results
+    adl_management.update_adl_tab(window, selected_resident, existing_adl_data, resident_care_levels)
+    emar_management.update_emar_tab(window, selected_resident, all_medications_data, active_medications, non_medication_orders, existing_emar_data)
+    return True
+
+
+def refresh_after_change(window, selected_resident):
+    """Reload the tabs after an edit made in another window, warning when they could not be."""
+    if not refresh_management_window(window, selected_resident):
+        sg.popup_error(f"Could not reload {selected_resident}'s data. The tabs may not show your latest changes; "
+                       "reselect the resident to try again.")
+
+
 def open_discontinue_medication_window(resident_name):
     # Fetch the list of medications for the resident
     medications = db_functions.fetch_medications_for_resident(resident_name)
@@ -110,7 +135,6 @@ def open_discontinue_medication_window(resident_name):
 def main(resident_names, user_initials, existing_adl_data, resident_care_levels, all_medications_data, active_medications, non_medication_orders, existing_emar_data):
     # resident_names = api_functions.get_resident_names(API_URL)
     selected_resident = resident_names[0]
-    current_tab_index = 0  # Initialize the tab index
     logged_in_user = config.global_config['logged_in_user']
     current_date = datetime.now().strftime('%Y-%m-%d')
 
@@ -126,13 +150,13 @@ def main(resident_names, user_initials, existing_adl_data, resident_care_levels,
         if event == sg.WIN_CLOSED:
             break
         elif event == '-RESIDENT-':
-            window.close()
-            selected_resident = values['-RESIDENT-']
-            results = show_loading_window(API_URL, selected_resident)
-            resident_names, user_initials, existing_adl_data, resident_care_levels, all_medications_data, active_medications, non_medication_orders, existing_emar_data = results
-            window = create_management_window(resident_names, selected_resident, existing_adl_data, resident_care_levels, all_medications_data, active_medications, non_medication_orders, existing_emar_data, default_tab_index=current_tab_index)
+            # Same window and tab; only the data changes
+            if refresh_management_window(window, values['-RESIDENT-']):
+                selected_resident = values['-RESIDENT-']
+            else:
+                window['-RESIDENT-'].update(value=selected_resident)
         elif event == '-ADL_SAVE-':
-            adl_data = adl_management.retrieve_adl_data_from_window(window,selected_resident)
+            adl_data = adl_management.retrieve_adl_data_from_window(window)
             existing_adl_data = api_functions.fetch_adl_data_for_resident(API_URL, selected_resident)
             audit_description = adl_management.generate_adl_audit_description(adl_data, existing_adl_data)
             succes = show_progress_bar(api_functions.save_adl_data_from_management_window, API_URL, selected_resident, adl_data, audit_description)    #api_functions.save_adl_data_from_management_window(API_URL, selected_resident, adl_data, audit_description)
@@ -184,7 +208,7 @@ def main(resident_names, user_initials, existing_adl_data, resident_care_levels,
             # Get the current month and year
             current_month_year = datetime.now().strftime("%Y-%m")
             results = show_loading_window_for_emar(API_URL, selected_resident, current_month_year)
-            if results == 'token_expired':
+            if api_functions.session_expired():
                 from new_main import logout
                 logout()
             elif results:
@@ -197,61 +221,52 @@ def main(resident_names, user_initials, existing_adl_data, resident_care_levels,
         elif event == '-MED_LIST-':
             medication_data = api_functions.fetch_medications_for_resident(API_URL, selected_resident)
             pdf.create_medication_list_pdf(selected_resident, medication_data)
+        elif event in ('-ADL_YEAR-', '-EMAR_YEAR-'):
+            # Offer only the months of the chosen year that have chart data
+            kind = 'adl' if event == '-ADL_YEAR-' else 'emar'
+            months = month_availability.months_by_year(month_availability.available_months(
+                config.global_config['month_availability'], selected_resident, kind)).get(values[event], [])
+            window[event.replace('_YEAR-', '_MONTH-')].update(values=months, value=months[-1] if months else '')
         elif event == '-ADL_SEARCH-':
-            # year_month should be in the format 'YYYY-MM'
-            month = values['-ADL_MONTH-'].zfill(2)
+            # The pickers only offer months with ADL data, so no existence check is needed
+            month = values['-ADL_MONTH-']
             year = values['-ADL_YEAR-']
-            year_month = f'{year}-{month}'  # Correctly constructed 'YYYY-MM' format
-    
-            if api_functions.does_adl_chart_exist(API_URL, selected_resident, year_month):
-                window.hide()
-                # Use the correctly named variable 'year_month' here
-                show_adl_chart(selected_resident, year_month)
-                window.un_hide()
-
-            else:
+            if not (month and year):
                 sg.popup("No ADL Chart Data Found for the Specified Month and Resident")
+                continue
+            year_month = f'{year}-{month}'
+            window.hide()
+            show_adl_chart(selected_resident, year_month)
+            window.un_hide()
         elif event == '-EMAR_SEARCH-':
-            # year_month should be in the format 'YYYY-MM'
-            month = values['-EMAR_MONTH-'].zfill(2)
+            month = values['-EMAR_MONTH-']
             year = values['-EMAR_YEAR-']
+            if not (month and year):
+                sg.popup("No eMAR Chart Data Found for the Specified Month and Resident")
+                continue
             year_month = f'{year}-{month}'
-            
-            if api_functions.does_emar_chart_exist(API_URL, selected_resident, year_month):
-                results = show_loading_window_for_emar(API_URL, selected_resident, year_month)
-                if results == 'token_expired':
-                    from new_main import logout
-                    logout()
-                elif results:
-                    emar_data, discontinued_medications, original_structure = results
-                    window.hide()
-                    show_emar_chart(selected_resident, year_month, emar_data, discontinued_medications, original_structure)
-                    window.un_hide()
-                else:
-                    sg.popup("Failed to load eMAR Data")
-        elif event == '-ADD_MEDICATION-':
-            window.close()
-            emar_management.add_medication_window(selected_resident)
-            results = show_loading_window(API_URL, selected_resident)
-            resident_names, user_initials, existing_adl_data, resident_care_levels, all_medications_data, active_medications, non_medication_orders, existing_emar_data = results
-            window = create_management_window(resident_names,selected_resident, existing_adl_data, resident_care_levels, all_medications_data, active_medications, non_medication_orders, existing_emar_data,default_tab_index=1)
-        #TODO: Update functions with loading window and include selected_resident
-        elif event == '-EDIT_MEDICATION-':
-            window.close()
-            edit_med_win = emar_management.edit_medication_window(selected_resident)
-            results = show_loading_window(API_URL, selected_resident)
-            resident_names, user_initials, existing_adl_data, resident_care_levels, all_medications_data, active_medications, non_medication_orders, existing_emar_data = results
-            window = create_management_window(resident_names,selected_resident, existing_adl_data, resident_care_levels, all_medications_data, active_medications, non_medication_orders, existing_emar_data,default_tab_index=1)
-        elif event == '-ADD_NON-MEDICATION-':
-            window.close()
-            emar_management.add_non_medication_order_window(selected_resident)
-            results = show_loading_window(API_URL, selected_resident)
-            resident_names, user_initials, existing_adl_data, resident_care_levels, all_medications_data, active_medications, non_medication_orders, existing_emar_data = results
-            window = create_management_window(resident_names,selected_resident, existing_adl_data, resident_care_levels, all_medications_data, active_medications, non_medication_orders, existing_emar_data,default_tab_index=1)
-        elif event == '-EDIT_NON_MEDICATION-':
-            window.close()
-            emar_management.edit_non_med_order_window(selected_resident)
-            window = create_management_window(resident_names,selected_resident, default_tab_index=1)
+            results = show_loading_window_for_emar(API_URL, selected_resident, year_month)
+            if api_functions.session_expired():
+                from new_main import logout
+                logout()
+            elif results:
+                emar_data, discontinued_medications, original_structure = results
+                window.hide()
+                show_emar_chart(selected_resident, year_month, emar_data, discontinued_medications, original_structure)
+                window.un_hide()
+            else:
+                sg.popup("Failed to load eMAR Data")
+        elif event in ('-ADD_MEDICATION-', '-EDIT_MEDICATION-', '-ADD_NON-MEDICATION-', '-EDIT_NON_MEDICATION-'):
+            edit_window = {
+                '-ADD_MEDICATION-': emar_management.add_medication_window,
+                '-EDIT_MEDICATION-': emar_management.edit_medication_window,
+                '-ADD_NON-MEDICATION-': emar_management.add_non_medication_order_window,
+                '-EDIT_NON_MEDICATION-': emar_management.edit_non_med_order_window,
+            }[event]
+            window.hide()
+            edit_window(selected_resident)
+            window.un_hide()
+            refresh_after_change(window, selected_resident)
         elif event == '-NON_MEDICATION_ORDERS-':
             window.hide()
             emar_management.open_non_med_orders_window(selected_resident)
@@ -266,9 +281,11 @@ def main(resident_names, user_initials, existing_adl_data, resident_care_levels,
                 emar_management.controlled_administer_window(selected_resident,medication_name, count, form)
         elif event.startswith('-PERFORM_NON_MED_'):
             order_name = event.split('_')[-1][:-1]  # Remove the last character which is a '-'
-            window.close()
+            window.hide()
             emar_management.perform_non_med_order_window(selected_resident,order_name)
-            window = create_management_window(resident_names,selected_resident, default_tab_index=1)
+            window.un_hide()
+            # The order may no longer be due today
+            refresh_after_change(window, selected_resident)
 
         elif event == '-INFO_WINDOW-':
             window.hide()
@@ -299,14 +316,11 @@ def main(resident_names, user_initials, existing_adl_data, resident_care_levels,
             
         # Handling 'Next Tab' and 'Previous Tab' button events
         if event in ['Next Tab', 'Previous Tab']:
-            if event == 'Next Tab':
-                current_tab_index = (current_tab_index + 1) % 3  # Assuming 3 tabs
-            elif event == 'Previous Tab':
-                current_tab_index = (current_tab_index - 1) % 3  # Assuming 3 tabs
-
-            window.close()
-            window = create_management_window(resident_names, selected_resident)
-            window['-TABGROUP-'].Widget.select(current_tab_index)
+            # Start from the tab on screen, which may have been clicked directly
+            notebook = window['-TABGROUP-'].Widget
+            current_tab_index = notebook.index('current')
+            step = 1 if event == 'Next Tab' else -1
+            notebook.select((current_tab_index + step) % len(notebook.tabs()))
 
         adl_management.update_clock(window)
 
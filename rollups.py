@@ -0,0 +1,258 @@
+"""
+Materialised monthly rollups of emar_chart and adl_chart.
+
+    emar_month_rollup  one row per resident / medication / month / time slot with
+                       an `administered_days` bitmap (bit d-1 set when day d was
+                       administered) and `cells`, a 31-entry JSON array of the
+                       charted values, i.e. the month row already pivoted.
+    adl_month_rollup   one row per resident / month with `matrix`, a JSON object
+                       mapping every ADL column to its 31 daily values.
+
+Triggers on emar_chart and adl_chart keep both tables current on every write,
+and the month partitions dropped by partition_maintenance.py do not fire them,
+so archived months stay available. Schema migration 9 creates the tables and
+triggers and backfills existing data with `backfill_rollups`; the sqlite server
+backend creates the equivalent in server/schema_sqlite.sql.
+
+The month chart endpoints serve open months from the rollups with
+`emar_month_payload` and `adl_month_payload`: one primary-key range read per
+resident and month instead of scanning and pivoting the chart rows.
+"""
+import calendar
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from chart_model import ADMINISTERED
+from adl_fields import ADL_KEYS
+
+DAYS_IN_CHART = 31
+
+EMPTY_CELLS = json.dumps([None] * DAYS_IN_CHART)
+EMPTY_ADL_MATRIX = json.dumps({key: [None] * DAYS_IN_CHART for key in ADL_KEYS})
+
+CREATE_EMAR_MONTH_ROLLUP = '''
+    CREATE TABLE IF NOT EXISTS emar_month_rollup (
+        resident_id INT NOT NULL,
+        medication_id INT NOT NULL,
+        month_start DATE NOT NULL,
+        time_slot VARCHAR(100) NOT NULL DEFAULT '',
+        administered_days INT UNSIGNED NOT NULL DEFAULT 0,
+        cells JSON NOT NULL,
+        PRIMARY KEY (resident_id, month_start, medication_id, time_slot)
+    ) ENGINE=InnoDB
+'''
+
+CREATE_ADL_MONTH_ROLLUP = '''
+    CREATE TABLE IF NOT EXISTS adl_month_rollup (
+        resident_id INT NOT NULL,
+        month_start DATE NOT NULL,
+        matrix JSON NOT NULL,
+        PRIMARY KEY (resident_id, month_start)
+    ) ENGINE=InnoDB
+'''
+
+
+def _emar_recompute_day(row):
+    """
+    UPDATE that rebuilds one rollup cell from emar_chart after `row` (NEW or OLD) changed.
+
+    PRN and Controlled medications chart several rows per day with no time slot, so
+    the day's bit and cell are recomputed from whatever rows remain rather than
+    taken from `row` alone.
+    """
+    same_cell = (f"e.resident_id = {row}.resident_id AND e.medication_id = {row}.medication_id "
+                 f"AND e.chart_date = {row}.chart_date AND COALESCE(e.time_slot, '') = COALESCE({row}.time_slot, '')")
+    day_bit = f"(1 << (DAY({row}.chart_date) - 1))"
+    return f'''
+        UPDATE emar_month_rollup
+        SET administered_days = IF(
+                EXISTS (SELECT 1 FROM emar_chart e WHERE {same_cell} AND COALESCE(e.administered, '') <> ''),
+                administered_days | {day_bit},
+                administered_days & ~{day_bit}),
+            cells = JSON_SET(cells, CONCAT('$[', DAY({row}.chart_date) - 1, ']'),
+                (SELECT e.administered FROM emar_chart e WHERE {same_cell} ORDER BY e.chart_id DESC LIMIT 1))
+        WHERE resident_id = {row}.resident_id AND medication_id = {row}.medication_id
+            AND month_start = DATE_FORMAT({row}.chart_date, '%Y-%m-01')
+            AND time_slot = COALESCE({row}.time_slot, '')
+    '''
+
+
+EMAR_TRIGGERS = [
+    f'''
+    CREATE TRIGGER emar_chart_rollup_insert AFTER INSERT ON emar_chart FOR EACH ROW
+        INSERT INTO emar_month_rollup (resident_id, medication_id, month_start, time_slot, administered_days, cells)
+        VALUES (NEW.resident_id, NEW.medication_id, DATE_FORMAT(NEW.chart_date, '%Y-%m-01'), COALESCE(NEW.time_slot, ''),
+                IF(COALESCE(NEW.administered, '') <> '', 1 << (DAY(NEW.chart_date) - 1), 0),
+                JSON_SET(CAST('{EMPTY_CELLS}' AS JSON), CONCAT('$[', DAY(NEW.chart_date) - 1, ']'), NEW.administered))
+        ON DUPLICATE KEY UPDATE
+            administered_days = administered_days | VALUES(administered_days),
+            cells = JSON_SET(cells, CONCAT('$[', DAY(NEW.chart_date) - 1, ']'), NEW.administered)
+    ''',
+    # An update that moves the row to another cell (date, slot, medication, resident) also rebuilds the cell it left
+    f'''
+    CREATE TRIGGER emar_chart_rollup_update AFTER UPDATE ON emar_chart FOR EACH ROW
+    BEGIN
+        INSERT IGNORE INTO emar_month_rollup (resident_id, medication_id, month_start, time_slot, administered_days, cells)
+        VALUES (NEW.resident_id, NEW.medication_id, DATE_FORMAT(NEW.chart_date, '%Y-%m-01'), COALESCE(NEW.time_slot, ''),
+                0, CAST('{EMPTY_CELLS}' AS JSON));
+        {_emar_recompute_day('NEW').strip()};
+        IF NOT (OLD.resident_id <=> NEW.resident_id AND OLD.medication_id <=> NEW.medication_id
+                AND OLD.chart_date <=> NEW.chart_date AND COALESCE(OLD.time_slot, '') = COALESCE(NEW.time_slot, '')) THEN
+            {_emar_recompute_day('OLD').strip()};
+        END IF;
+    END
+    ''',
+    f"CREATE TRIGGER emar_chart_rollup_delete AFTER DELETE ON emar_chart FOR EACH ROW {_emar_recompute_day('OLD')}",
+]
+
+
+def _adl_set_day(value_expr):
+    """JSON_SET path/value list writing one day of every ADL column; `value_expr` maps a column to its value."""
+    return ', '.join(f"CONCAT('$.{key}[', day_index, ']'), {value_expr(key)}" for key in ADL_KEYS)
+
+
+def _adl_trigger(name, event, row, value_expr):
+    return f'''
+    CREATE TRIGGER {name} AFTER {event} ON adl_chart FOR EACH ROW
+    BEGIN
+        DECLARE day_index INT DEFAULT DAY({row}.chart_date) - 1;
+        INSERT INTO adl_month_rollup (resident_id, month_start, matrix)
+        VALUES ({row}.resident_id, DATE_FORMAT({row}.chart_date, '%Y-%m-01'),
+                JSON_SET(CAST('{EMPTY_ADL_MATRIX}' AS JSON), {_adl_set_day(value_expr)}))
+        ON DUPLICATE KEY UPDATE matrix = JSON_SET(matrix, {_adl_set_day(value_expr)});
+    END
+    '''
+
+
+ADL_TRIGGERS = [
+    _adl_trigger('adl_chart_rollup_insert', 'INSERT', 'NEW', lambda key: f'NEW.{key}'),
+    _adl_trigger('adl_chart_rollup_update', 'UPDATE', 'NEW', lambda key: f'NEW.{key}'),
+    _adl_trigger('adl_chart_rollup_delete', 'DELETE', 'OLD', lambda key: 'NULL'),
+]
+
+
+def _month_and_day(chart_date):
+    """('YYYY-MM-01', day) of a DATE column; mysql.connector returns dates, sqlite returns text."""
+    chart_date = str(chart_date)
+    return f"{chart_date[:7]}-01", int(chart_date[8:10])
+
+
+def backfill_rollups(conn, cursor, emar_table='emar_chart_history'):
+    """Rebuild both rollup tables from `emar_table` (on MySQL the view over live and archived rows) and adl_chart."""
+    emar_rows = {}
+    cursor.execute(f'''
+        SELECT resident_id, medication_id, chart_date, COALESCE(time_slot, ''), administered
+        FROM {emar_table} ORDER BY chart_id
+    ''')
+    for resident_id, medication_id, chart_date, time_slot, administered in cursor.fetchall():
+        month_start, day = _month_and_day(chart_date)
+        key = (resident_id, medication_id, month_start, time_slot)
+        bitmap, cells = emar_rows.setdefault(key, [0, [None] * DAYS_IN_CHART])
+        if administered:
+            emar_rows[key][0] = bitmap | (1 << (day - 1))
+        cells[day - 1] = administered
+
+    cursor.execute("DELETE FROM emar_month_rollup")
+    cursor.executemany('''
+        INSERT INTO emar_month_rollup (resident_id, medication_id, month_start, time_slot, administered_days, cells)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    ''', [(*key, bitmap, json.dumps(cells)) for key, (bitmap, cells) in emar_rows.items()])
+
+    adl_rows = {}
+    cursor.execute(f"SELECT resident_id, chart_date, {', '.join(ADL_KEYS)} FROM adl_chart")
+    for resident_id, chart_date, *values in cursor.fetchall():
+        month_start, day = _month_and_day(chart_date)
+        matrix = adl_rows.setdefault((resident_id, month_start), json.loads(EMPTY_ADL_MATRIX))
+        for key, value in zip(ADL_KEYS, values):
+            matrix[key][day - 1] = value
+
+    cursor.execute("DELETE FROM adl_month_rollup")
+    cursor.executemany('''
+        INSERT INTO adl_month_rollup (resident_id, month_start, matrix) VALUES (%s, %s, %s)
+    ''', [(*key, json.dumps(matrix)) for key, matrix in adl_rows.items()])
+
+
+def _json(value):
+    return json.loads(value) if isinstance(value, (str, bytes)) else value
+
+
+def fetch_emar_month_rollup(cursor, resident_id, year_month):
+    """
+    Return the resident's pre-pivoted eMAR month:
+    {medication_name: {time_slot: {'administered_days': int, 'cells': [31 values]}}}.
+    """
+    cursor.execute('''
+        SELECT m.medication_name, r.time_slot, r.administered_days, r.cells FROM emar_month_rollup r
+        JOIN medications m ON m.id = r.medication_id
+        WHERE r.resident_id = %s AND r.month_start = %s
+    ''', (resident_id, f"{year_month}-01"))
+    month = {}
+    for medication_name, time_slot, administered_days, cells in cursor.fetchall():
+        month.setdefault(medication_name, {})[time_slot] = {
+            'administered_days': administered_days,
+            'cells': _json(cells),
+        }
+    return month
+
+
+def fetch_adl_month_rollup(cursor, resident_id, year_month):
+    """Return the resident's ADL matrix for the month ({adl_key: [31 values]}), or None."""
+    cursor.execute('''
+        SELECT matrix FROM adl_month_rollup WHERE resident_id = %s AND month_start = %s
+    ''', (resident_id, f"{year_month}-01"))
+    row = cursor.fetchone()
+    return None if row is None else _json(row[0])
+
+
+def _days_in_month(year_month):
+    year, month = (int(part) for part in year_month.split('-'))
+    return calendar.monthrange(year, month)[1]
+
+
+def emar_month_payload(cursor, resident_id, year_month):
+    """
+    The resident's eMAR month from emar_month_rollup, in the /fetch_emar_data_for_month format.
+
+    Scheduled slots give one entry per charted day. PRN and Controlled
+    medications (time slot '') give one entry per day with an administration,
+    carrying the day's latest initials, which is all the chart shows of them.
+    """
+    entries = []
+    for medication_name, slots in fetch_emar_month_rollup(cursor, resident_id, year_month).items():
+        for time_slot, rollup in slots.items():
+            cells, administered_days = rollup['cells'], rollup['administered_days']
+            for day_index in range(_days_in_month(year_month)):
+                if time_slot:
+                    if cells[day_index] is None:
+                        continue
+                    administered = cells[day_index]
+                elif administered_days & (1 << day_index):
+                    administered = cells[day_index] or ADMINISTERED
+                else:
+                    continue
+                entries.append({
+                    'medication_name': medication_name,
+                    'chart_date': f"{year_month}-{day_index + 1:02d}",
+                    'time_slot': time_slot or None,
+                    'administered': administered,
+                })
+    entries.sort(key=lambda entry: (entry['chart_date'], entry['medication_name'], entry['time_slot'] or ''))
+    return entries
+
+
+def _http_date(year_month, day):
+    """Dates the way Flask's JSON encoder writes them ('Tue, 27 Feb 2024 00:00:00 GMT'), as the client parses."""
+    return format_datetime(datetime.strptime(f"{year_month}-{day:02d}", '%Y-%m-%d').replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def adl_month_payload(cursor, resident_id, year_month):
+    """The resident's ADL month from adl_month_rollup, in the /fetch_adl_chart_data_for_month format."""
+    matrix = fetch_adl_month_rollup(cursor, resident_id, year_month)
+    if matrix is None:
+        return []
+    payload = []
+    for day_index in range(_days_in_month(year_month)):
+        day = {key: matrix.get(key, [None] * DAYS_IN_CHART)[day_index] for key in ADL_KEYS}
+        if any(value is not None for value in day.values()):
+            payload.append(dict(day, chart_date=_http_date(year_month, day_index + 1)))
+    return payload
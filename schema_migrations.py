@@ -0,0 +1,439 @@
+"""
+Numbered schema migrations for the MySQL server schema (db_init.sql) and the local
+SQLite database (database_setup.initialize_database).
+
+Each migration adds secondary indexes and/or runs schema statements, and
+records its version in a schema_migrations table, so it is applied exactly once
+per database. Every
+migration also carries EXPLAIN checks: the hot queries it exists for, and the
+index the planner is expected to pick for them. `verify_migrations` runs those
+checks against a live database.
+
+Usage:
+    python schema_migrations.py sqlite [--verify]
+    python schema_migrations.py mysql [--verify]
+"""
+import re
+import sys
+from collections import namedtuple
+import config
+import rollups
+import audit_search
+import audit_stats
+import month_close
+import month_availability
+
+Index = namedtuple('Index', 'table name columns')
+ExplainCheck = namedtuple('ExplainCheck', 'query index')
+Migration = namedtuple('Migration', 'version name indexes checks statements', defaults=((),))
+
+
+def _drop_foreign_keys(table):
+    """Migration statement that drops every foreign key on a MySQL table (partitioned InnoDB tables cannot have them)."""
+    def drop(conn, cursor):
+        cursor.execute('''
+            SELECT constraint_name FROM information_schema.table_constraints
+            WHERE table_schema = DATABASE() AND table_name = %s AND constraint_type = 'FOREIGN KEY'
+        ''', (table,))
+        for (constraint_name,) in cursor.fetchall():
+            cursor.execute(f"ALTER TABLE {table} DROP FOREIGN KEY {constraint_name}")
+    return drop
+
+
+# Partitioning drops emar_chart's RESTRICT foreign keys; these triggers keep refusing to delete a
+# resident or medication that still has eMAR chart rows, live or archived.
+CHART_HISTORY_GUARDS = [
+    f'''
+    CREATE TRIGGER {table}_chart_history_guard BEFORE DELETE ON {table}
+    FOR EACH ROW
+    BEGIN
+        IF EXISTS (SELECT 1 FROM emar_chart_history WHERE {column} = OLD.id) THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Cannot delete: eMAR chart history refers to this row';
+        END IF;
+    END
+    '''
+    for table, column in (('residents', 'resident_id'), ('medications', 'medication_id'))
+]
+
+# partition_maintenance.archive_old_months records the first live day of each table it archives;
+# eMAR writes dated before it are rejected instead of landing beside the archived rows.
+CREATE_ARCHIVE_BOUNDS = '''
+    CREATE TABLE IF NOT EXISTS archive_bounds (
+        table_name VARCHAR(64) PRIMARY KEY,
+        archived_before DATE NOT NULL
+    )
+'''
+
+ARCHIVED_MONTH_GUARDS = [
+    f'''
+    CREATE TRIGGER emar_chart_archived_{event} BEFORE {event.upper()} ON emar_chart
+    FOR EACH ROW
+    BEGIN
+        IF {condition} < (SELECT archived_before FROM archive_bounds WHERE table_name = 'emar_chart') THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'This month has been archived and can no longer be changed';
+        END IF;
+    END
+    '''
+    for event, condition in (('insert', 'NEW.chart_date'), ('update', 'LEAST(OLD.chart_date, NEW.chart_date)'))
+]
+
+
+# ---------------------------- MySQL (db_init.sql) ---------------------------- #
+
+MYSQL_MIGRATIONS = [
+    Migration(1, 'medications_resident_name', [
+        Index('medications', 'idx_medications_resident_name', ('resident_id', 'medication_name', 'discontinued_date')),
+    ], [
+        ExplainCheck("SELECT id FROM medications WHERE resident_id = 1 AND medication_name = 'x'",
+                     'idx_medications_resident_name'),
+    ]),
+    Migration(2, 'emar_chart_resident_date', [
+        Index('emar_chart', 'idx_emar_chart_resident_date', ('resident_id', 'chart_date')),
+    ], [
+        ExplainCheck("SELECT medication_id, chart_date, time_slot, administered FROM emar_chart "
+                     "WHERE resident_id = 1 AND chart_date >= '2024-01-01' AND chart_date < '2024-02-01'",
+                     'idx_emar_chart_resident_date'),
+    ]),
+    Migration(3, 'residents_name', [
+        Index('residents', 'idx_residents_name', ('name',)),
+    ], [
+        ExplainCheck("SELECT id FROM residents WHERE name = 'x'", 'idx_residents_name'),
+    ]),
+    Migration(4, 'audit_logs_filters', [
+        Index('audit_logs', 'idx_audit_logs_log_time', ('log_time',)),
+        Index('audit_logs', 'idx_audit_logs_username_time', ('username', 'log_time')),
+        Index('audit_logs', 'idx_audit_logs_activity_time', ('activity', 'log_time')),
+    ], [
+        ExplainCheck("SELECT * FROM audit_logs WHERE log_time >= '2024-01-01' ORDER BY log_time DESC",
+                     'idx_audit_logs_log_time'),
+        ExplainCheck("SELECT * FROM audit_logs WHERE username = 'x' ORDER BY log_time DESC",
+                     'idx_audit_logs_username_time'),
+        ExplainCheck("SELECT * FROM audit_logs WHERE activity = 'x' AND log_time >= '2024-01-01'",
+                     'idx_audit_logs_activity_time'),
+    ]),
+    Migration(5, 'non_medication_orders_resident_name', [
+        Index('non_medication_orders', 'idx_non_med_orders_resident_name', ('resident_id', 'order_name')),
+    ], [
+        ExplainCheck("SELECT order_id FROM non_medication_orders WHERE resident_id = 1 AND order_name = 'x'",
+                     'idx_non_med_orders_resident_name'),
+    ]),
+    Migration(6, 'tracked_items_expiration', [
+        Index('tracked_items', 'idx_tracked_items_expiration', ('expiration_date', 'document_status')),
+    ], [
+        ExplainCheck("SELECT item_id FROM tracked_items WHERE expiration_date < '2024-01-01'",
+                     'idx_tracked_items_expiration'),
+    ]),
+    # Month partitioning. Tables start with a single MAXVALUE partition;
+    # partition_maintenance.py splits it into monthly partitions and archives old months.
+    Migration(7, 'emar_chart_partition_by_month', [], [
+        ExplainCheck("SELECT medication_id, chart_date, time_slot, administered FROM emar_chart "
+                     "WHERE resident_id = 1 AND chart_date >= '2024-01-01' AND chart_date < '2024-02-01'",
+                     'idx_emar_chart_resident_date'),
+    ], [
+        "DROP TRIGGER IF EXISTS residents_chart_history_guard",
+        "DROP TRIGGER IF EXISTS medications_chart_history_guard",
+        *CHART_HISTORY_GUARDS,
+        _drop_foreign_keys('emar_chart'),
+        "ALTER TABLE emar_chart MODIFY chart_date DATE NOT NULL",
+        "ALTER TABLE emar_chart DROP PRIMARY KEY, ADD PRIMARY KEY (chart_id, chart_date)",
+        "ALTER TABLE emar_chart PARTITION BY RANGE COLUMNS (chart_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE))",
+        "CREATE TABLE IF NOT EXISTS emar_chart_archive LIKE emar_chart",
+        "ALTER TABLE emar_chart_archive REMOVE PARTITIONING",
+        "ALTER TABLE emar_chart_archive ROW_FORMAT = COMPRESSED",
+        "CREATE OR REPLACE VIEW emar_chart_history AS "
+        "SELECT * FROM emar_chart UNION ALL SELECT * FROM emar_chart_archive",
+        CREATE_ARCHIVE_BOUNDS,
+        "DROP TRIGGER IF EXISTS emar_chart_archived_insert",
+        "DROP TRIGGER IF EXISTS emar_chart_archived_update",
+        *ARCHIVED_MONTH_GUARDS,
+    ]),
+    Migration(8, 'audit_logs_partition_by_month', [], [
+        ExplainCheck("SELECT * FROM audit_logs WHERE username = 'x' ORDER BY log_time DESC",
+                     'idx_audit_logs_username_time'),
+    ], [
+        # Undated rows take the oldest known timestamp so they land in the first partition
+        "UPDATE audit_logs JOIN (SELECT MIN(log_time) AS oldest FROM audit_logs) AS bounds "
+        "SET audit_logs.log_time = COALESCE(bounds.oldest, NOW()) WHERE audit_logs.log_time IS NULL",
+        "ALTER TABLE audit_logs MODIFY log_time DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP",
+        "ALTER TABLE audit_logs DROP PRIMARY KEY, ADD PRIMARY KEY (log_id, log_time)",
+        "ALTER TABLE audit_logs PARTITION BY RANGE COLUMNS (log_time) (PARTITION p_future VALUES LESS THAN (MAXVALUE))",
+        "CREATE TABLE IF NOT EXISTS audit_logs_archive LIKE audit_logs",
+        "ALTER TABLE audit_logs_archive REMOVE PARTITIONING",
+        "ALTER TABLE audit_logs_archive ROW_FORMAT = COMPRESSED",
+        "CREATE OR REPLACE VIEW audit_logs_history AS "
+        "SELECT * FROM audit_logs UNION ALL SELECT * FROM audit_logs_archive",
+    ]),
+    # Trigger-maintained, pre-pivoted monthly chart rollups (see rollups.py)
+    Migration(9, 'monthly_chart_rollups', [], [
+        ExplainCheck("SELECT medication_id, time_slot, administered_days, cells FROM emar_month_rollup "
+                     "WHERE resident_id = 1 AND month_start = '2024-01-01'", 'PRIMARY'),
+        ExplainCheck("SELECT matrix FROM adl_month_rollup WHERE resident_id = 1 AND month_start = '2024-01-01'",
+                     'PRIMARY'),
+    ], [
+        rollups.CREATE_EMAR_MONTH_ROLLUP,
+        rollups.CREATE_ADL_MONTH_ROLLUP,
+        *[f"DROP TRIGGER IF EXISTS {name}" for name in (
+            'emar_chart_rollup_insert', 'emar_chart_rollup_update', 'emar_chart_rollup_delete',
+            'adl_chart_rollup_insert', 'adl_chart_rollup_update', 'adl_chart_rollup_delete')],
+        *rollups.EMAR_TRIGGERS,
+        *rollups.ADL_TRIGGERS,
+        rollups.backfill_rollups,
+    ]),
+    # Full-text search over audit details (see audit_search.py)
+    Migration(10, 'audit_log_fulltext_search', [], [
+        ExplainCheck("SELECT log_id FROM audit_log_search WHERE MATCH (details) AGAINST ('+aspirin*' IN BOOLEAN MODE)",
+                     'ft_audit_log_search_details'),
+    ], [
+        audit_search.CREATE_AUDIT_LOG_SEARCH,
+        *[f"DROP TRIGGER IF EXISTS {name}" for name in (
+            'audit_logs_search_insert', 'audit_logs_search_update', 'audit_logs_search_delete')],
+        *audit_search.AUDIT_SEARCH_TRIGGERS,
+        audit_search.backfill_audit_search,
+    ]),
+    # Trigger-maintained audit counts per day / hour / user / action (see audit_stats.py)
+    Migration(11, 'audit_daily_counts', [], [
+        ExplainCheck("SELECT username, SUM(action_count) FROM audit_daily_counts "
+                     "WHERE log_date >= '2024-01-01' AND log_date < '2024-01-08' GROUP BY username", 'PRIMARY'),
+        ExplainCheck("SELECT log_date, SUM(action_count) FROM audit_daily_counts "
+                     "WHERE activity = 'x' AND log_date >= '2024-01-01' GROUP BY log_date",
+                     'idx_audit_daily_counts_activity'),
+    ], [
+        audit_stats.CREATE_AUDIT_DAILY_COUNTS,
+        *[f"DROP TRIGGER IF EXISTS {name}" for name in (
+            'audit_logs_counts_insert', 'audit_logs_counts_update', 'audit_logs_counts_delete')],
+        *audit_stats.AUDIT_COUNT_TRIGGERS,
+        audit_stats.backfill_audit_counts,
+    ]),
+    # Month close: frozen months and content-addressed artefacts (see month_close.py)
+    Migration(12, 'month_close', [], [
+        ExplainCheck("SELECT kind, digest FROM month_artefacts WHERE month_start = '2024-01-01' AND resident_id = 1",
+                     'PRIMARY'),
+    ], [
+        month_close.CREATE_CLOSED_MONTHS,
+        month_close.CREATE_ARTEFACT_BLOBS,
+        month_close.CREATE_MONTH_ARTEFACTS,
+        *[f"DROP TRIGGER IF EXISTS {name}" for name in month_close.FREEZE_TRIGGER_NAMES],
+        *month_close.FREEZE_TRIGGERS,
+    ]),
+    # Per-resident months with eMAR / ADL / non-med data for the month pickers (see month_availability.py)
+    Migration(13, 'month_availability', [], [
+        ExplainCheck("SELECT month_start, kinds FROM month_availability WHERE resident_id = 1", 'PRIMARY'),
+    ], [
+        month_availability.CREATE_MONTH_AVAILABILITY,
+        *[f"DROP TRIGGER IF EXISTS {name}" for name in month_availability.AVAILABILITY_TRIGGER_NAMES],
+        *month_availability.AVAILABILITY_TRIGGERS,
+        month_availability.BACKFILL_MONTH_AVAILABILITY,
+    ]),
+]
+
+
+# ---------------------------- SQLite (database_setup.py) ---------------------------- #
+
+SQLITE_MIGRATIONS = [
+    Migration(1, 'medications_resident_name', [
+        Index('medications', 'idx_medications_resident_name', ('resident_id', 'medication_name', 'discontinued_date')),
+    ], [
+        ExplainCheck("SELECT id FROM medications WHERE resident_id = 1 AND medication_name = 'x'",
+                     'idx_medications_resident_name'),
+        ExplainCheck("SELECT medication_name FROM medications WHERE resident_id = 1 AND medication_name IN ('x', 'y') "
+                     "AND discontinued_date <= '2024-01-01'",
+                     'idx_medications_resident_name'),
+    ]),
+    Migration(2, 'non_med_admin_order_date', [
+        Index('non_med_order_administrations', 'idx_non_med_admin_order_date', ('order_id', 'administration_date')),
+    ], [
+        ExplainCheck("SELECT administration_date, notes, initials FROM non_med_order_administrations "
+                     "WHERE order_id = 1 AND administration_date >= '2024-01-01' AND administration_date < '2024-02-01'",
+                     'idx_non_med_admin_order_date'),
+    ]),
+    Migration(3, 'emar_chart_resident_date', [
+        Index('emar_chart', 'idx_emar_chart_resident_date', ('resident_id', 'date')),
+    ], [
+        ExplainCheck("SELECT medication_id, date, time_slot, administered FROM emar_chart "
+                     "WHERE resident_id = 1 AND date >= '2024-01-01' AND date < '2024-02-01'",
+                     'idx_emar_chart_resident_date'),
+    ]),
+    Migration(4, 'residents_name', [
+        Index('residents', 'idx_residents_name', ('name',)),
+    ], [
+        ExplainCheck("SELECT id FROM residents WHERE name = 'x'", 'idx_residents_name'),
+    ]),
+    Migration(5, 'non_medication_orders_resident_name', [
+        Index('non_medication_orders', 'idx_non_med_orders_resident_name', ('resident_id', 'order_name')),
+    ], [
+        ExplainCheck("SELECT order_id FROM non_medication_orders WHERE resident_id = 1 AND order_name = 'x'",
+                     'idx_non_med_orders_resident_name'),
+    ]),
+]
+
+MIGRATIONS = {'mysql': MYSQL_MIGRATIONS, 'sqlite': SQLITE_MIGRATIONS}
+
+
+# ---------------------------- Runner ---------------------------- #
+
+def _placeholder(dialect):
+    return '%s' if dialect == 'mysql' else '?'
+
+
+def _fetch_one(conn, dialect, sql, params=()):
+    cursor = conn.cursor()
+    cursor.execute(sql.replace('?', _placeholder(dialect)), params)
+    row = cursor.fetchone()
+    cursor.close()
+    return row
+
+
+def _table_exists(conn, dialect, table):
+    if dialect == 'mysql':
+        sql = "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = ?"
+    else:
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    return _fetch_one(conn, dialect, sql, (table,)) is not None
+
+
+def _index_exists(conn, dialect, index):
+    if dialect == 'mysql':
+        sql = "SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() AND index_name = ?"
+    else:
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?"
+    return _fetch_one(conn, dialect, sql, (index.name,)) is not None
+
+
+def ensure_migrations_table(conn, dialect):
+    """Create the schema_migrations bookkeeping table if it does not exist."""
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.close()
+    conn.commit()
+
+
+def applied_versions(conn, dialect):
+    """Return the set of migration versions already recorded in the database."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT version FROM schema_migrations")
+    versions = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return versions
+
+
+def apply_migration(conn, dialect, migration):
+    """
+    Create the migration's indexes (skipping any that already exist), run its
+    statements in order, and record it. A statement is either SQL text or a
+    callable taking (conn, cursor).
+    """
+    cursor = conn.cursor()
+    for index in migration.indexes:
+        if _index_exists(conn, dialect, index):
+            continue
+        cursor.execute(f"CREATE INDEX {index.name} ON {index.table} ({', '.join(index.columns)})")
+    for statement in migration.statements:
+        if callable(statement):
+            statement(conn, cursor)
+        else:
+            cursor.execute(statement)
+    cursor.execute(f"INSERT INTO schema_migrations (version, name) VALUES ({_placeholder(dialect)}, {_placeholder(dialect)})",
+                   (migration.version, migration.name))
+    cursor.close()
+    conn.commit()
+
+
+def run_migrations(conn, dialect):
+    """
+    Apply every pending migration for the dialect ('mysql' or 'sqlite') in version order.
+
+    A migration whose tables do not exist yet (the local SQLite file only holds
+    part of the schema) stays pending and is applied once the tables appear.
+
+    Returns:
+        list: The versions applied by this call.
+    """
+    ensure_migrations_table(conn, dialect)
+    done = applied_versions(conn, dialect)
+    applied = []
+    for migration in sorted(MIGRATIONS[dialect], key=lambda m: m.version):
+        if migration.version in done:
+            continue
+        if not all(_table_exists(conn, dialect, index.table) for index in migration.indexes):
+            continue
+        apply_migration(conn, dialect, migration)
+        applied.append(migration.version)
+    return applied
+
+
+def explain_uses_index(conn, dialect, query, index_name):
+    """
+    Run EXPLAIN for the query and report whether the planner chose index_name.
+
+    Returns:
+        tuple: (bool, plan) where plan is the raw EXPLAIN output for reporting.
+    """
+    cursor = conn.cursor()
+    if dialect == 'mysql':
+        cursor.execute(f"EXPLAIN {query}")
+        columns = [column[0] for column in cursor.description]
+        plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        used = any(row.get('key') == index_name for row in plan)
+    else:
+        cursor.execute(f"EXPLAIN QUERY PLAN {query}")
+        plan = [row[-1] for row in cursor.fetchall()]
+        used = any(re.search(rf"INDEX {re.escape(index_name)}\b", detail) for detail in plan)
+    cursor.close()
+    return used, plan
+
+
+def verify_migrations(conn, dialect):
+    """
+    Run the EXPLAIN checks of every applied migration.
+
+    Returns:
+        list: (version, query, expected index, plan) for each check whose query
+              does not use the expected index. Empty when everything is covered.
+    """
+    done = applied_versions(conn, dialect)
+    failures = []
+    for migration in MIGRATIONS[dialect]:
+        if migration.version not in done:
+            continue
+        for check in migration.checks:
+            used, plan = explain_uses_index(conn, dialect, check.query, check.index)
+            if not used:
+                failures.append((migration.version, check.query, check.index, plan))
+    return failures
+
+
+def _connect(dialect):
+    if dialect == 'mysql':
+        import mysql.connector
+        return mysql.connector.connect(**config.MYSQL_CONFIG)
+    import db_functions
+    return db_functions.get_connection()
+
+
+def main(argv):
+    if not argv or argv[0] not in MIGRATIONS:
+        print(__doc__)
+        return 2
+
+    dialect = argv[0]
+    conn = _connect(dialect)
+    applied = run_migrations(conn, dialect)
+    print(f"Applied migrations: {applied if applied else 'none pending'}")
+
+    if '--verify' in argv:
+        failures = verify_migrations(conn, dialect)
+        for version, query, index_name, plan in failures:
+            print(f"Migration {version}: expected {index_name} for\n    {query}\n  plan: {plan}")
+        print("All EXPLAIN checks passed." if not failures else f"{len(failures)} EXPLAIN check(s) failed.")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
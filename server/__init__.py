@@ -0,0 +1,43 @@
+"""
+Flask API server for CareTech resident management.
+
+Run with a multi-worker WSGI server through the top-level `wsgi.py`, e.g.
+    gunicorn -c server/gunicorn.conf.py wsgi:app      (Linux)
+    python wsgi.py                                     (Windows, waitress)
+
+RESIDENT_MGMT_JWT_SECRET_KEY must be set. Set RESIDENT_MGMT_DB_BACKEND=sqlite
+to run without a MySQL server.
+"""
+
+# Bumped whenever a response format changes; clients key their on-disk caches on it
+API_VERSION = '1'
+
+
+def create_app():
+    # Imported here so server.pool stays usable (benchmarks, scripts) without Flask installed
+    from flask import Flask
+    from server import db
+
+    app = Flask(__name__)
+    db.init_app(app)
+
+    from server import audit, auth, medications, months, routes
+    auth.init_app(app)
+    app.register_blueprint(routes.bp)
+    app.register_blueprint(auth.bp)
+    app.register_blueprint(audit.bp)
+    app.register_blueprint(months.bp)
+    app.register_blueprint(medications.bp)
+    audit.init_app(app)
+    app.after_request(conditional_get)
+
+    return app
+
+
+def conditional_get(response):
+    """ETag every JSON GET response and answer matching If-None-Match requests with 304."""
+    from flask import request
+    if request.method == 'GET' and response.status_code == 200 and response.mimetype == 'application/json':
+        response.add_etag()
+        response.make_conditional(request)
+    return response
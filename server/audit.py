@@ -0,0 +1,181 @@
+"""
+Audit log endpoints.
+
+Clients queue audit events and post them in batches (see audit_queue.py). The
+endpoints validate each batch and hand it to the write-behind AuditWriter, which
+inserts it with multi-row statements off the request path.
+
+Events are recorded under the user of the access token and at the time the
+server received them; the username and time a client sends are not trusted.
+"""
+import atexit
+from datetime import datetime, timedelta
+from flask import Blueprint, current_app, g, jsonify, request
+import audit_search
+import audit_stats
+import config
+from server.audit_writer import AuditBacklogFull, AuditWriter
+from server.auth import require_auth
+from server.db import get_backend_name, get_db
+
+bp = Blueprint('audit', __name__)
+
+MAX_BATCH = 500
+MAX_PER_PAGE = 200
+
+
+def init_app(app):
+    writer = AuditWriter(app.extensions['db_pool'],
+                         max_queue=config.AUDIT_QUEUE_SIZE,
+                         batch_size=config.AUDIT_BATCH_SIZE,
+                         flush_interval=config.AUDIT_FLUSH_INTERVAL)
+    app.extensions['audit_writer'] = writer
+    atexit.register(writer.close)
+
+
+def get_audit_writer():
+    return current_app.extensions['audit_writer']
+
+
+def record_action(activity, details):
+    """
+    Log an action the server carried out for the request's user. Call it after the
+    change has committed; a full audit backlog is reported but does not undo it.
+    """
+    try:
+        get_audit_writer().record(g.user['sub'], activity, details)
+    except AuditBacklogFull as e:
+        print(f"Audit entry '{activity}' dropped: {e}")
+
+
+def _event_row(event, username, received_at):
+    """
+    The audit_logs row for a client event, logged at `received_at`. A client time
+    further back than AUDIT_CLIENT_TIME_WINDOW (an event queued while offline) is
+    kept in the details; one from the future is rejected.
+    """
+    details = event.get('details')
+    client_time = event.get('log_time')
+    if client_time:
+        client_time = datetime.strptime(client_time, '%Y-%m-%d %H:%M:%S')
+        if client_time > received_at + timedelta(seconds=config.AUDIT_CLIENT_TIME_WINDOW):
+            raise ValueError(f"log_time {client_time} is in the future")
+        if client_time < received_at - timedelta(seconds=config.AUDIT_CLIENT_TIME_WINDOW):
+            details = f"{details or ''} (client time {client_time:%Y-%m-%d %H:%M:%S})".lstrip()
+    return (username, event.get('activity'), details, received_at.strftime('%Y-%m-%d %H:%M:%S'))
+
+
+@bp.route('/log_action', methods=['POST'])
+@require_auth()
+def log_action():
+    """Single-event endpoint kept for older clients."""
+    return _log_events([request.get_json(silent=True) or {}])
+
+
+@bp.route('/log_actions', methods=['POST'])
+@require_auth()
+def log_actions():
+    events = (request.get_json(silent=True) or {}).get('events')
+    if not isinstance(events, list) or not events:
+        return jsonify({'error': "Expected a non-empty 'events' list"}), 400
+    if len(events) > MAX_BATCH:
+        return jsonify({'error': f"At most {MAX_BATCH} events per request"}), 413
+    return _log_events(events)
+
+
+def _log_events(events):
+    received_at = datetime.now().replace(microsecond=0)
+    try:
+        rows = [_event_row(event, g.user['sub'], received_at) for event in events]
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({'error': 'Malformed audit event'}), 400
+
+    try:
+        get_audit_writer().submit(rows)
+    except AuditBacklogFull as e:
+        # Backpressure: the client keeps the events and retries
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    return jsonify({'message': 'Actions queued', 'count': len(rows)}), 202
+
+
+@bp.route('/audit_metrics')
+@require_auth(admin=True)
+def audit_metrics():
+    """Audit queue depth, throughput and flush latency."""
+    return jsonify(get_audit_writer().status()), 200
+
+
+@bp.route('/search_audit_logs')
+@require_auth(admin=True)
+def search_audit_logs():
+    """
+    Ranked full-text search over audit details.
+
+    Query parameters: q (required), page, per_page, username, action, and
+    start / end bounds on log_time (start inclusive, end exclusive).
+    """
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({'error': "Missing search text 'q'"}), 400
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(MAX_PER_PAGE, max(1, int(request.args.get('per_page', 50))))
+        start, end = request.args.get('start', ''), request.args.get('end', '')
+        for bound in (start, end):
+            if bound:
+                datetime.fromisoformat(bound)
+    except ValueError:
+        return jsonify({'error': 'Invalid page or date bounds'}), 400
+
+    cursor = get_db().cursor()
+    try:
+        rows, has_more = audit_search.search_audit_logs(
+            cursor, get_backend_name(), text, page=page, per_page=per_page,
+            username=request.args.get('username', ''), action=request.args.get('action', ''),
+            start=start, end=end)
+    except Exception as e:
+        print(f"Error searching audit logs: {e}")
+        return jsonify({'error': 'Failed to search audit logs'}), 500
+    finally:
+        cursor.close()
+
+    results = [{'date': str(log_time), 'username': username, 'action': activity, 'description': details,
+                'score': float(score)} for log_time, username, activity, details, score in rows]
+    return jsonify({'results': results, 'page': page, 'per_page': per_page, 'has_more': has_more}), 200
+
+
+@bp.route('/audit_counts')
+@require_auth(admin=True)
+def audit_counts():
+    """
+    Audit activity counts from the pre-aggregated audit_daily_counts table.
+
+    Query parameters: start and end dates (end exclusive), group_by (comma-separated
+    day, hour, username, action), username, action, and start_hour / end_hour for a
+    time-of-day window (may wrap past midnight).
+    """
+    try:
+        start, end = request.args['start'], request.args['end']
+        datetime.strptime(start, '%Y-%m-%d')
+        datetime.strptime(end, '%Y-%m-%d')
+        group_by = [name for name in request.args.get('group_by', 'day,username,action').split(',') if name]
+        start_hour, end_hour = request.args.get('start_hour'), request.args.get('end_hour')
+        hours = (int(start_hour), int(end_hour)) if start_hour and end_hour else (None, None)
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Expected start and end dates (YYYY-MM-DD) and integer hours'}), 400
+
+    cursor = get_db().cursor()
+    try:
+        counts = audit_stats.fetch_audit_counts(cursor, start, end, group_by=group_by,
+                                                username=request.args.get('username', ''),
+                                                action=request.args.get('action', ''),
+                                                start_hour=hours[0], end_hour=hours[1])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error fetching audit counts: {e}")
+        return jsonify({'error': 'Failed to fetch audit counts'}), 500
+    finally:
+        cursor.close()
+
+    return jsonify({'counts': counts, 'total': sum(entry['count'] for entry in counts)}), 200
@@ -0,0 +1,259 @@
+"""
+Write-behind pipeline for audit_logs.
+
+Request handlers hand audit rows to `AuditWriter.submit`, which puts them on a
+bounded in-memory queue and returns; a writer thread drains the queue in bulk
+inserts using a pooled connection, so audit writes no longer contend with the
+clinical transaction that produced them.
+
+Backpressure: when the queue is full, `submit` waits up to `enqueue_timeout`
+seconds and then raises AuditBacklogFull, which the endpoints turn into a 503 so
+clients (audit_queue.py) keep the events and retry later.
+
+Shutdown: `close` drains what it can and appends anything left to a JSON-lines
+spill file, fsynced before the process exits. On start the file is replayed; it
+is claimed with a rename and only deleted once its rows are in audit_logs, and a
+claimed file left by a worker that died first is replayed again.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from collections import deque
+import config
+
+
+class AuditBacklogFull(Exception):
+    """Raised when the audit queue stays full for longer than the enqueue timeout."""
+
+
+def _is_orphaned(claimed_path):
+    """True when the worker process that claimed a spill file ('<spill>.<pid>-<n>.replay') has exited."""
+    try:
+        pid = int(claimed_path.rsplit('.', 2)[-2].split('-')[0])
+    except ValueError:
+        return False
+    if pid == os.getpid() or os.name != 'posix':
+        # start() replays once per process, and waitress (Windows) runs a single process
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+def insert_audit_events(conn, rows):
+    """Insert (username, activity, details, log_time) rows with one multi-row statement and commit."""
+    placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+    params = [value for row in rows for value in row]
+    cursor = conn.cursor()
+    cursor.execute(f"INSERT INTO audit_logs (username, activity, details, log_time) VALUES {placeholders}", params)
+    cursor.close()
+    conn.commit()
+
+
+class AuditWriter:
+    def __init__(self, pool, spill_path=None, max_queue=10000, batch_size=500, flush_interval=1.0, enqueue_timeout=2.0):
+        """
+        Args:
+            pool (ConnectionPool): Pool the writer borrows a connection from for each flush.
+            spill_path (str): JSON-lines file for rows still queued at shutdown.
+            max_queue (int): Rows held in memory before submit applies backpressure.
+            batch_size (int): Maximum rows per INSERT (4 parameters each; keep under SQLite's limit).
+            flush_interval (float): Seconds the writer waits to fill a batch before flushing a partial one.
+            enqueue_timeout (float): Seconds submit waits for room before raising AuditBacklogFull.
+        """
+        self._pool = pool
+        self.spill_path = spill_path or config.AUDIT_WRITER_SPILL_PATH
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_queue = max_queue
+        self._rows = deque()
+        self._cond = threading.Condition()
+        self._retry = []  # Rows that failed to insert (or were replayed); written before anything newer
+        self._replay_files = []  # Claimed spill files, kept until their rows (at the head of _retry) are written
+        self._replay_left = 0
+        self._stopping = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.stats = {'enqueued': 0, 'written': 0, 'flushes': 0, 'failed_flushes': 0, 'rejected': 0,
+                      'spilled': 0, 'replayed': 0, 'max_depth': 0,
+                      'flush_ms_last': 0.0, 'flush_ms_max': 0.0, 'flush_ms_total': 0.0}
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def start(self):
+        """Replay any spill file and start the writer thread (once per process, after fork)."""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._replay_spill()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, rows):
+        """Queue audit rows for writing, waiting briefly for room if the queue is full."""
+        if self._stopping.is_set():
+            self._spill(rows)  # Shutting down: straight to the spill file
+            return
+        if self._thread is None:
+            self.start()
+        with self._cond:
+            # All-or-nothing, so a rejected client batch can be retried without duplicates
+            has_room = self._cond.wait_for(
+                lambda: self._depth() == 0 or self._depth() + len(rows) <= self.max_queue, self.enqueue_timeout)
+            if not has_room:
+                self._count('rejected', len(rows))
+                raise AuditBacklogFull(f"Audit queue is full ({self._depth()} of {self.max_queue} rows)")
+            self._rows.extend(rows)
+            self._cond.notify_all()
+            depth = self._depth()
+        with self._lock:
+            self.stats['enqueued'] += len(rows)
+            self.stats['max_depth'] = max(self.stats['max_depth'], depth)
+
+    def _depth(self):
+        return len(self._rows) + len(self._retry)
+
+    def record(self, username, activity, details, log_time=None):
+        """Queue one audit entry from server code, after its own transaction has committed."""
+        self.submit([(username, activity, details, log_time or time.strftime('%Y-%m-%d %H:%M:%S'))])
+
+    def _next_batch(self):
+        with self._cond:
+            if not self._rows:
+                self._cond.wait(self.flush_interval)
+            batch = [self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))]
+            if batch:
+                self._cond.notify_all()
+        return batch
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        try:
+            with self._pool.connection() as conn:
+                insert_audit_events(conn, batch)
+        except Exception as e:
+            self._count('failed_flushes')
+            print(f"Error writing audit batch of {len(batch)}: {e}")
+            return False
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.stats['written'] += len(batch)
+            self.stats['flushes'] += 1
+            self.stats['flush_ms_last'] = elapsed_ms
+            self.stats['flush_ms_total'] += elapsed_ms
+            self.stats['flush_ms_max'] = max(self.stats['flush_ms_max'], elapsed_ms)
+        return True
+
+    def _run(self):
+        backoff = self.flush_interval
+        while not self._stopping.is_set():
+            with self._cond:
+                retrying = bool(self._retry)
+                batch = self._retry[:self.batch_size] if retrying else None
+            if not retrying:
+                batch = self._next_batch()
+            if not batch:
+                continue
+            if self._flush(batch):
+                if retrying:
+                    with self._cond:
+                        del self._retry[:len(batch)]
+                        self._cond.notify_all()
+                    self._release_replayed(len(batch))
+                backoff = self.flush_interval
+            else:
+                if not retrying:
+                    with self._cond:
+                        self._retry = batch
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def _drain(self):
+        with self._cond:
+            rows = self._retry + list(self._rows)
+            self._retry = []
+            self._rows.clear()
+            self._cond.notify_all()
+        return rows
+
+    def close(self, timeout=5):
+        """Stop the writer, flush what is queued, and fsync any remainder to the spill file."""
+        self._stopping.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+        rows = self._drain()
+        while rows:
+            batch, rows = rows[:self.batch_size], rows[self.batch_size:]
+            if not self._flush(batch):
+                if self._spill(batch + rows):
+                    self._release_replayed(self._replay_left)  # Their rows are in the new spill file
+                break
+            self._release_replayed(len(batch))
+
+    def _spill(self, rows):
+        try:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(list(row)) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._count('spilled', len(rows))
+            return True
+        except OSError as e:
+            print(f"Error writing audit spill file, {len(rows)} rows lost: {e}")
+            return False
+
+    def _replay_spill(self):
+        # Claim the spill file (and any a dead worker had claimed) with a rename so only one worker replays it
+        sources = [self.spill_path] + [path for path in glob.glob(f"{glob.escape(self.spill_path)}.*.replay")
+                                       if _is_orphaned(path)]
+        rows = []
+        for n, source in enumerate(sources):
+            claimed = f"{self.spill_path}.{os.getpid()}-{n}.replay"
+            try:
+                os.replace(source, claimed)
+                with open(claimed, encoding='utf-8') as f:
+                    rows.extend(tuple(json.loads(line)) for line in f if line.strip())
+            except OSError:
+                continue
+            self._replay_files.append(claimed)
+        self._retry = rows
+        self._replay_left = len(rows)
+        self._count('replayed', len(rows))
+
+    def _release_replayed(self, count):
+        """Delete the claimed spill files once `count` more of their rows have been written."""
+        if not self._replay_files:
+            return
+        self._replay_left -= count
+        if self._replay_left <= 0:
+            for path in self._replay_files:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._replay_files = []
+            self._replay_left = 0
+
+    def status(self):
+        """Queue depth and flush latency metrics for the health endpoint."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['depth'] = self._depth()
+        stats['capacity'] = self.max_queue
+        stats['flush_ms_avg'] = stats['flush_ms_total'] / stats['flushes'] if stats['flushes'] else 0.0
+        return stats
@@ -0,0 +1,360 @@
+"""
+Login and session bootstrap.
+
+`/validate_login` answers with everything the client needs to start a session:
+the access and refresh tokens, the user's role, initials and temp-password flag, the saved
+preferences and the facility counters. The client makes one request at login
+instead of one per fact.
+
+Access tokens are short-lived. `/refresh_token` trades a refresh token for a new
+access token and a new refresh token, so an active session never has to log in
+again and an idle one ends after JWT_REFRESH_TTL.
+
+Access tokens also carry the user's id, role and initials, and `require_auth`
+verifies them from the signature alone, so authorization costs no database
+round trip and any worker or host holding JWT_SECRET_KEY can serve any request.
+Claims are re-read from `users` at every refresh, so a role or initials change
+reaches the client within JWT_ACCESS_TTL. Facility preferences, which are not in
+the token, come from a short-lived per-worker cache.
+
+All bcrypt work (login, account creation, password changes) goes through the
+worker's PasswordHasher (server/passwords.py), never the request thread itself.
+"""
+import atexit
+import time
+from functools import wraps
+import jwt
+from flask import Blueprint, g, jsonify, request
+import config
+from server import API_VERSION
+from server.cache import TTLCache
+from server.db import get_backend_name, get_db, release_db
+from server.passwords import HasherBusy, PasswordHasher, calibrate_rounds
+
+bp = Blueprint('auth', __name__)
+
+DEFAULT_PREFERENCES = {'theme': 'Reddit', 'font': 'Helvetica'}
+
+
+SAVE_PREFERENCE_SQL = {
+    'mysql': '''
+        INSERT INTO user_settings (setting_name, setting_value) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE setting_value = VALUES(setting_value)
+    ''',
+    'sqlite': '''
+        INSERT INTO user_settings (setting_name, setting_value) VALUES (%s, %s)
+        ON CONFLICT (setting_name) DO UPDATE SET setting_value = excluded.setting_value
+    ''',
+}
+
+_preferences_cache = None
+_hasher = None
+
+
+def init_app(app):
+    global _preferences_cache, _hasher
+    if not config.JWT_SECRET_KEY:
+        raise RuntimeError("Set RESIDENT_MGMT_JWT_SECRET_KEY before starting the API server")
+    _preferences_cache = TTLCache(config.SERVER_CACHE_TTL)
+    app.extensions['preferences_cache'] = _preferences_cache
+
+    rounds = config.BCRYPT_ROUNDS
+    rounds = calibrate_rounds(config.BCRYPT_TARGET_MS) if rounds == 'auto' else int(rounds)
+    _hasher = PasswordHasher(rounds, workers=config.BCRYPT_WORKERS,
+                             max_queue=config.BCRYPT_QUEUE_SIZE, timeout=config.BCRYPT_TIMEOUT)
+    app.extensions['password_hasher'] = _hasher
+    app.register_error_handler(HasherBusy, _hasher_busy)
+    atexit.register(_hasher.close)
+
+
+def _hasher_busy(e):
+    # Backpressure: the client retries the login rather than piling more bcrypt work on
+    return jsonify({'error': str(e)}), 503, {'Retry-After': '2'}
+
+
+def _issue_token(user, token_type, ttl):
+    now = int(time.time())
+    claims = {'sub': user['username'], 'typ': token_type, 'iat': now, 'exp': now + ttl}
+    if token_type == 'access':
+        claims.update({'uid': user['user_id'], 'role': user['user_role'], 'initials': user['initials'] or ''})
+    return jwt.encode(claims, config.JWT_SECRET_KEY, algorithm='HS256')
+
+
+def issue_access_token(user):
+    """Signed, short-lived access token for the user."""
+    return _issue_token(user, 'access', config.JWT_ACCESS_TTL)
+
+
+def issue_refresh_token(user):
+    """Signed refresh token; each refresh issues a new one, so the session slides while in use."""
+    return _issue_token(user, 'refresh', config.JWT_REFRESH_TTL)
+
+
+def verify_access_token(token):
+    """Claims of a valid access token, or None. Checks the signature and expiry only; no DB access."""
+    try:
+        claims = jwt.decode(token, config.JWT_SECRET_KEY, algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+    return claims if claims.get('typ') == 'access' else None
+
+
+def require_auth(admin=False):
+    """
+    Reject requests without a valid access token (401), or from non-admins when
+    admin=True (403). The verified claims are available as `g.user`.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            header = request.headers.get('Authorization', '')
+            claims = verify_access_token(header[7:]) if header.startswith('Bearer ') else None
+            if claims is None:
+                return jsonify({'error': 'Invalid or expired access token'}), 401
+            if admin and claims.get('role') != 'Admin':
+                return jsonify({'error': 'Admin access required'}), 403
+            g.user = claims
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def fetch_user(cursor, username):
+    cursor.execute('''
+        SELECT user_id, username, password_hash, user_role, initials, is_temp_password
+        FROM users WHERE username = %s
+    ''', (username,))
+    return cursor.fetchone()
+
+
+def _load_preferences(cursor):
+    cursor.execute("SELECT setting_name, setting_value FROM user_settings WHERE setting_name IN ('theme', 'font')")
+    preferences = dict(DEFAULT_PREFERENCES)
+    preferences.update({name: value for name, value in ((row['setting_name'], row['setting_value']) for row in cursor.fetchall()) if value})
+    return preferences
+
+
+def get_preferences(cursor):
+    """Facility theme and font, from the cache while fresh. `cursor` must be a dictionary cursor."""
+    return dict(_preferences_cache.get('preferences', lambda: _load_preferences(cursor)))
+
+
+def session_bootstrap(cursor, user):
+    """Everything the client caches at login: cached preferences plus one small query."""
+    preferences = get_preferences(cursor)
+
+    cursor.execute("SELECT COUNT(*) AS residents FROM residents")
+    counts = {'residents': int(cursor.fetchone()['residents'])}
+
+    return {
+        'user': {
+            'username': user['username'],
+            'role': user['user_role'],
+            'is_admin': user['user_role'] == 'Admin',
+            'initials': user['initials'] or '',
+            'is_temp_password': bool(user['is_temp_password']),
+        },
+        'preferences': preferences,
+        'counts': counts,
+        'server_version': API_VERSION,
+    }
+
+
+@bp.route('/validate_login', methods=['POST'])
+def validate_login():
+    data = request.get_json(silent=True) or {}
+    username, password = data.get('username', ''), data.get('password', '')
+    if not username or not password:
+        return jsonify({'valid': False, 'error': 'Username and password are required'}), 400
+
+    cursor = get_db().cursor(dictionary=True)
+    try:
+        user = fetch_user(cursor, username)
+    finally:
+        cursor.close()
+    # Give the connection back while waiting on bcrypt, so a login storm cannot drain the pool
+    release_db()
+
+    password_hash = user['password_hash'] if user else None
+    if not _hasher.verify(password, password_hash):
+        return jsonify({'valid': False}), 401
+    # Bring older hashes up to the current cost while we have the plaintext
+    new_hash = _hasher.hash(password) if _hasher.needs_rehash(password_hash) else None
+
+    conn = get_db()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        if new_hash:
+            cursor.execute("UPDATE users SET password_hash = %s WHERE user_id = %s", (new_hash, user['user_id']))
+            conn.commit()
+
+        response = {'valid': True, 'token': issue_access_token(user), 'refresh_token': issue_refresh_token(user)}
+        response.update(session_bootstrap(cursor, user))
+        return jsonify(response), 200
+    finally:
+        cursor.close()
+
+
+@bp.route('/refresh_token', methods=['POST'])
+def refresh_token():
+    token = (request.get_json(silent=True) or {}).get('refresh_token', '')
+    try:
+        claims = jwt.decode(token, config.JWT_SECRET_KEY, algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return jsonify({'error': 'Invalid or expired refresh token'}), 401
+    if claims.get('typ') != 'refresh':
+        return jsonify({'error': 'Not a refresh token'}), 401
+
+    cursor = get_db().cursor(dictionary=True)
+    try:
+        # Re-read the user so a removed account cannot keep refreshing
+        user = fetch_user(cursor, claims.get('sub', ''))
+    finally:
+        cursor.close()
+    if not user:
+        return jsonify({'error': 'User no longer exists'}), 401
+
+    return jsonify({'token': issue_access_token(user), 'refresh_token': issue_refresh_token(user)}), 200
+
+
+@bp.route('/get_user_initials')
+@require_auth()
+def get_user_initials():
+    return jsonify({'initials': g.user.get('initials', '')}), 200
+
+
+@bp.route('/is_admin', methods=['POST'])
+@require_auth()
+def is_admin():
+    """Answered from the token for the caller; only admins may ask about another user (one lookup)."""
+    username = (request.get_json(silent=True) or {}).get('username') or g.user['sub']
+    if username == g.user['sub']:
+        return jsonify({'is_admin': g.user.get('role') == 'Admin'}), 200
+    if g.user.get('role') != 'Admin':
+        return jsonify({'error': 'Admin access required'}), 403
+
+    cursor = get_db().cursor(dictionary=True)
+    try:
+        user = fetch_user(cursor, username)
+    finally:
+        cursor.close()
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify({'is_admin': user['user_role'] == 'Admin'}), 200
+
+
+@bp.route('/get_user_preferences')
+def get_user_preferences():
+    cursor = get_db().cursor(dictionary=True)
+    try:
+        return jsonify(get_preferences(cursor)), 200
+    finally:
+        cursor.close()
+
+
+@bp.route('/save_user_preferences', methods=['POST'])
+@require_auth()
+def save_user_preferences():
+    data = request.get_json(silent=True) or {}
+    settings = [(name, data[name]) for name in ('theme', 'font') if data.get(name)]
+    if not settings:
+        return jsonify({'error': 'Expected theme and/or font'}), 400
+
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(SAVE_PREFERENCE_SQL[get_backend_name()], settings)
+        conn.commit()
+    finally:
+        cursor.close()
+    _preferences_cache.invalidate('preferences')
+    return jsonify({'message': 'Preferences saved'}), 200
+
+
+@bp.route('/is_first_time_setup')
+def is_first_time_setup():
+    cursor = get_db().cursor()
+    try:
+        cursor.execute("SELECT 1 FROM users LIMIT 1")
+        return jsonify({'first_time_setup': cursor.fetchone() is None}), 200
+    finally:
+        cursor.close()
+
+
+def _insert_user(username, password, role, initials, is_temp_password):
+    """Hash (on the password pool) and insert a user; False if the username is taken."""
+    password_hash = _hasher.hash(password)
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        if fetch_user(cursor, username):
+            return False
+        cursor.execute('''
+            INSERT INTO users (username, password_hash, user_role, initials, is_temp_password)
+            VALUES (%s, %s, %s, %s, %s)
+        ''', (username, password_hash, role, initials, int(bool(is_temp_password))))
+        conn.commit()
+        return True
+    finally:
+        cursor.close()
+
+
+@bp.route('/create_admin_account', methods=['POST'])
+def create_admin_account():
+    """First-time setup only: creates the initial admin while the users table is empty."""
+    data = request.get_json(silent=True) or {}
+    if not data.get('username') or not data.get('password'):
+        return jsonify({'error': 'Username and password are required'}), 400
+
+    cursor = get_db().cursor()
+    try:
+        cursor.execute("SELECT 1 FROM users LIMIT 1")
+        if cursor.fetchone() is not None:
+            return jsonify({'error': 'Setup has already been completed'}), 403
+    finally:
+        cursor.close()
+
+    if not _insert_user(data['username'], data['password'], 'Admin', data.get('initials', ''), False):
+        return jsonify({'error': 'Username already exists'}), 409
+    return jsonify({'message': 'Admin account created'}), 200
+
+
+@bp.route('/create_user', methods=['POST'])
+@require_auth(admin=True)
+def create_user():
+    data = request.get_json(silent=True) or {}
+    if not data.get('username') or not data.get('password'):
+        return jsonify({'error': 'Username and password are required'}), 400
+    if not _insert_user(data['username'], data['password'], data.get('user_role', 'User'),
+                        data.get('initials', ''), data.get('is_temp_password', True)):
+        return jsonify({'error': 'Username already exists'}), 409
+    return jsonify({'message': 'User created'}), 201
+
+
+@bp.route('/update_password', methods=['POST'])
+@require_auth()
+def update_password():
+    """
+    Users change their own password; admins may reset anyone's. A reset password is
+    temporary, so that user is asked to choose a new one at their next login.
+    """
+    data = request.get_json(silent=True) or {}
+    username, new_password = data.get('username') or g.user['sub'], data.get('new_password', '')
+    if not new_password:
+        return jsonify({'error': 'New password is required'}), 400
+    if username != g.user['sub'] and g.user.get('role') != 'Admin':
+        return jsonify({'error': 'Admin access required'}), 403
+
+    password_hash = _hasher.hash(new_password)
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE users SET password_hash = %s, is_temp_password = %s WHERE username = %s",
+                       (password_hash, int(username != g.user['sub']), username))
+        updated = cursor.rowcount
+        conn.commit()
+    finally:
+        cursor.close()
+    if not updated:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify({'message': 'Password updated'}), 200
@@ -0,0 +1,178 @@
+"""
+Database backends for the API server, selected by config.DB_BACKEND.
+
+`mysql` talks to the db_init.sql schema through mysql.connector. `sqlite` is a
+zero-infrastructure stand-in for single-building installs, local testing and
+the benchmark/load-test suite: it opens config.SERVER_DB_PATH, creates the
+schema from server/schema_sqlite.sql, and wraps the sqlite3 connection so the
+server's MySQL-style queries (%s placeholders, cursor(dictionary=True), NOW(),
+CURDATE()) run unchanged.
+"""
+import os
+import sqlite3
+from datetime import date, datetime
+import config
+import rollups
+
+SQLITE_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema_sqlite.sql')
+
+
+def _backfill_rollups(conn, cursor):
+    rollups.backfill_rollups(conn, cursor, emar_table='emar_chart')
+
+
+# Derived tables filled from existing rows the first time schema_sqlite.sql creates them:
+# SQL, or a callable taking (conn, cursor) like the MySQL migration steps
+SQLITE_BACKFILLS = {
+    'audit_logs_fts': "INSERT INTO audit_logs_fts (audit_logs_fts) VALUES ('rebuild')",
+    'audit_daily_counts': '''
+        INSERT INTO audit_daily_counts (log_date, log_hour, username, activity, action_count)
+        SELECT date(log_time), CAST(strftime('%H', log_time) AS INTEGER), COALESCE(username, ''),
+               COALESCE(activity, ''), COUNT(*)
+        FROM audit_logs WHERE log_time IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    ''',
+    'month_availability': '''
+        INSERT INTO month_availability (resident_id, month_start, kinds)
+        SELECT resident_id, month_start, SUM(DISTINCT kind) FROM (
+            SELECT DISTINCT resident_id, date(chart_date, 'start of month') AS month_start, 1 AS kind FROM emar_chart
+            UNION ALL
+            SELECT DISTINCT resident_id, date(chart_date, 'start of month'), 2 FROM adl_chart
+            UNION ALL
+            SELECT DISTINCT resident_id, date(last_administered_date, 'start of month'), 4
+            FROM non_medication_orders WHERE last_administered_date IS NOT NULL
+        )
+        WHERE resident_id IS NOT NULL AND month_start IS NOT NULL
+        GROUP BY resident_id, month_start
+    ''',
+    # Fills adl_month_rollup too; schema_sqlite.sql creates both tables together
+    'emar_month_rollup': _backfill_rollups,
+}
+
+
+class SQLiteCursor:
+    """sqlite3 cursor exposing the subset of the mysql.connector cursor API the server uses."""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def execute(self, query, params=()):
+        self._cursor.execute(query.replace('%s', '?'), params)
+        return self
+
+    def executemany(self, query, seq_of_params):
+        self._cursor.executemany(query.replace('%s', '?'), seq_of_params)
+        return self
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return (self._row(row) for row in self._cursor)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """sqlite3 connection that hands out SQLiteCursor objects."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False):
+        return SQLiteCursor(self._conn.cursor(), dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+class MySQLBackend:
+    name = 'mysql'
+
+    def connect(self):
+        import mysql.connector
+        return mysql.connector.connect(**config.MYSQL_CONFIG)
+
+    def init_schema(self):
+        """The MySQL schema is managed by db_init.sql and `python schema_migrations.py mysql`."""
+
+
+class SQLiteBackend:
+    name = 'sqlite'
+
+    def __init__(self, path=None):
+        self.path = path or config.SERVER_DB_PATH
+
+    def connect(self):
+        # Pooled connections are released and re-acquired on different worker threads
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+        # Same pragmas as the client's offline database (importing db_functions would pull in its thread pool)
+        for pragma, value in (('journal_mode', 'WAL'), ('synchronous', 'NORMAL'),
+                              ('foreign_keys', 'ON'), ('busy_timeout', 5000)):
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        conn.create_function('NOW', 0, lambda: datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        conn.create_function('CURDATE', 0, lambda: date.today().isoformat())
+        return SQLiteConnection(conn)
+
+    def init_schema(self):
+        """Create the server schema if it does not exist yet."""
+        with open(SQLITE_SCHEMA_PATH, encoding='utf-8') as schema:
+            script = schema.read()
+        conn = sqlite3.connect(self.path)
+        try:
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            conn.executescript(script)
+            for table, backfill in SQLITE_BACKFILLS.items():
+                if table in existing:
+                    continue
+                if callable(backfill):
+                    wrapped = SQLiteConnection(conn)
+                    backfill(wrapped, wrapped.cursor())
+                else:
+                    conn.execute(backfill)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+BACKENDS = {
+    'mysql': MySQLBackend,
+    'sqlite': SQLiteBackend,
+}
+
+
+def get_backend(name=None):
+    """Return the backend named by `name`, or by config.DB_BACKEND when omitted."""
+    name = name or config.DB_BACKEND
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown DB_BACKEND '{name}'; expected one of: {', '.join(BACKENDS)}")
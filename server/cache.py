@@ -0,0 +1,57 @@
+"""
+Small in-process TTL cache for data the API reads on nearly every request.
+
+Each worker process keeps its own copy, so nothing is shared between workers or
+hosts: a value may be up to `ttl` seconds stale on a worker that did not make
+the change. Only cache data where that is acceptable, and invalidate locally
+after writing.
+"""
+import threading
+import time
+
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire `ttl` seconds after they are stored."""
+
+    def __init__(self, ttl, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, loader):
+        """Return the cached value for key, calling loader() to fill it when missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Load outside the lock; two threads missing together both load, which is harmless
+        value = loader()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict(now)
+            self._entries[key] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _evict(self, now):
+        expired = [key for key, (expires, _) in self._entries.items() if expires <= now]
+        for key in expired or list(self._entries)[:len(self._entries) // 2]:
+            del self._entries[key]
+
+    def status(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl}
@@ -0,0 +1,52 @@
+"""
+Request-scoped database access for the API server.
+
+`init_app` builds one bounded ConnectionPool per worker process. Endpoints call
+`get_db()`; the first call in a request checks a connection out of the pool and
+the app-context teardown returns it, so a request holds at most one connection
+and never pays the connect handshake on the hot path. The pool's connections
+come from the backend selected by config.DB_BACKEND (see server.backends).
+"""
+from flask import current_app, g
+import config
+from server.backends import get_backend
+from server.pool import ConnectionPool
+
+
+def create_pool(backend):
+    """Build the connection pool from the DB_POOL_* settings in config."""
+    return ConnectionPool(backend.connect,
+                          size=config.DB_POOL_SIZE,
+                          recycle=config.DB_POOL_RECYCLE,
+                          timeout=config.DB_POOL_TIMEOUT,
+                          ping_interval=config.DB_POOL_PING_INTERVAL)
+
+
+def init_app(app):
+    backend = get_backend()
+    backend.init_schema()
+    app.extensions['db_backend'] = backend
+    app.extensions['db_pool'] = create_pool(backend)
+    app.teardown_appcontext(release_db)
+
+
+def get_pool():
+    return current_app.extensions['db_pool']
+
+
+def get_backend_name():
+    return current_app.extensions['db_backend'].name
+
+
+def get_db():
+    """Return this request's connection, checking one out of the pool on first use."""
+    if 'db' not in g:
+        g.db = get_pool().acquire()
+    return g.db
+
+
+def release_db(exception=None):
+    """Return the request's connection to the pool (teardown handler)."""
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().release(conn)
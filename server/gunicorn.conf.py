@@ -0,0 +1,19 @@
+# Gunicorn settings for the API server: gunicorn -c server/gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.environ.get('RESIDENT_MGMT_API_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('RESIDENT_MGMT_API_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('RESIDENT_MGMT_API_THREADS', 4))
+
+# Each worker builds its own connection pool after fork; keep DB_POOL_SIZE >= threads
+preload_app = False
+timeout = 60
+graceful_timeout = 30
+max_requests = 5000
+max_requests_jitter = 500
+
+
+def worker_exit(server, worker):
+    # Flush (or fsync to the spill file) audit rows still queued in this worker
+    worker.wsgi.extensions['audit_writer'].close()
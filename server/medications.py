@@ -0,0 +1,43 @@
+"""
+Medication endpoints.
+
+`/filter_active_medications` checks the whole list of names the client sends in
+one set-based query covered by idx_medications_resident_name, the same form as
+db_functions.filter_active_medications for the offline database.
+"""
+from flask import Blueprint, jsonify, request
+from server.auth import require_auth
+from server.db import get_db
+
+bp = Blueprint('medications', __name__)
+
+
+@bp.route('/filter_active_medications', methods=['POST'])
+@require_auth()
+def filter_active_medications():
+    """
+    The medications from `medication_names` still active for the resident: those
+    without a discontinued_date on or before today.
+    """
+    data = request.get_json(silent=True) or {}
+    resident_name, medication_names = data.get('resident_name'), data.get('medication_names')
+    if not resident_name or not isinstance(medication_names, list) \
+            or not all(isinstance(name, str) for name in medication_names):
+        return jsonify({'error': "Expected resident_name and a 'medication_names' list"}), 400
+    if not medication_names:
+        return jsonify({'active_medications': []}), 200
+
+    placeholders = ', '.join(['%s'] * len(medication_names))
+    cursor = get_db().cursor()
+    try:
+        cursor.execute(f'''
+            SELECT m.medication_name FROM medications m
+            JOIN residents r ON m.resident_id = r.id
+            WHERE r.name = %s AND m.medication_name IN ({placeholders})
+            AND m.discontinued_date IS NOT NULL AND m.discontinued_date <= CURDATE()
+        ''', (resident_name, *medication_names))
+        discontinued = {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+    return jsonify({'active_medications': [name for name in medication_names if name not in discontinued]}), 200
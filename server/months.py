@@ -0,0 +1,318 @@
+"""
+Month close and monthly chart endpoints.
+
+Closed months are answered from the artefacts month_close.close_month stored,
+without reading the chart tables; open months are read pre-pivoted from the
+emar_month_rollup / adl_month_rollup tables (see rollups.py).
+
+Chart saves upsert the whole batch the client sends with one executemany
+(INSERT ... ON DUPLICATE KEY UPDATE on MySQL, which mysql.connector sends as a
+single multi-row statement) in one transaction, rather than one statement per cell.
+Saves, closes and reopens are audited here, once committed, through the AuditWriter.
+"""
+from datetime import datetime
+from flask import Blueprint, Response, g, jsonify, request
+import month_close
+import month_availability
+import rollups
+from adl_fields import ADL_KEYS
+from server.audit import record_action
+from server.auth import require_auth
+from server.db import get_backend_name, get_db
+
+bp = Blueprint('months', __name__)
+
+# Closed-month responses do not change until the month is reopened; clients cache only these
+FROZEN_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+SAVE_EMAR_CHART_SQL = {
+    'mysql': '''
+        INSERT INTO emar_chart (resident_id, medication_id, chart_date, time_slot, administered)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE administered = VALUES(administered)
+    ''',
+    'sqlite': '''
+        INSERT INTO emar_chart (resident_id, medication_id, chart_date, time_slot, administered)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (resident_id, medication_id, chart_date, time_slot) DO UPDATE SET administered = excluded.administered
+    ''',
+}
+
+
+def save_adl_chart_sql(dialect, columns):
+    """Upsert of adl_chart rows that sets only `columns`, so days saved with a few edited cells keep the rest."""
+    placeholders = ', '.join(['%s'] * (len(columns) + 2))
+    if dialect == 'mysql':
+        updates = ', '.join(f"{column} = VALUES({column})" for column in columns)
+        conflict = f"ON DUPLICATE KEY UPDATE {updates}"
+    else:
+        updates = ', '.join(f"{column} = excluded.{column}" for column in columns)
+        conflict = f"ON CONFLICT (resident_id, chart_date) DO UPDATE SET {updates}"
+    return f'''
+        INSERT INTO adl_chart (resident_id, chart_date, {', '.join(columns)}) VALUES ({placeholders})
+        {conflict}
+    '''
+
+
+def _resident_id(cursor, resident_name):
+    cursor.execute("SELECT id FROM residents WHERE name = %s", (resident_name,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _blob_response(cursor, digest):
+    blob = month_close.fetch_blob(cursor, digest)
+    if blob is None:
+        return jsonify({'error': 'Artefact not found'}), 404
+    content_type, body = blob
+    response = Response(body, mimetype=content_type)
+    # Content-addressed: the bytes behind a digest never change
+    response.set_etag(digest)
+    response.headers['Cache-Control'] = FROZEN_CACHE_CONTROL
+    return response.make_conditional(request)
+
+
+def _month_chart(resident_name, year_month, kind, build):
+    try:
+        month_close.month_bounds(year_month)
+    except ValueError:
+        return jsonify({'error': "Expected year_month as 'YYYY-MM'"}), 400
+
+    cursor = get_db().cursor()
+    try:
+        artefacts = month_close.resident_month_artefacts(cursor, resident_name, year_month)
+        if artefacts is not None:
+            if kind in artefacts:
+                return _blob_response(cursor, artefacts[kind])
+            return jsonify([]), 200, {'Cache-Control': FROZEN_CACHE_CONTROL}
+        resident_id = _resident_id(cursor, resident_name)
+        if resident_id is None:
+            return jsonify({'error': 'Resident not found'}), 404
+        return jsonify(build(cursor, resident_id, year_month)), 200
+    finally:
+        cursor.close()
+
+
+def _month_has_chart(resident_name, year_month, kind, table):
+    try:
+        start, end = month_close.month_bounds(year_month)
+    except ValueError:
+        return jsonify({'error': "Expected year_month as 'YYYY-MM'"}), 400
+
+    cursor = get_db().cursor()
+    try:
+        artefacts = month_close.resident_month_artefacts(cursor, resident_name, year_month)
+        if artefacts is not None:
+            return jsonify({'exists': kind in artefacts}), 200
+        cursor.execute(f'''
+            SELECT 1 FROM {table} c JOIN residents r ON r.id = c.resident_id
+            WHERE r.name = %s AND c.chart_date >= %s AND c.chart_date < %s LIMIT 1
+        ''', (resident_name, start.isoformat(), end.isoformat()))
+        return jsonify({'exists': cursor.fetchone() is not None}), 200
+    finally:
+        cursor.close()
+
+
+@bp.route('/fetch_emar_data_for_month/<resident_name>/<year_month>')
+@require_auth()
+def fetch_emar_data_for_month(resident_name, year_month):
+    return _month_chart(resident_name, year_month, 'emar', rollups.emar_month_payload)
+
+
+@bp.route('/fetch_adl_chart_data_for_month/<resident_name>')
+@require_auth()
+def fetch_adl_chart_data_for_month(resident_name):
+    return _month_chart(resident_name, request.args.get('year_month', ''), 'adl', rollups.adl_month_payload)
+
+
+@bp.route('/does_emars_chart_exist/<resident_name>/<year_month>')
+@require_auth()
+def does_emars_chart_exist(resident_name, year_month):
+    return _month_has_chart(resident_name, year_month, 'emar', month_close.EMAR_TABLE[get_backend_name()])
+
+
+@bp.route('/does_adl_chart_exist/<resident_name>/<year_month>')
+@require_auth()
+def does_adl_chart_exist(resident_name, year_month):
+    return _month_has_chart(resident_name, year_month, 'adl', 'adl_chart')
+
+
+def _chart_day(chart_date, year_month):
+    """The chart_date as 'YYYY-MM-DD' if it is a day of year_month; ValueError otherwise."""
+    day = datetime.strptime(chart_date, '%Y-%m-%d').date()
+    if chart_date[:7] != year_month:
+        raise ValueError(f"{chart_date} is not in {year_month}")
+    return day.isoformat()
+
+
+def _chart_save_request(entries_key):
+    """(resident_name, year_month, entries) of a chart save body; ValueError if malformed."""
+    data = request.get_json(silent=True) or {}
+    resident_name, year_month, entries = data.get('resident_name'), data.get('year_month', ''), data.get(entries_key)
+    month_close.month_bounds(year_month)
+    if not resident_name or not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        raise ValueError(f"Expected resident_name, year_month and an '{entries_key}' list")
+    return resident_name, year_month, entries
+
+
+def _save_chart(resident_name, year_month, build_batches, activity):
+    """
+    Run the upserts `build_batches(cursor, resident_id)` returns ([(sql, rows)]) in one transaction
+    and audit it as `activity`. Closed months are refused up front rather than left to the freeze triggers.
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        if month_close.is_month_closed(cursor, year_month):
+            return jsonify({'error': f"{year_month} is closed; reopen it to make changes"}), 409
+        resident_id = _resident_id(cursor, resident_name)
+        if resident_id is None:
+            return jsonify({'error': 'Resident not found'}), 404
+        try:
+            batches = build_batches(cursor, resident_id)
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({'error': f"Malformed chart entry: {e}"}), 400
+        try:
+            for sql, rows in batches:
+                cursor.executemany(sql, rows)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Error saving chart for {resident_name} {year_month}: {e}")
+            return jsonify({'error': 'Failed to save chart data'}), 500
+        row_count = sum(len(rows) for _, rows in batches)
+        record_action(activity, f"{resident_name} {year_month}: {row_count} entries saved")
+        return jsonify({'message': 'Chart saved', 'rows': row_count}), 200
+    finally:
+        cursor.close()
+
+
+@bp.route('/save_emar_data_from_chart', methods=['POST'])
+@require_auth()
+def save_emar_data_from_chart():
+    """Upsert a month of eMAR cells: emar_data is [{chart_date, medication_name, time_slot, administered}]."""
+    try:
+        resident_name, year_month, entries = _chart_save_request('emar_data')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def build_batches(cursor, resident_id):
+        names = sorted({entry['medication_name'] for entry in entries})
+        if not names:
+            return []
+        # Every medication id in one query, scoped to the resident
+        cursor.execute(f'''
+            SELECT medication_name, id FROM medications
+            WHERE resident_id = %s AND medication_name IN ({', '.join(['%s'] * len(names))})
+        ''', (resident_id, *names))
+        medication_ids = dict(cursor.fetchall())
+        rows = [(resident_id, medication_ids[entry['medication_name']], _chart_day(entry['chart_date'], year_month),
+                 entry['time_slot'], entry.get('administered'))
+                for entry in entries if entry['medication_name'] in medication_ids]
+        return [(SAVE_EMAR_CHART_SQL[get_backend_name()], rows)] if rows else []
+
+    return _save_chart(resident_name, year_month, build_batches, 'eMAR Chart Saved')
+
+
+@bp.route('/save_adl_data_from_chart', methods=['POST'])
+@require_auth()
+def save_adl_data_from_chart():
+    """Upsert the edited days of an ADL month: adl_data is [{chart_date, data: {adl_key: value}}]."""
+    try:
+        resident_name, year_month, entries = _chart_save_request('adl_data')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def build_batches(cursor, resident_id):
+        # Days edited in the same columns share one statement
+        by_columns = {}
+        for entry in entries:
+            data = entry['data']
+            columns = tuple(key for key in ADL_KEYS if key in data)
+            if len(columns) != len(data):
+                raise ValueError(f"Unknown ADL columns {sorted(set(data) - set(ADL_KEYS))}")
+            if columns:
+                values = [data[key] if data[key] != '' else None for key in columns]
+                by_columns.setdefault(columns, []).append(
+                    (resident_id, _chart_day(entry['chart_date'], year_month), *values))
+        return [(save_adl_chart_sql(get_backend_name(), columns), rows) for columns, rows in by_columns.items()]
+
+    return _save_chart(resident_name, year_month, build_batches, 'ADL Chart Saved')
+
+
+@bp.route('/month_availability')
+@require_auth()
+def month_availability_index():
+    """Months with eMAR, ADL or non-med data, per resident (optionally ?resident=<name> only)."""
+    cursor = get_db().cursor()
+    try:
+        availability = month_availability.fetch_month_availability(cursor, request.args.get('resident'))
+    finally:
+        cursor.close()
+    return jsonify({'residents': availability}), 200
+
+
+@bp.route('/close_month', methods=['POST'])
+@require_auth(admin=True)
+def close_month():
+    year_month = (request.get_json(silent=True) or {}).get('year_month', '')
+    try:
+        result = month_close.close_month(get_db(), get_backend_name(), year_month, g.user['sub'])
+    except month_close.MonthCloseError as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError:
+        return jsonify({'error': "Expected year_month as 'YYYY-MM'"}), 400
+    record_action('Month Closed', f"{year_month} closed")
+    return jsonify(result), 200
+
+
+@bp.route('/reopen_month', methods=['POST'])
+@require_auth(admin=True)
+def reopen_month():
+    year_month = (request.get_json(silent=True) or {}).get('year_month', '')
+    try:
+        month_close.reopen_month(get_db(), year_month)
+    except month_close.MonthCloseError as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError:
+        return jsonify({'error': "Expected year_month as 'YYYY-MM'"}), 400
+    record_action('Month Reopened', f"{year_month} reopened")
+    return jsonify({'message': f'{year_month} reopened'}), 200
+
+
+@bp.route('/closed_months')
+@require_auth()
+def closed_months():
+    cursor = get_db().cursor()
+    try:
+        return jsonify({'months': month_close.closed_months(cursor)}), 200
+    finally:
+        cursor.close()
+
+
+@bp.route('/month_artefacts/<year_month>')
+@require_auth()
+def month_artefacts(year_month):
+    """Digests of every artefact of a closed month, by resident name ('' for the facility summary)."""
+    try:
+        month_close.month_bounds(year_month)
+    except ValueError:
+        return jsonify({'error': "Expected year_month as 'YYYY-MM'"}), 400
+    cursor = get_db().cursor()
+    try:
+        index = month_close.month_artefact_index(cursor, year_month)
+    finally:
+        cursor.close()
+    if not index:
+        return jsonify({'error': f'{year_month} is not closed'}), 404
+    return jsonify({'month': year_month, 'artefacts': index}), 200
+
+
+@bp.route('/artefacts/<digest>')
+@require_auth()
+def artefact(digest):
+    cursor = get_db().cursor()
+    try:
+        return _blob_response(cursor, digest)
+    finally:
+        cursor.close()
@@ -0,0 +1,143 @@
+"""
+Password hashing and verification off the request threads.
+
+bcrypt is deliberately slow: tens to hundreds of milliseconds of CPU per call.
+Run inline, a shift-change login storm puts every request thread on bcrypt at
+once and unrelated requests (eMAR saves) queue behind it. PasswordHasher runs
+all bcrypt work on a small dedicated thread pool instead (bcrypt releases the
+GIL, so the threads hash in parallel), which caps the CPU spent on passwords at
+BCRYPT_WORKERS cores per API worker. At most BCRYPT_QUEUE_SIZE calls may wait;
+beyond that callers get HasherBusy and the endpoint answers 503 with
+Retry-After, as the audit writer does.
+
+The cost factor is config.BCRYPT_ROUNDS, or with 'auto' the highest cost that
+hashes within BCRYPT_TARGET_MS on this machine. Stored hashes below the current
+cost are upgraded at the next successful login (see `needs_rehash`).
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+import bcrypt
+
+MIN_ROUNDS = 10
+MAX_ROUNDS = 15
+
+
+class HasherBusy(Exception):
+    """Too many password operations are already waiting."""
+
+
+def calibrate_rounds(target_ms, minimum=MIN_ROUNDS, maximum=MAX_ROUNDS):
+    """Highest bcrypt cost whose hash takes at most target_ms here (never below minimum)."""
+    rounds = minimum
+    while rounds < maximum:
+        started = time.perf_counter()
+        bcrypt.hashpw(b'calibration', bcrypt.gensalt(rounds))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        # Each extra round doubles the work
+        if elapsed_ms * 2 > target_ms:
+            break
+        rounds += 1
+    return rounds
+
+
+def hash_rounds(password_hash):
+    """Cost factor of a stored `$2b$12$...` hash, or 0 if it cannot be read."""
+    try:
+        return int(password_hash.split(b'$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+class PasswordHasher:
+    def __init__(self, rounds, workers=2, max_queue=64, timeout=30.0, samples=1000):
+        self.rounds = rounds
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._workers = workers
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._queue_ms = deque(maxlen=samples)
+        self._run_ms = deque(maxlen=samples)
+        self._completed = 0
+        self._rejected = 0
+        # Checked when the username does not exist, so a failed login takes the same time either way
+        self._dummy_hash = bcrypt.hashpw(b'not-a-password', bcrypt.gensalt(rounds))
+
+    def _call(self, func, *args):
+        with self._lock:
+            if self._pending >= self.max_queue + self._workers:
+                self._rejected += 1
+                raise HasherBusy("Too many logins in progress, try again shortly")
+            self._pending += 1
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._pending -= 1
+                    self._completed += 1
+                    self._queue_ms.append((started - submitted) * 1000)
+                    self._run_ms.append((finished - started) * 1000)
+
+        future = self._executor.submit(timed)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HasherBusy("Password check timed out, try again shortly")
+
+    def hash(self, password):
+        """bcrypt hash (str) of password at the current cost."""
+        hashed = self._call(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        return hashed.decode('utf-8')
+
+    def verify(self, password, password_hash):
+        """True if password matches password_hash (str, bytes or None for an unknown user)."""
+        if isinstance(password_hash, str):
+            password_hash = password_hash.encode('utf-8')
+        if not password_hash:
+            self._call(bcrypt.checkpw, password.encode('utf-8'), self._dummy_hash)
+            return False
+        try:
+            return self._call(bcrypt.checkpw, password.encode('utf-8'), password_hash)
+        except ValueError:
+            # Not a bcrypt hash
+            return False
+
+    def needs_rehash(self, password_hash):
+        if isinstance(password_hash, str):
+            password_hash = password_hash.encode('utf-8')
+        return hash_rounds(password_hash) < self.rounds
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def status(self):
+        def pct(samples, p):
+            if not samples:
+                return 0.0
+            ordered = sorted(samples)
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 2)
+
+        with self._lock:
+            queue_ms, run_ms = list(self._queue_ms), list(self._run_ms)
+            pending, completed, rejected = self._pending, self._completed, self._rejected
+        return {
+            'rounds': self.rounds,
+            'workers': self._workers,
+            'pending': pending,
+            'max_queue': self.max_queue,
+            'completed': completed,
+            'rejected': rejected,
+            'queue_ms_p50': pct(queue_ms, 50),
+            'queue_ms_p95': pct(queue_ms, 95),
+            'run_ms_p50': pct(run_ms, 50),
+            'run_ms_p95': pct(run_ms, 95),
+        }
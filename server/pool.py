@@ -0,0 +1,145 @@
+"""
+Bounded, thread-safe pool of DB-API connections for the API server.
+
+The pool hands out at most `size` connections at once; further checkouts wait up
+to `timeout` seconds. Idle connections are health-checked before reuse once they
+have sat longer than `ping_interval`, and are closed and replaced after
+`recycle` seconds so server-side idle timeouts (MySQL wait_timeout) never bite.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+def ping_connection(conn):
+    """Return True if the connection still answers a trivial query."""
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+class ConnectionPool:
+    def __init__(self, connect, size=10, recycle=1800, timeout=10, ping_interval=30, ping=ping_connection):
+        """
+        Args:
+            connect (callable): Returns a new DB-API connection.
+            size (int): Maximum number of connections checked out at once.
+            recycle (int): Seconds after which a connection is replaced.
+            timeout (int): Seconds a checkout waits for a free connection.
+            ping_interval (int): Idle seconds after which a connection is health-checked before reuse.
+            ping (callable): Health check taking a connection and returning a bool.
+        """
+        self._connect = connect
+        self.size = size
+        self._recycle = recycle
+        self._timeout = timeout
+        self._ping_interval = ping_interval
+        self._ping = ping
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()  # Most recently used first keeps the hot connections warm
+        self._created_at = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {'checkouts': 0, 'created': 0, 'recycled': 0, 'failed_health_checks': 0,
+                      'timeouts': 0, 'wait_seconds_total': 0.0}
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def _open(self):
+        conn = self._connect()
+        with self._lock:
+            self._created_at[id(conn)] = time.monotonic()
+            self.stats['created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """Check out a healthy connection, waiting up to the pool timeout for a free slot."""
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self._timeout):
+            self._count('timeouts')
+            raise PoolTimeout(f"No database connection available within {self._timeout}s (pool size {self.size})")
+        self._count('wait_seconds_total', time.monotonic() - started)
+        self._count('checkouts')
+
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._open()
+
+                now = time.monotonic()
+                if now - self._created_at.get(id(conn), now) > self._recycle:
+                    self._discard(conn)
+                    self._count('recycled')
+                    continue
+                if now - last_used > self._ping_interval and not self._ping(conn):
+                    self._discard(conn)
+                    self._count('failed_health_checks')
+                    continue
+                return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, rolling back anything left uncommitted."""
+        try:
+            if not discard:
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+            if discard or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.put((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection. Checked-out connections are closed when released."""
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def status(self):
+        """Snapshot of pool usage for the health endpoint."""
+        with self._lock:
+            stats = dict(self.stats)
+            open_connections = len(self._created_at)
+        stats.update({'size': self.size, 'open': open_connections, 'idle': self._idle.qsize()})
+        return stats
@@ -0,0 +1,29 @@
+from flask import Blueprint, current_app, jsonify
+from server import API_VERSION
+from server.db import get_backend_name, get_db, get_pool
+from server.pool import PoolTimeout
+
+bp = Blueprint('core', __name__)
+
+
+@bp.route('/health')
+def health():
+    """Liveness check plus connection pool, audit queue and password pool metrics; does not touch the database."""
+    return jsonify({'status': 'ok', 'version': API_VERSION, 'backend': get_backend_name(), 'pool': get_pool().status(),
+                    'audit': current_app.extensions['audit_writer'].status(),
+                    'passwords': current_app.extensions['password_hasher'].status()}), 200
+
+
+@bp.route('/test_db')
+def test_db():
+    try:
+        cursor = get_db().cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+        return jsonify({'message': 'Connection successful! 🎉'}), 200
+    except PoolTimeout as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Error: '{e}'")
+        return jsonify({'error': 'Failed to connect to the database'}), 500
@@ -0,0 +1,490 @@
+-- SQLite translation of db_init.sql for the API server's sqlite backend
+-- (config.DB_BACKEND = 'sqlite'). Table and column names match the MySQL
+-- schema so the server runs the same queries against either backend.
+-- Keep in step with db_init.sql and the MySQL indexes in schema_migrations.py.
+
+create table if not exists users (
+    user_id integer primary key autoincrement,
+    username text unique not null,
+    password_hash text not null,
+    user_role text not null,
+    initials text,
+    is_temp_password integer default 1
+);
+
+create table if not exists user_settings (
+    id integer primary key autoincrement,
+    setting_name text unique,
+    setting_value text
+);
+
+create table if not exists documents (
+    document_id integer primary key autoincrement,
+    document_name text not null,
+    expiration_interval integer,
+    is_custom integer default 0,
+    category text default 'Facility' check (category in ('Employee', 'Resident', 'Facility'))
+);
+
+create table if not exists tracked_items (
+    item_id integer primary key autoincrement,
+    document_id integer,
+    document_date date not null,
+    expiration_date date not null,
+    reminder_days_before_expiration integer default 30,
+    document_status text not null check (document_status in ('valid', 'Expiring Soon', 'Expired')),
+    pertains_to text default null,
+    foreign key (document_id) references documents(document_id)
+);
+
+create table if not exists activities (
+    id integer primary key autoincrement,
+    activity_name text not null
+);
+
+create table if not exists meals (
+    id integer primary key autoincrement,
+    meal_type text not null,
+    meal_option text not null,
+    default_drink text default null
+);
+
+create table if not exists residents (
+    id integer primary key autoincrement,
+    name text,
+    date_of_birth date,
+    level_of_care text
+);
+
+create table if not exists adl_chart (
+    chart_id integer primary key autoincrement,
+    resident_id integer,
+    chart_date date,
+    first_shift_sp text,
+    second_shift_sp text,
+    first_shift_activity1 text,
+    first_shift_activity2 text,
+    first_shift_activity3 text,
+    second_shift_activity4 text,
+    first_shift_bm text,
+    second_shift_bm text,
+    shower text,
+    shampoo text,
+    sponge_bath text,
+    peri_care_am text,
+    peri_care_pm text,
+    oral_care_am text,
+    oral_care_pm text,
+    nail_care text,
+    skin_care text,
+    shave text,
+    breakfast integer,
+    lunch integer,
+    dinner integer,
+    snack_am integer,
+    snack_pm integer,
+    water_intake integer,
+    foreign key (resident_id) references residents(id),
+    unique (resident_id, chart_date)
+);
+
+create table if not exists audit_logs (
+    log_id integer primary key autoincrement,
+    username text,
+    activity text,
+    details text,
+    log_time datetime
+);
+
+create table if not exists time_slots (
+    id integer primary key autoincrement,
+    slot_name text unique
+);
+
+insert into time_slots (slot_name) values ('Morning'), ('Noon'), ('Evening'), ('Night')
+on conflict (slot_name) do nothing;
+
+create table if not exists medications (
+    id integer primary key autoincrement,
+    resident_id integer,
+    medication_name text,
+    dosage text,
+    instructions text,
+    medication_type text default 'Scheduled',
+    medication_form text default 'Pill',
+    count integer default null,
+    discontinued_date date default null,
+    foreign key (resident_id) references residents(id)
+);
+
+create table if not exists medication_time_slots (
+    medication_id integer,
+    time_slot_id integer,
+    foreign key (medication_id) references medications(id),
+    foreign key (time_slot_id) references time_slots(id),
+    primary key (medication_id, time_slot_id)
+);
+
+create table if not exists emar_chart (
+    chart_id integer primary key autoincrement,
+    resident_id integer,
+    medication_id integer,
+    chart_date date,
+    time_slot text,
+    administered text,
+    current_count integer default null,
+    notes text,
+    chart_time time default null,
+    foreign key (resident_id) references residents(id),
+    foreign key (medication_id) references medications(id),
+    unique (resident_id, medication_id, chart_date, time_slot)
+);
+
+create table if not exists non_medication_orders (
+    order_id integer primary key autoincrement,
+    resident_id integer,
+    order_name text not null,
+    frequency integer,
+    specific_days text,
+    special_instructions text,
+    discontinued_date date default null,
+    last_administered_date date default null,
+    foreign key (resident_id) references residents(id)
+);
+
+-- Secondary indexes (MySQL migrations 1-6)
+create index if not exists idx_medications_resident_name on medications (resident_id, medication_name, discontinued_date);
+create index if not exists idx_emar_chart_resident_date on emar_chart (resident_id, chart_date);
+create index if not exists idx_residents_name on residents (name);
+create index if not exists idx_audit_logs_log_time on audit_logs (log_time);
+create index if not exists idx_audit_logs_username_time on audit_logs (username, log_time);
+create index if not exists idx_audit_logs_activity_time on audit_logs (activity, log_time);
+create index if not exists idx_non_med_orders_resident_name on non_medication_orders (resident_id, order_name);
+create index if not exists idx_tracked_items_expiration on tracked_items (expiration_date, document_status);
+
+-- Full-text search over audit details (MySQL migration 10; see audit_search.py)
+create virtual table if not exists audit_logs_fts using fts5(details, content='audit_logs', content_rowid='log_id');
+
+create trigger if not exists audit_logs_fts_insert after insert on audit_logs begin
+    insert into audit_logs_fts (rowid, details) values (new.log_id, new.details);
+end;
+
+create trigger if not exists audit_logs_fts_update after update of details on audit_logs begin
+    insert into audit_logs_fts (audit_logs_fts, rowid, details) values ('delete', old.log_id, old.details);
+    insert into audit_logs_fts (rowid, details) values (new.log_id, new.details);
+end;
+
+create trigger if not exists audit_logs_fts_delete after delete on audit_logs begin
+    insert into audit_logs_fts (audit_logs_fts, rowid, details) values ('delete', old.log_id, old.details);
+end;
+
+-- Audit activity counts per day / hour / user / action (MySQL migration 11; see audit_stats.py)
+create table if not exists audit_daily_counts (
+    log_date date not null,
+    log_hour integer not null,
+    username text not null default '',
+    activity text not null default '',
+    action_count integer not null default 0,
+    primary key (log_date, log_hour, username, activity)
+);
+create index if not exists idx_audit_daily_counts_user on audit_daily_counts (username, log_date);
+create index if not exists idx_audit_daily_counts_activity on audit_daily_counts (activity, log_date);
+
+create trigger if not exists audit_logs_counts_insert after insert on audit_logs when new.log_time is not null begin
+    insert into audit_daily_counts (log_date, log_hour, username, activity, action_count)
+    values (date(new.log_time), cast(strftime('%H', new.log_time) as integer), coalesce(new.username, ''), coalesce(new.activity, ''), 1)
+    on conflict (log_date, log_hour, username, activity) do update set action_count = action_count + 1;
+end;
+
+create trigger if not exists audit_logs_counts_delete after delete on audit_logs when old.log_time is not null begin
+    update audit_daily_counts set action_count = max(action_count - 1, 0)
+    where log_date = date(old.log_time) and log_hour = cast(strftime('%H', old.log_time) as integer)
+        and username = coalesce(old.username, '') and activity = coalesce(old.activity, '');
+end;
+
+create trigger if not exists audit_logs_counts_update after update of log_time, username, activity on audit_logs begin
+    update audit_daily_counts set action_count = max(action_count - 1, 0)
+    where old.log_time is not null and log_date = date(old.log_time) and log_hour = cast(strftime('%H', old.log_time) as integer)
+        and username = coalesce(old.username, '') and activity = coalesce(old.activity, '');
+    insert into audit_daily_counts (log_date, log_hour, username, activity, action_count)
+    select date(new.log_time), cast(strftime('%H', new.log_time) as integer), coalesce(new.username, ''), coalesce(new.activity, ''), 1
+    where new.log_time is not null
+    on conflict (log_date, log_hour, username, activity) do update set action_count = action_count + 1;
+end;
+
+-- Month close: frozen months and their content-addressed artefacts (MySQL migration 12; see month_close.py)
+create table if not exists closed_months (
+    month_start date not null primary key,
+    status text not null default 'closing',
+    closed_by text,
+    closed_at datetime
+);
+
+create table if not exists artefact_blobs (
+    digest text not null primary key,
+    content_type text not null,
+    size integer not null,
+    body blob not null
+);
+
+create table if not exists month_artefacts (
+    month_start date not null,
+    resident_id integer not null,
+    kind text not null,
+    digest text not null,
+    primary key (month_start, resident_id, kind)
+);
+create index if not exists idx_month_artefacts_digest on month_artefacts (digest);
+
+create trigger if not exists emar_chart_freeze_insert before insert on emar_chart
+when exists (select 1 from closed_months where month_start = date(new.chart_date, 'start of month')) begin
+    select raise(abort, 'This month is closed; reopen it to make changes');
+end;
+
+create trigger if not exists emar_chart_freeze_update before update on emar_chart
+when exists (select 1 from closed_months where month_start in (date(old.chart_date, 'start of month'), date(new.chart_date, 'start of month'))) begin
+    select raise(abort, 'This month is closed; reopen it to make changes');
+end;
+
+create trigger if not exists emar_chart_freeze_delete before delete on emar_chart
+when exists (select 1 from closed_months where month_start = date(old.chart_date, 'start of month')) begin
+    select raise(abort, 'This month is closed; reopen it to make changes');
+end;
+
+create trigger if not exists adl_chart_freeze_insert before insert on adl_chart
+when exists (select 1 from closed_months where month_start = date(new.chart_date, 'start of month')) begin
+    select raise(abort, 'This month is closed; reopen it to make changes');
+end;
+
+create trigger if not exists adl_chart_freeze_update before update on adl_chart
+when exists (select 1 from closed_months where month_start in (date(old.chart_date, 'start of month'), date(new.chart_date, 'start of month'))) begin
+    select raise(abort, 'This month is closed; reopen it to make changes');
+end;
+
+create trigger if not exists adl_chart_freeze_delete before delete on adl_chart
+when exists (select 1 from closed_months where month_start = date(old.chart_date, 'start of month')) begin
+    select raise(abort, 'This month is closed; reopen it to make changes');
+end;
+
+-- Months with eMAR / ADL / non-med data per resident (MySQL migration 13; see month_availability.py)
+create table if not exists month_availability (
+    resident_id integer not null,
+    month_start date not null,
+    kinds integer not null default 0,
+    primary key (resident_id, month_start)
+);
+
+create trigger if not exists emar_chart_availability_insert after insert on emar_chart begin
+    insert into month_availability (resident_id, month_start, kinds) values (new.resident_id, date(new.chart_date, 'start of month'), 1)
+    on conflict (resident_id, month_start) do update set kinds = kinds | 1;
+end;
+
+create trigger if not exists emar_chart_availability_update after update of resident_id, chart_date on emar_chart begin
+    update month_availability set kinds = kinds & ~1
+    where resident_id = old.resident_id and month_start = date(old.chart_date, 'start of month')
+        and not exists (select 1 from emar_chart c where c.resident_id = old.resident_id
+                        and c.chart_date >= date(old.chart_date, 'start of month') and c.chart_date < date(old.chart_date, 'start of month', '+1 month'));
+    insert into month_availability (resident_id, month_start, kinds) values (new.resident_id, date(new.chart_date, 'start of month'), 1)
+    on conflict (resident_id, month_start) do update set kinds = kinds | 1;
+end;
+
+create trigger if not exists emar_chart_availability_delete after delete on emar_chart begin
+    update month_availability set kinds = kinds & ~1
+    where resident_id = old.resident_id and month_start = date(old.chart_date, 'start of month')
+        and not exists (select 1 from emar_chart c where c.resident_id = old.resident_id
+                        and c.chart_date >= date(old.chart_date, 'start of month') and c.chart_date < date(old.chart_date, 'start of month', '+1 month'));
+end;
+
+create trigger if not exists adl_chart_availability_insert after insert on adl_chart begin
+    insert into month_availability (resident_id, month_start, kinds) values (new.resident_id, date(new.chart_date, 'start of month'), 2)
+    on conflict (resident_id, month_start) do update set kinds = kinds | 2;
+end;
+
+create trigger if not exists adl_chart_availability_update after update of resident_id, chart_date on adl_chart begin
+    update month_availability set kinds = kinds & ~2
+    where resident_id = old.resident_id and month_start = date(old.chart_date, 'start of month')
+        and not exists (select 1 from adl_chart c where c.resident_id = old.resident_id
+                        and c.chart_date >= date(old.chart_date, 'start of month') and c.chart_date < date(old.chart_date, 'start of month', '+1 month'));
+    insert into month_availability (resident_id, month_start, kinds) values (new.resident_id, date(new.chart_date, 'start of month'), 2)
+    on conflict (resident_id, month_start) do update set kinds = kinds | 2;
+end;
+
+create trigger if not exists adl_chart_availability_delete after delete on adl_chart begin
+    update month_availability set kinds = kinds & ~2
+    where resident_id = old.resident_id and month_start = date(old.chart_date, 'start of month')
+        and not exists (select 1 from adl_chart c where c.resident_id = old.resident_id
+                        and c.chart_date >= date(old.chart_date, 'start of month') and c.chart_date < date(old.chart_date, 'start of month', '+1 month'));
+end;
+
+create trigger if not exists non_medication_orders_availability_insert after insert on non_medication_orders
+when new.resident_id is not null and new.last_administered_date is not null begin
+    insert into month_availability (resident_id, month_start, kinds) values (new.resident_id, date(new.last_administered_date, 'start of month'), 4)
+    on conflict (resident_id, month_start) do update set kinds = kinds | 4;
+end;
+
+create trigger if not exists non_medication_orders_availability_update after update of resident_id, last_administered_date on non_medication_orders
+when new.resident_id is not null and new.last_administered_date is not null begin
+    insert into month_availability (resident_id, month_start, kinds) values (new.resident_id, date(new.last_administered_date, 'start of month'), 4)
+    on conflict (resident_id, month_start) do update set kinds = kinds | 4;
+end;
+
+-- Pre-pivoted monthly chart rollups (MySQL migration 9; see rollups.py)
+create table if not exists emar_month_rollup (
+    resident_id integer not null,
+    medication_id integer not null,
+    month_start date not null,
+    time_slot text not null default '',
+    administered_days integer not null default 0,
+    cells text not null default '[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null]',
+    primary key (resident_id, month_start, medication_id, time_slot)
+);
+
+create table if not exists adl_month_rollup (
+    resident_id integer not null,
+    month_start date not null,
+    matrix text not null default '{"first_shift_sp":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"second_shift_sp":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"first_shift_activity1":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"first_shift_activity2":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"first_shift_activity3":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"second_shift_activity4":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"first_shift_bm":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"second_shift_bm":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"shower":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"shampoo":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"sponge_bath":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"peri_care_am":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"peri_care_pm":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"oral_care_am":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"oral_care_pm":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"nail_care":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"skin_care":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"shave":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"breakfast":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"lunch":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"dinner":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"snack_am":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"snack_pm":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null],"water_intake":[null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null,null]}',
+    primary key (resident_id, month_start)
+);
+
+create trigger if not exists emar_chart_rollup_insert after insert on emar_chart begin
+    insert into emar_month_rollup (resident_id, medication_id, month_start, time_slot)
+    values (new.resident_id, new.medication_id, date(new.chart_date, 'start of month'), coalesce(new.time_slot, ''))
+    on conflict (resident_id, month_start, medication_id, time_slot) do nothing;
+    update emar_month_rollup set
+        administered_days = case
+            when exists (select 1 from emar_chart e where e.resident_id = new.resident_id and e.medication_id = new.medication_id and e.chart_date = new.chart_date and coalesce(e.time_slot, '') = coalesce(new.time_slot, '') and coalesce(e.administered, '') <> '')
+            then administered_days | (1 << (cast(strftime('%d', new.chart_date) as integer) - 1)) else administered_days & ~(1 << (cast(strftime('%d', new.chart_date) as integer) - 1)) end,
+        cells = json_set(cells, '$[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']',
+            (select e.administered from emar_chart e where e.resident_id = new.resident_id and e.medication_id = new.medication_id and e.chart_date = new.chart_date and coalesce(e.time_slot, '') = coalesce(new.time_slot, '') order by e.chart_id desc limit 1))
+    where resident_id = new.resident_id and medication_id = new.medication_id
+        and month_start = date(new.chart_date, 'start of month') and time_slot = coalesce(new.time_slot, '');
+end;
+
+-- An update that moves the row to another cell also rebuilds the cell it left
+create trigger if not exists emar_chart_rollup_update after update on emar_chart begin
+    insert into emar_month_rollup (resident_id, medication_id, month_start, time_slot)
+    values (new.resident_id, new.medication_id, date(new.chart_date, 'start of month'), coalesce(new.time_slot, ''))
+    on conflict (resident_id, month_start, medication_id, time_slot) do nothing;
+    update emar_month_rollup set
+        administered_days = case
+            when exists (select 1 from emar_chart e where e.resident_id = new.resident_id and e.medication_id = new.medication_id and e.chart_date = new.chart_date and coalesce(e.time_slot, '') = coalesce(new.time_slot, '') and coalesce(e.administered, '') <> '')
+            then administered_days | (1 << (cast(strftime('%d', new.chart_date) as integer) - 1)) else administered_days & ~(1 << (cast(strftime('%d', new.chart_date) as integer) - 1)) end,
+        cells = json_set(cells, '$[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']',
+            (select e.administered from emar_chart e where e.resident_id = new.resident_id and e.medication_id = new.medication_id and e.chart_date = new.chart_date and coalesce(e.time_slot, '') = coalesce(new.time_slot, '') order by e.chart_id desc limit 1))
+    where resident_id = new.resident_id and medication_id = new.medication_id
+        and month_start = date(new.chart_date, 'start of month') and time_slot = coalesce(new.time_slot, '');
+    update emar_month_rollup set
+        administered_days = case
+            when exists (select 1 from emar_chart e where e.resident_id = old.resident_id and e.medication_id = old.medication_id and e.chart_date = old.chart_date and coalesce(e.time_slot, '') = coalesce(old.time_slot, '') and coalesce(e.administered, '') <> '')
+            then administered_days | (1 << (cast(strftime('%d', old.chart_date) as integer) - 1)) else administered_days & ~(1 << (cast(strftime('%d', old.chart_date) as integer) - 1)) end,
+        cells = json_set(cells, '$[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']',
+            (select e.administered from emar_chart e where e.resident_id = old.resident_id and e.medication_id = old.medication_id and e.chart_date = old.chart_date and coalesce(e.time_slot, '') = coalesce(old.time_slot, '') order by e.chart_id desc limit 1))
+    where resident_id = old.resident_id and medication_id = old.medication_id
+        and month_start = date(old.chart_date, 'start of month') and time_slot = coalesce(old.time_slot, '')
+        and not (old.resident_id is new.resident_id and old.medication_id is new.medication_id
+            and old.chart_date is new.chart_date and coalesce(old.time_slot, '') = coalesce(new.time_slot, ''));
+end;
+
+create trigger if not exists emar_chart_rollup_delete after delete on emar_chart begin
+    update emar_month_rollup set
+        administered_days = case
+            when exists (select 1 from emar_chart e where e.resident_id = old.resident_id and e.medication_id = old.medication_id and e.chart_date = old.chart_date and coalesce(e.time_slot, '') = coalesce(old.time_slot, '') and coalesce(e.administered, '') <> '')
+            then administered_days | (1 << (cast(strftime('%d', old.chart_date) as integer) - 1)) else administered_days & ~(1 << (cast(strftime('%d', old.chart_date) as integer) - 1)) end,
+        cells = json_set(cells, '$[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']',
+            (select e.administered from emar_chart e where e.resident_id = old.resident_id and e.medication_id = old.medication_id and e.chart_date = old.chart_date and coalesce(e.time_slot, '') = coalesce(old.time_slot, '') order by e.chart_id desc limit 1))
+    where resident_id = old.resident_id and medication_id = old.medication_id
+        and month_start = date(old.chart_date, 'start of month') and time_slot = coalesce(old.time_slot, '');
+end;
+
+create trigger if not exists adl_chart_rollup_insert after insert on adl_chart begin
+    insert into adl_month_rollup (resident_id, month_start) values (new.resident_id, date(new.chart_date, 'start of month'))
+    on conflict (resident_id, month_start) do nothing;
+    update adl_month_rollup set matrix = json_set(matrix,
+            '$.first_shift_sp[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.first_shift_sp,
+            '$.second_shift_sp[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.second_shift_sp,
+            '$.first_shift_activity1[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.first_shift_activity1,
+            '$.first_shift_activity2[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.first_shift_activity2,
+            '$.first_shift_activity3[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.first_shift_activity3,
+            '$.second_shift_activity4[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.second_shift_activity4,
+            '$.first_shift_bm[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.first_shift_bm,
+            '$.second_shift_bm[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.second_shift_bm,
+            '$.shower[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.shower,
+            '$.shampoo[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.shampoo,
+            '$.sponge_bath[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.sponge_bath,
+            '$.peri_care_am[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.peri_care_am,
+            '$.peri_care_pm[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.peri_care_pm,
+            '$.oral_care_am[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.oral_care_am,
+            '$.oral_care_pm[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.oral_care_pm,
+            '$.nail_care[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.nail_care,
+            '$.skin_care[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.skin_care,
+            '$.shave[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.shave,
+            '$.breakfast[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.breakfast,
+            '$.lunch[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.lunch,
+            '$.dinner[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.dinner,
+            '$.snack_am[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.snack_am,
+            '$.snack_pm[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.snack_pm,
+            '$.water_intake[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.water_intake)
+    where resident_id = new.resident_id and month_start = date(new.chart_date, 'start of month');
+end;
+
+create trigger if not exists adl_chart_rollup_update after update on adl_chart begin
+    insert into adl_month_rollup (resident_id, month_start) values (new.resident_id, date(new.chart_date, 'start of month'))
+    on conflict (resident_id, month_start) do nothing;
+    update adl_month_rollup set matrix = json_set(matrix,
+            '$.first_shift_sp[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.first_shift_sp,
+            '$.second_shift_sp[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.second_shift_sp,
+            '$.first_shift_activity1[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.first_shift_activity1,
+            '$.first_shift_activity2[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.first_shift_activity2,
+            '$.first_shift_activity3[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.first_shift_activity3,
+            '$.second_shift_activity4[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.second_shift_activity4,
+            '$.first_shift_bm[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.first_shift_bm,
+            '$.second_shift_bm[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.second_shift_bm,
+            '$.shower[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.shower,
+            '$.shampoo[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.shampoo,
+            '$.sponge_bath[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.sponge_bath,
+            '$.peri_care_am[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.peri_care_am,
+            '$.peri_care_pm[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.peri_care_pm,
+            '$.oral_care_am[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.oral_care_am,
+            '$.oral_care_pm[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.oral_care_pm,
+            '$.nail_care[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.nail_care,
+            '$.skin_care[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.skin_care,
+            '$.shave[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.shave,
+            '$.breakfast[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.breakfast,
+            '$.lunch[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.lunch,
+            '$.dinner[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.dinner,
+            '$.snack_am[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.snack_am,
+            '$.snack_pm[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.snack_pm,
+            '$.water_intake[' || (cast(strftime('%d', new.chart_date) as integer) - 1) || ']', new.water_intake)
+    where resident_id = new.resident_id and month_start = date(new.chart_date, 'start of month');
+end;
+
+create trigger if not exists adl_chart_rollup_delete after delete on adl_chart begin
+    insert into adl_month_rollup (resident_id, month_start) values (old.resident_id, date(old.chart_date, 'start of month'))
+    on conflict (resident_id, month_start) do nothing;
+    update adl_month_rollup set matrix = json_set(matrix,
+            '$.first_shift_sp[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.second_shift_sp[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.first_shift_activity1[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.first_shift_activity2[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.first_shift_activity3[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.second_shift_activity4[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.first_shift_bm[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.second_shift_bm[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.shower[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.shampoo[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.sponge_bath[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.peri_care_am[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.peri_care_pm[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.oral_care_am[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.oral_care_pm[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.nail_care[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.skin_care[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.shave[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.breakfast[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.lunch[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.dinner[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.snack_am[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.snack_pm[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null,
+            '$.water_intake[' || (cast(strftime('%d', old.chart_date) as integer) - 1) || ']', null)
+    where resident_id = old.resident_id and month_start = date(old.chart_date, 'start of month');
+end;
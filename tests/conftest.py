@@ -0,0 +1,33 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.backends import SQLiteBackend
+
+
+@pytest.fixture
+def server_db(tmp_path):
+    """A connection to a fresh sqlite server database."""
+    backend = SQLiteBackend(str(tmp_path / 'server.db'))
+    backend.init_schema()
+    conn = backend.connect()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def resident(server_db):
+    """(resident_id, {medication_name: medication_id}) for a resident with one scheduled and one PRN medication."""
+    cursor = server_db.cursor()
+    cursor.execute("INSERT INTO residents (name, date_of_birth) VALUES ('Jane Doe', '1940-02-01')")
+    resident_id = cursor.lastrowid
+    medications = {}
+    for name, medication_type in (('Aspirin', 'Scheduled'), ('Tylenol', 'PRN')):
+        cursor.execute("INSERT INTO medications (resident_id, medication_name, medication_type) VALUES (%s, %s, %s)",
+                       (resident_id, name, medication_type))
+        medications[name] = cursor.lastrowid
+    server_db.commit()
+    cursor.close()
+    return resident_id, medications
@@ -0,0 +1,48 @@
+import audit_search
+
+
+def _log(conn, rows):
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO audit_logs (username, activity, details, log_time) VALUES (%s, %s, %s, %s)", rows)
+    conn.commit()
+    cursor.close()
+
+
+def test_terms_split_words_and_phrases():
+    assert audit_search._terms('amox "Jane  Doe" eMAR-chart') == [
+        ('word', 'amox'), ('phrase', 'Jane Doe'), ('word', 'eMAR'), ('word', 'chart')]
+
+
+def test_terms_drop_query_syntax():
+    assert audit_search._terms('+aspirin* -x "" (NEAR) "*"') == [
+        ('word', 'aspirin'), ('word', 'x'), ('word', 'NEAR')]
+    assert audit_search._terms('   ') == []
+
+
+def test_fts5_query():
+    assert audit_search.fts5_query('amox "Jane Doe"') == '"amox"* "Jane Doe"'
+    assert audit_search.fts5_query('OR AND') == '"OR"* "AND"*'
+    assert audit_search.fts5_query('***') == ''
+
+
+def test_mysql_boolean_query():
+    assert audit_search.mysql_boolean_query('amox "Jane Doe"') == '+amox* +"Jane Doe"'
+
+
+def test_search_on_sqlite(server_db):
+    _log(server_db, [
+        ('nurse', 'Medication Added', 'Amoxicillin added for Jane Doe', '2024-03-01 08:00:00'),
+        ('nurse', 'Medication Added', 'Aspirin added for John Doe', '2024-03-02 08:00:00'),
+        ('admin', 'eMAR Chart Saved', 'Jane Doe 2024-03: 4 entries saved', '2024-03-03 08:00:00'),
+    ])
+    cursor = server_db.cursor()
+    rows, has_more = audit_search.search_audit_logs(cursor, 'sqlite', 'amox')
+    assert [row[3] for row in rows] == ['Amoxicillin added for Jane Doe'] and not has_more
+
+    rows, _ = audit_search.search_audit_logs(cursor, 'sqlite', '"Jane Doe"', username='admin')
+    assert [row[1] for row in rows] == ['admin']
+
+    rows, has_more = audit_search.search_audit_logs(cursor, 'sqlite', 'doe', per_page=2)
+    assert len(rows) == 2 and has_more
+    assert audit_search.search_audit_logs(cursor, 'sqlite', '"" ()') == ([], False)
+    cursor.close()
@@ -0,0 +1,47 @@
+import pytest
+import audit_stats
+
+
+@pytest.fixture
+def audit_log(server_db):
+    cursor = server_db.cursor()
+    cursor.executemany("INSERT INTO audit_logs (username, activity, details, log_time) VALUES (%s, %s, '', %s)", [
+        ('nurse', 'Login', '2024-03-01 05:59:00'),
+        ('nurse', 'Login', '2024-03-01 06:00:00'),
+        ('nurse', 'Login', '2024-03-01 12:00:00'),
+        ('nurse', 'Logout', '2024-03-01 21:59:00'),
+        ('admin', 'Login', '2024-03-01 22:00:00'),
+        ('admin', 'Login', '2024-03-02 00:30:00'),
+        ('admin', 'Login', '2024-03-08 00:30:00'),
+    ])
+    server_db.commit()
+    yield cursor
+    cursor.close()
+
+
+def _total(counts):
+    return sum(entry['count'] for entry in counts)
+
+
+def test_window_within_a_day(audit_log):
+    counts = audit_stats.fetch_audit_counts(audit_log, '2024-03-01', '2024-03-08', group_by=(),
+                                            start_hour=6, end_hour=22)
+    assert _total(counts) == 3
+
+
+def test_window_wrapping_past_midnight(audit_log):
+    counts = audit_stats.fetch_audit_counts(audit_log, '2024-03-01', '2024-03-08', group_by=['username'],
+                                            start_hour=22, end_hour=6)
+    assert counts == [{'username': 'admin', 'count': 2}, {'username': 'nurse', 'count': 1}]
+
+
+def test_group_by_day_hour_and_filters(audit_log):
+    counts = audit_stats.fetch_audit_counts(audit_log, '2024-03-01', '2024-03-02', group_by=['day', 'hour'],
+                                            username='nurse', action='Login')
+    assert sorted((entry['day'], entry['hour'], entry['count']) for entry in counts) == [
+        ('2024-03-01', 5, 1), ('2024-03-01', 6, 1), ('2024-03-01', 12, 1)]
+
+
+def test_unknown_group_rejected(audit_log):
+    with pytest.raises(ValueError):
+        audit_stats.fetch_audit_counts(audit_log, '2024-03-01', '2024-03-02', group_by=['details'])
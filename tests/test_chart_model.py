@@ -0,0 +1,47 @@
+from adl_fields import ADL_KEYS
+from chart_model import ADMINISTERED, NUM_DAYS, ChartModel, adl_model, emar_model
+
+
+def test_update_skips_unknown_rows_and_days():
+    model = ChartModel(['a', 'b'])
+    model.update([('a', 1, 'x'), ('b', NUM_DAYS, 3), ('c', 2, 'y'), ('a', 0, 'z'), ('a', NUM_DAYS + 1, 'z'),
+                  ('b', 5, None)])
+    assert model.get('a', 1) == 'x'
+    assert model.get('b', NUM_DAYS) == '3'
+    assert model.get('b', 5) == ''
+    assert model.offset('b') == NUM_DAYS
+    assert model.offset('c') is None
+    assert model.cells.count('') == 2 * NUM_DAYS - 2
+
+
+def test_emar_model_fills_slots_and_summary_rows():
+    rows = [('Aspirin', 'Morning'), ('Aspirin', 'Night'), ('Tylenol', None)]
+    model = emar_model(rows, [
+        {'medication_name': 'Aspirin', 'chart_date': '2024-03-01', 'time_slot': 'Morning', 'administered': 'JD'},
+        {'medication_name': 'Aspirin', 'chart_date': '2024-03-31', 'time_slot': 'Night', 'administered': None},
+        {'medication_name': 'Tylenol', 'chart_date': '2024-03-15 08:30', 'time_slot': None, 'administered': 'JD'},
+        {'medication_name': 'Tylenol', 'chart_date': '2024-03-16 09:00', 'time_slot': None, 'administered': ''},
+        {'medication_name': 'Unknown', 'chart_date': '2024-03-02', 'time_slot': 'Morning', 'administered': 'JD'},
+    ])
+    assert model.get(('Aspirin', 'Morning'), 1) == 'JD'
+    assert model.get(('Aspirin', 'Night'), 31) == ''
+    assert model.get(('Tylenol', None), 15) == ADMINISTERED
+    assert model.get(('Tylenol', None), 16) == ''
+    assert sum(1 for cell in model.cells if cell) == 2
+
+
+def test_emar_model_without_data():
+    model = emar_model([('Aspirin', 'Morning')], None)
+    assert model.cells == [''] * NUM_DAYS
+
+
+def test_adl_model_reads_day_from_http_date():
+    model = adl_model(ADL_KEYS, [
+        {'chart_date': 'Fri, 01 Mar 2024 00:00:00 GMT', 'shower': 'X', 'breakfast': 75, 'lunch': None},
+        {'chart_date': 'Sun, 31 Mar 2024 00:00:00 GMT', 'water_intake': 0},
+    ])
+    assert model.get('shower', 1) == 'X'
+    assert model.get('breakfast', 1) == '75'
+    assert model.get('lunch', 1) == ''
+    assert model.get('water_intake', 31) == '0'
+    assert sum(1 for cell in model.cells if cell) == 3
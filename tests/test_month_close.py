@@ -0,0 +1,71 @@
+import json
+import sqlite3
+import pytest
+import month_close
+import rollups
+
+YEAR_MONTH = '2024-03'
+
+
+@pytest.fixture
+def charted(server_db, resident):
+    resident_id, medications = resident
+    cursor = server_db.cursor()
+    cursor.execute('''
+        INSERT INTO emar_chart (resident_id, medication_id, chart_date, time_slot, administered)
+        VALUES (%s, %s, '2024-03-01', 'Morning', 'JD')
+    ''', (resident_id, medications['Aspirin']))
+    cursor.execute("INSERT INTO adl_chart (resident_id, chart_date, shower) VALUES (%s, '2024-03-02', 'X')",
+                   (resident_id,))
+    server_db.commit()
+    yield cursor
+    cursor.close()
+
+
+def test_close_month_stores_artefacts_and_freezes(server_db, resident, charted):
+    resident_id, medications = resident
+    result = month_close.close_month(server_db, 'sqlite', YEAR_MONTH, 'admin')
+    assert result['month'] == YEAR_MONTH and result['residents'] == 1
+
+    assert month_close.is_month_closed(charted, YEAR_MONTH)
+    assert [month['month'] for month in month_close.closed_months(charted)] == [YEAR_MONTH]
+
+    artefacts = month_close.resident_month_artefacts(charted, 'Jane Doe', YEAR_MONTH)
+    assert {'summary', 'emar', 'adl'} <= set(artefacts)
+    content_type, body = month_close.fetch_blob(charted, artefacts['emar'])
+    assert content_type == 'application/json'
+    assert json.loads(body) == rollups.emar_month_payload(charted, resident_id, YEAR_MONTH)
+    assert set(month_close.month_artefact_index(charted, YEAR_MONTH)) == {'Jane Doe', ''}
+
+    with pytest.raises(sqlite3.DatabaseError, match='closed'):
+        charted.execute('''
+            INSERT INTO emar_chart (resident_id, medication_id, chart_date, time_slot, administered)
+            VALUES (%s, %s, '2024-03-02', 'Morning', 'JD')
+        ''', (resident_id, medications['Aspirin']))
+    server_db.rollback()
+    with pytest.raises(sqlite3.DatabaseError, match='closed'):
+        charted.execute("UPDATE adl_chart SET shower = '' WHERE chart_date = '2024-03-02'")
+    server_db.rollback()
+
+    with pytest.raises(month_close.MonthCloseError):
+        month_close.close_month(server_db, 'sqlite', YEAR_MONTH, 'admin')
+
+
+def test_reopen_month_lifts_freeze_and_drops_artefacts(server_db, charted):
+    month_close.close_month(server_db, 'sqlite', YEAR_MONTH, 'admin')
+    month_close.reopen_month(server_db, YEAR_MONTH)
+
+    assert not month_close.is_month_closed(charted, YEAR_MONTH)
+    assert month_close.resident_month_artefacts(charted, 'Jane Doe', YEAR_MONTH) is None
+    charted.execute("SELECT COUNT(*) FROM artefact_blobs")
+    assert charted.fetchone()[0] == 0
+    charted.execute("UPDATE adl_chart SET shower = '' WHERE chart_date = '2024-03-02'")
+    server_db.commit()
+
+    with pytest.raises(month_close.MonthCloseError):
+        month_close.reopen_month(server_db, YEAR_MONTH)
+
+
+def test_cannot_close_unfinished_month(server_db):
+    with pytest.raises(month_close.MonthCloseError):
+        month_close.close_month(server_db, 'sqlite', '2999-01', 'admin')
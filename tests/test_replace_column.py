@@ -0,0 +1,60 @@
+"""
+emar_management.replace_column against a real PySimpleGUI window.
+
+replace_column reaches into PySimpleGUI 4.60 internals (ParentRowFrame,
+AllKeysDict, Rows), so run this after any PySimpleGUI upgrade. It needs Tk and
+a display and is skipped without them (on a headless Linux box run it under
+xvfb-run python -m pytest tests/test_replace_column.py).
+
+Manual check of the same path: log in, open the eMAR tab, switch to another
+resident and then to a third. Each switch should show only that resident's
+medications, with no leftover sections below them. Chart a medication for the
+third resident and save: the value must be saved for that resident.
+"""
+import os
+import sys
+import pytest
+
+sg = pytest.importorskip('PySimpleGUI')
+emar_management = pytest.importorskip('emar_management')
+
+if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+    pytest.skip('Tk needs a display', allow_module_level=True)
+
+
+def _sections(*keys):
+    return [[sg.Input(key=key)] for key in keys]
+
+
+@pytest.fixture
+def window():
+    layout = [[sg.Column([[sg.Column(_sections('-A-'), key='-SECTIONS-')]], key='-BODY-')]]
+    try:
+        window = sg.Window('replace_column', layout, finalize=True)
+    except Exception as e:  # tkinter.TclError when the display cannot be opened
+        pytest.skip(f'Tk unavailable: {e}')
+    yield window
+    window.close()
+
+
+def test_two_successive_replacements_keep_keys_unique(window):
+    first_input = window['-A-']
+    emar_management.replace_column(window, '-BODY-', '-SECTIONS-', _sections('-A-', '-B-'))
+    emar_management.replace_column(window, '-BODY-', '-SECTIONS-', _sections('-A-', '-C-'))
+
+    keys = set(window.AllKeysDict)
+    assert {'-A-', '-C-', '-SECTIONS-'} <= keys
+    assert '-B-' not in keys
+    # A clash would have renamed the new elements ('-A-0', '-A-1', ...)
+    assert not [key for key in keys if isinstance(key, str) and key.startswith('-A-') and key != '-A-']
+    assert window['-A-'] is not first_input
+
+    # Only the current Column is left in the body's layout
+    body_rows = [child for row in window['-BODY-'].Rows for child in row]
+    assert len(body_rows) == 1
+
+    window['-A-'].update('JD')
+    window['-C-'].update('AB')
+    _, values = window.read(timeout=0)
+    assert values['-A-'] == 'JD' and values['-C-'] == 'AB'
+    assert '-B-' not in values
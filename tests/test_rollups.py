@@ -0,0 +1,138 @@
+import json
+from datetime import date
+from werkzeug.http import http_date
+import rollups
+from adl_fields import ADL_KEYS
+from chart_model import adl_model, emar_model
+
+YEAR_MONTH = '2024-03'
+
+
+def _chart_emar(conn, resident_id, medication_id, chart_date, time_slot, administered):
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO emar_chart (resident_id, medication_id, chart_date, time_slot, administered)
+        VALUES (%s, %s, %s, %s, %s)
+    ''', (resident_id, medication_id, chart_date, time_slot, administered))
+    conn.commit()
+    cursor.close()
+
+
+def _legacy_emar(conn, resident_id):
+    """What /fetch_emar_data_for_month returned before the rollups: one entry per emar_chart row."""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT m.medication_name, e.chart_date, e.time_slot, e.administered
+        FROM emar_chart e JOIN medications m ON e.medication_id = m.id
+        WHERE e.resident_id = %s AND e.chart_date >= '2024-03-01' AND e.chart_date < '2024-04-01'
+    ''', (resident_id,))
+    rows = cursor.fetchall()
+    cursor.close()
+    return [{'medication_name': name, 'chart_date': chart_date, 'time_slot': time_slot, 'administered': administered}
+            for name, chart_date, time_slot, administered in rows]
+
+
+def _legacy_adl(conn, resident_id):
+    """What /fetch_adl_chart_data_for_month returned: jsonified adl_chart rows, dates as HTTP dates."""
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT chart_date, {', '.join(ADL_KEYS)} FROM adl_chart
+        WHERE resident_id = %s AND chart_date >= '2024-03-01' AND chart_date < '2024-04-01' ORDER BY chart_date
+    ''', (resident_id,))
+    rows = cursor.fetchall()
+    cursor.close()
+    return [dict(zip(ADL_KEYS, values), chart_date=http_date(date.fromisoformat(chart_date)))
+            for chart_date, *values in rows]
+
+
+def _rollup_tables(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM emar_month_rollup ORDER BY resident_id, month_start, medication_id, time_slot")
+    emar = cursor.fetchall()
+    cursor.execute("SELECT * FROM adl_month_rollup ORDER BY resident_id, month_start")
+    adl = cursor.fetchall()
+    cursor.close()
+    # JSON columns compared parsed: the triggers and json.dumps space them differently
+    return [(*row[:-1], json.loads(row[-1])) for row in emar], [(*row[:-1], json.loads(row[-1])) for row in adl]
+
+
+def test_emar_payload_matches_legacy_format(server_db, resident):
+    resident_id, medications = resident
+    aspirin, tylenol = medications['Aspirin'], medications['Tylenol']
+    _chart_emar(server_db, resident_id, aspirin, '2024-03-01', 'Morning', 'JD')
+    _chart_emar(server_db, resident_id, aspirin, '2024-03-31', 'Night', 'AB')
+    _chart_emar(server_db, resident_id, aspirin, '2024-03-02', 'Morning', '')
+    _chart_emar(server_db, resident_id, aspirin, '2024-04-01', 'Morning', 'JD')
+    # PRN: several rows a day, no time slot
+    _chart_emar(server_db, resident_id, tylenol, '2024-03-15', None, 'JD')
+    _chart_emar(server_db, resident_id, tylenol, '2024-03-15', None, 'AB')
+    _chart_emar(server_db, resident_id, tylenol, '2024-03-20', None, '')
+
+    cursor = server_db.cursor()
+    payload = rollups.emar_month_payload(cursor, resident_id, YEAR_MONTH)
+    cursor.close()
+    legacy = _legacy_emar(server_db, resident_id)
+
+    assert all(set(entry) == {'medication_name', 'chart_date', 'time_slot', 'administered'} for entry in payload)
+    scheduled = sorted((entry for entry in legacy if entry['time_slot']), key=lambda entry: entry['chart_date'])
+    assert [entry for entry in payload if entry['time_slot']] == scheduled
+    # PRN: one entry per administered day, with that day's latest initials
+    assert [entry for entry in payload if not entry['time_slot']] == [
+        {'medication_name': 'Tylenol', 'chart_date': '2024-03-15', 'time_slot': None, 'administered': 'AB'}]
+
+    rows = [('Aspirin', 'Morning'), ('Aspirin', 'Night'), ('Tylenol', None)]
+    assert emar_model(rows, payload).cells == emar_model(rows, legacy).cells
+
+
+def test_adl_payload_matches_legacy_format(server_db, resident):
+    resident_id, _ = resident
+    cursor = server_db.cursor()
+    for chart_date, shower, breakfast in (('2024-03-01', 'X', 75), ('2024-03-29', None, 0), ('2024-04-01', 'X', 50)):
+        cursor.execute("INSERT INTO adl_chart (resident_id, chart_date, shower, breakfast) VALUES (%s, %s, %s, %s)",
+                       (resident_id, chart_date, shower, breakfast))
+    server_db.commit()
+
+    payload = rollups.adl_month_payload(cursor, resident_id, YEAR_MONTH)
+    cursor.close()
+    assert payload == _legacy_adl(server_db, resident_id)
+    assert payload[0]['chart_date'] == 'Fri, 01 Mar 2024 00:00:00 GMT'
+    assert adl_model(ADL_KEYS, payload).get('breakfast', 29) == '0'
+
+
+def test_empty_month_payloads(server_db, resident):
+    resident_id, _ = resident
+    cursor = server_db.cursor()
+    assert rollups.emar_month_payload(cursor, resident_id, YEAR_MONTH) == []
+    assert rollups.adl_month_payload(cursor, resident_id, YEAR_MONTH) == []
+    cursor.close()
+
+
+def test_update_moving_a_row_rebuilds_both_cells(server_db, resident):
+    resident_id, medications = resident
+    _chart_emar(server_db, resident_id, medications['Aspirin'], '2024-03-05', 'Morning', 'JD')
+    cursor = server_db.cursor()
+    cursor.execute("UPDATE emar_chart SET chart_date = '2024-04-07', time_slot = 'Night'")
+    server_db.commit()
+
+    assert rollups.emar_month_payload(cursor, resident_id, YEAR_MONTH) == []
+    assert rollups.emar_month_payload(cursor, resident_id, '2024-04') == [
+        {'medication_name': 'Aspirin', 'chart_date': '2024-04-07', 'time_slot': 'Night', 'administered': 'JD'}]
+    cursor.close()
+
+
+def test_backfill_matches_trigger_maintained_rollups(server_db, resident):
+    resident_id, medications = resident
+    _chart_emar(server_db, resident_id, medications['Aspirin'], '2024-03-01', 'Morning', 'JD')
+    _chart_emar(server_db, resident_id, medications['Tylenol'], '2024-03-15', None, 'JD')
+    _chart_emar(server_db, resident_id, medications['Tylenol'], '2024-03-15', None, '')
+    cursor = server_db.cursor()
+    cursor.execute("INSERT INTO adl_chart (resident_id, chart_date, shower) VALUES (%s, '2024-03-02', 'X')",
+                   (resident_id,))
+    cursor.execute("DELETE FROM emar_chart WHERE time_slot IS NULL AND administered = ''")
+    server_db.commit()
+    maintained = _rollup_tables(server_db)
+
+    rollups.backfill_rollups(server_db, cursor, emar_table='emar_chart')
+    server_db.commit()
+    cursor.close()
+    assert _rollup_tables(server_db) == maintained
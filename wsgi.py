@@ -0,0 +1,18 @@
+"""
+WSGI entry point for the API server.
+
+    gunicorn -c server/gunicorn.conf.py wsgi:app
+    python wsgi.py          # waitress, for Windows hosts
+"""
+import os
+from server import create_app
+
+app = create_app()
+
+
+if __name__ == '__main__':
+    from waitress import serve
+    serve(app,
+          host=os.environ.get('RESIDENT_MGMT_API_HOST', '0.0.0.0'),
+          port=int(os.environ.get('RESIDENT_MGMT_API_PORT', 5000)),
+          threads=int(os.environ.get('RESIDENT_MGMT_API_THREADS', 8)))